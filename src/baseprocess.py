@@ -18,9 +18,24 @@ try:
 except ImportError:
     print('geopandas not installed!')
 from pathlib import Path
+from interpolation import MeshInterpolator
+from meshinfo import load_mesh
+from phaseplan import PhasePlan
+import results
+from spatial import PolygonIndex, match_by_shape
+from stagematrix import StageMatrix
+import workbook
 
 __version__ = 1.0
 
+# Command, mode and naming used by BaseProject.build_geometry for each type of element
+#   element: (mode switch, Plaxis collection of the element, prefix of the element name)
+_GEOMETRY_COMMANDS = {'plate':      ('gotostructures', 'Plates', 'Plate'),
+                      'n2nanchor':  ('gotostructures', 'NodeToNodeAnchors', 'Anchor'),
+                      'lineload':   ('gotostructures', 'LineLoads', 'LineLoad'),
+                      'line':       ('gotostructures', None, None),
+                      'waterlevel': ('gotoflow', 'UserWaterLevels', 'UserWaterLvl')}
+
 
 class BaseProject:
     '''
@@ -51,6 +66,13 @@ class BaseProject:
         self._model_geometry = {}
         self._model_phases = pd.DataFrame(dict(name=[], ID=[], plxobj=[]))
         self.plx_file_path = ''
+        self._applied_phase_plan = None
+        self._touched_phases = []
+        self.skipped_phases = []
+        self._soilpoly_index = None     # bounding boxes of the SoilPolygons, see _soil_index
+        self._soilgeom_index = None     # geometry of the soil polygons, see _soil_geom_index
+        self._soil_mesh  = {}           # {phase name: MeshInterpolator}, see get_soil_slice_results
+        self._soil_nodal = {}           # {(phase name, result type): nodal results}
         # Define a namedtuple for solvertype
         SolverType = collections.namedtuple('SolverType','Picos, Pardiso, Classic')
         self.solver_type = SolverType(Picos  = 'Picos (multicore iterative)',
@@ -98,6 +120,7 @@ class BaseProject:
         pathformat = Path(dirname, basename).with_suffix(suffix)
         fileloc    = str(pathformat)
         self._s_i.open(fileloc)
+        self.clear_soil_results()       # new file, new results
         self.logger.info("Plaxis file opened: " + fileloc)
         return
 
@@ -179,6 +202,51 @@ class BaseProject:
     def load_temp_files():
         pass
 
+    def delete_objects(self, collection, pattern=None, bbox=None, object_type=None, mode=None):
+        '''
+        Deletes a whole group of objects, or a filtered subset of it, with a single delete command.
+        The result is verified with a single count query.
+        Param:
+            collection:  name of the Plaxis collection, e.g. 'Plates', 'Boreholes', 'Materials'
+            pattern:     regular expression the object names must match, e.g. r'Plate_W.*'. Default = None
+            bbox:        (xmin, ymin, xmax, ymax), only objects with their bounding box inside are deleted.
+                         Default = None
+            object_type: only objects of this Plaxis type are deleted, e.g. 'PlateMat2D'. Default = None
+            mode:        mode switch sent before deleting, e.g. 'gotostructures'. Default = None
+        Return:
+            Number of objects deleted
+        '''
+        if mode is not None:
+            getattr(self._g_i, mode)()
+        objects = getattr(self._g_i, collection)
+        all_names = self._object_names(objects)
+        if len(all_names) == 0:
+            self.logger.info("No {} in Plaxis Model".format(collection))
+            return 0
+        targets = objects
+        if object_type is not None:
+            targets = self._g_i.filter(objects, object_type)
+        if bbox is not None:
+            df = self._tabulate(targets, ['BoundingBox'])
+            bb = BaseProject._parse_bounding_box(df['BoundingBox'])
+            inside = (bb.xmin >= bbox[0]) & (bb.ymin >= bbox[1]) & (bb.xmax <= bbox[2]) & (bb.ymax <= bbox[3])
+            names = list(df.index[inside.values])
+        elif object_type is not None:
+            names = self._object_names(targets)
+        else:
+            names = all_names
+        if pattern is not None:
+            names = [x for x in names if re.fullmatch(pattern, x)]
+        if len(names) == 0:
+            return 0
+        self._run_commands(['delete ' + ' '.join(names)])
+        remaining = self._count(objects)
+        if remaining != len(all_names) - len(names):
+            self.logger.error("{} of {} {} left after deleting {}".format(
+                              remaining, len(all_names), collection, len(names)))
+        self.logger.debug("{} {} have been deleted".format(len(names), collection))
+        return len(names)
+
 #================================================================================================================================================================
 #   'SOIL' TAB FUNCTIONS
 #================================================================================================================================================================
@@ -202,7 +270,7 @@ class BaseProject:
         Return:
             dfgv_Soil_Para: viewable dataframe of soil materials
         '''
-        if filename.endswith('.xlsm'):
+        if workbook.is_workbook(filename):
             self.dfgv_Soil_Para = self._mat_read_para_excel(filename, soilmat_sheet)
         self._mat_input_para()
         return self.dfgv_Soil_Para
@@ -222,7 +290,7 @@ class BaseProject:
             self._dfg_Soil_Para: a dataframe of soil materials
         '''
         # User to specify soilmat_sheet depending on material model, 
-        df_Soil_Para = pd.read_excel(filename, sheet_name=soilmat_sheet)
+        df_Soil_Para = self._read_sheet(filename, soilmat_sheet)
         # Drops the last row of data if it's incomplete "NaN" entry.
         df_Soil_Para.dropna(inplace=True)
         # Sets column named 'Soil' as the index of rows
@@ -289,16 +357,18 @@ class BaseProject:
         if material_source == '':  # if source not specified, create new a soil material.
             mat_target = self.g_i.soilmat()
         else:
+            # One 'tabulate' call returns every property of the source, so no proxy attribute
+            # (and no plxmethod) needs to be touched on the client side.
             mat_source = getattr(self.g_i, material_source)
+            df_source  = self._tabulate(mat_source)
             property_list = []
-            for attr in dir(mat_source):
-                try:
-                    if isinstance(getattr(mat_source, attr).value, int) or \
-                       isinstance(getattr(mat_source, attr).value, float):
-                        property_list.append(attr)
-                        property_list.append(getattr(mat_source, attr).value)
-                except:  # this should be avoided, will be fixed later
-                    pass  # we do nothing here, as the exceptions will be some plxmethods
+            for attr, value in df_source.iloc[0].items():
+                if attr in ('MaterialName', 'Identification', 'Name'):
+                    continue
+                if isinstance(value, (bool, np.bool_, int, float, np.integer, np.floating)) and \
+                   not pd.isna(value):
+                    property_list.append(attr)
+                    property_list.append(value.item() if hasattr(value, 'item') else value)
             mat_target = self.g_i.soilmat(*property_list)
         mat_target.MaterialName = material_name_target
         mat_target.Name = material_name_target
@@ -333,167 +403,103 @@ class BaseProject:
                    'Einc', 'verticalref', 'perm_primary_horizontal_axis', 'perm_vertical_axis',
                    'InterfaceStrength', 'Rinter', 'CrossPermeability', 'HydraulicResistance',
                    'DrainageConductivity', 'K0Determination', 'K0Primary', 'K0Secondary']
-        df_soil_param = pd.DataFrame(columns=columns)
-        soils = self.mat_extract_para()
-        # Extract soil property here
-        for soil_name in soils:
-            soil = soils[soil_name]
-            for prop in columns:
-                df_soil_param.loc[soil_name, prop] = getattr(soil, prop).value
-        drainage_type = {0: 'Drained',
-                         1: 'Undrained (A)',
-                         2: 'Undrained (B)',
-                         3: 'Undrained (C)',
-                         4: 'Non-porous'}
-        material_type = {1: 'Linear Elastic',
-                         2: 'Mohr-Coulomb'}
+        # Extract soil property here, all materials in one go
+        df_soil_param = self.mat_extract_table('SoilMat', columns)
         start_row = 13
         xw.Range('A13:AB100').clear_contents()
-        for iMat in range(len(soils)):
-            xw.Range(
-                (start_row+iMat, 1)).value = df_soil_param.loc[iMat, "MaterialNumber"].value
-            xw.Range(
-                (start_row+iMat, 2)).value = df_soil_param.loc[iMat, "MaterialName"].value
-
-            if df_soil_param.loc[iMat, "SoilModel"].value is 1:
-                temp = "Linear Elastic"
-            elif df_soil_param.loc[iMat, "SoilModel"].value is 2:
-                temp = "Mohr-Coulomb"
-            xw.Range((start_row+iMat, 3)).value = temp
-
-            if df_soil_param.loc[iMat, "DrainageType"].value is 0:
-                temp = "Drained"
-            elif df_soil_param.loc[iMat, "DrainageType"].value is 1:
-                temp = "Undrained (A)"
-            elif df_soil_param.loc[iMat, "DrainageType"].value is 2:
-                temp = "Undrained (B)"
-            elif df_soil_param.loc[iMat, "DrainageType"].value is 3:
-                temp = "Undrained (C)"
-            elif df_soil_param.loc[iMat, "DrainageType"].value is 4:
-                temp = "Non-porous"
-            xw.Range((start_row+iMat, 4)).value = temp
-
-            xw.Range(
-                (start_row+iMat, 5)).value = df_soil_param.loc[iMat, "gammaUnsat"]
-            xw.Range(
-                (start_row+iMat, 6)).value = df_soil_param.loc[iMat, "gammaSat"]
-
-            if df_soil_param.loc[iMat, "DrainageType"].value is 0:
-                xw.Range(
-                    (start_row+iMat, 7)).value = df_soil_param.loc[iMat, "cref"]
-                xw.Range((start_row+iMat, 8)
-                         ).value = df_soil_param.loc[iMat, "phi"]
-            elif df_soil_param.loc[iMat, "DrainageType"].value is 1:
-                xw.Range(
-                    (start_row+iMat, 9)).value = df_soil_param.loc[iMat, "cref"]
-                xw.Range((start_row+iMat, 10)
-                         ).value = df_soil_param.loc[iMat, "cinc"]
-            elif df_soil_param.loc[iMat, "DrainageType"].value is 2:
-                xw.Range(
-                    (start_row+iMat, 9)).value = df_soil_param.loc[iMat, "cref"]
-                xw.Range((start_row+iMat, 10)
-                         ).value = df_soil_param.loc[iMat, "cinc"]
-            elif df_soil_param.loc[iMat, "DrainageType"].value is 3:
-                xw.Range(
-                    (start_row+iMat, 9)).value = df_soil_param.loc[iMat, "cref"]
-                xw.Range((start_row+iMat, 10)
-                         ).value = df_soil_param.loc[iMat, "cinc"]
-            elif df_soil_param.loc[iMat, "DrainageType"].value is 4:
-                xw.Range(
-                    (start_row+iMat, 7)).value = df_soil_param.loc[iMat, "cref"]
-                xw.Range((start_row+iMat, 8)
-                         ).value = df_soil_param.loc[iMat, "phi"]
-
-            xw.Range((start_row+iMat, 11)
-                     ).value = df_soil_param.loc[iMat, "nu"]
-            xw.Range((start_row+iMat, 13)
-                     ).value = df_soil_param.loc[iMat, "Eref"]
-            xw.Range((start_row+iMat, 14)
-                     ).value = df_soil_param.loc[iMat, "Einc"]
-            xw.Range((start_row+iMat, 15)
-                     ).value = df_soil_param.loc[iMat, "verticalref"]
-            xw.Range(
-                (start_row+iMat, 16)).value = df_soil_param.loc[iMat, "perm_primary_horizontal_axis"]
-            xw.Range((start_row+iMat, 17)
-                     ).value = df_soil_param.loc[iMat, "perm_vertical_axis"]
-
-            if df_soil_param.loc[iMat, "InterfaceStrength"].value is 0:
-                temp = "Rigid"
-            elif df_soil_param.loc[iMat, "InterfaceStrength"].value is 1:
-                temp = "Manual"
-            xw.Range((start_row+iMat, 18)).value = temp
-
-            xw.Range((start_row+iMat, 19)
-                     ).value = df_soil_param.loc[iMat, "Rinter"]
-            
-            if df_soil_param.loc[iMat, "CrossPermeability"].value is 0:
-                temp = "Impermeable"
-            elif df_soil_param.loc[iMat, "CrossPermeability"].value is 1:
-                temp = "Semi-impermeable"
-            elif df_soil_param.loc[iMat, "CrossPermeability"].value is 2:
-                temp = "Fully permeable"
-            xw.Range((start_row+iMat, 20)).value = temp
-
-            xw.Range((start_row+iMat, 21)
-                     ).value = df_soil_param.loc[iMat, "HydraulicResistance"]
-            xw.Range(
-                (start_row+iMat, 22)).value = df_soil_param.loc[iMat, "DrainageConductivity"]
-
-            if df_soil_param.loc[iMat, "K0Determination"].value is 0:
-                temp = "Manual"
-            elif df_soil_param.loc[iMat, "K0Determination"].value is 1:
-                temp = "Automatic"
-            xw.Range((start_row+iMat, 23)).value = temp
-
-            xw.Range((start_row+iMat, 24)
-                     ).value = df_soil_param.loc[iMat, "K0Primary"]
-            xw.Range((start_row+iMat, 25)
-                     ).value = df_soil_param.loc[iMat, "K0Secondary"]
+        rows = BaseProject._mat_excel_rows(df_soil_param)
+        if rows:
+            xw.Range((start_row, 1)).value = rows    # one block for all materials
         return
 
-    def get_soil_slice_results(self, phase, type_of_result, points):
+    @staticmethod
+    def _mat_excel_rows(df_soil_param):
         '''
-        Returns plaxis results at a list of points defined in Points
+        Lays out the soil materials of 'mat_extract_table' as the rows of the 'MC_Extracted' sheet,
+        columns A to Y, with the codes of Plaxis written as text
+        Param:
+            df_soil_param: dataframe of the soil materials, one row per material
+        Return:
+            A list of rows, one list of cell values per material
+        '''
+        soil_model     = {1: 'Linear Elastic', 2: 'Mohr-Coulomb'}
+        drainage_type  = {0: 'Drained', 1: 'Undrained (A)', 2: 'Undrained (B)', 3: 'Undrained (C)',
+                          4: 'Non-porous'}
+        interface      = {0: 'Rigid', 1: 'Manual'}
+        cross_perm     = {0: 'Impermeable', 1: 'Semi-impermeable', 2: 'Fully permeable'}
+        k0_determine   = {0: 'Manual', 1: 'Automatic'}
+        rows = []
+        for _, mat in df_soil_param.iterrows():
+            row = [None] * 25
+            row[0]  = mat.get('MaterialNumber')
+            row[1]  = mat.get('MaterialName')
+            row[2]  = soil_model.get(mat.get('SoilModel'))
+            row[3]  = drainage_type.get(mat.get('DrainageType'))
+            row[4]  = mat.get('gammaUnsat')
+            row[5]  = mat.get('gammaSat')
+            if mat.get('DrainageType') in (0, 4):       # Drained and Non-porous: c' and phi'
+                row[6], row[7] = mat.get('cref'), mat.get('phi')
+            elif mat.get('DrainageType') in (1, 2, 3):    # Undrained: cu and its increment
+                row[8], row[9] = mat.get('cref'), mat.get('cinc')
+            row[10] = mat.get('nu')
+            row[12] = mat.get('Eref')
+            row[13] = mat.get('Einc')
+            row[14] = mat.get('verticalref')
+            row[15] = mat.get('perm_primary_horizontal_axis')
+            row[16] = mat.get('perm_vertical_axis')
+            row[17] = interface.get(mat.get('InterfaceStrength'))
+            row[18] = mat.get('Rinter')
+            row[19] = cross_perm.get(mat.get('CrossPermeability'))
+            row[20] = mat.get('HydraulicResistance')
+            row[21] = mat.get('DrainageConductivity')
+            row[22] = k0_determine.get(mat.get('K0Determination'))
+            row[23] = mat.get('K0Primary')
+            row[24] = mat.get('K0Secondary')
+            rows.append([x.item() if hasattr(x, 'item') else x for x in row])
+        return rows
+
+    def clear_soil_results(self):
+        '''
+        Forgets the soil mesh and nodal results kept by get_soil_slice_results, e.g. after the project has
+        been opened again or recalculated
+        '''
+        self._soil_mesh.clear()
+        self._soil_nodal.clear()
+
+    def get_soil_slice_results(self, phase, type_of_result, points, method='interpolate'):
+        '''
+        Returns plaxis results at a list of points defined in Points.
+        By default the soil mesh and the nodal results of a phase are downloaded once and interpolated
+        locally with the element shape functions, see interpolation.MeshInterpolator.
         Param: 
             Points: 2D array containing coordinates of the points to be extracted
             Phase: str of the phase name
             type_of_results: type of results of interested, e.g., X, Y, etc, refer to Plaxis command for details
+            method: 'interpolate', or 'getsingleresult' to ask Plaxis point by point
         '''
         g_o = self._g_o
-        phase = getattr(g_o, phase)
-        results = []
-        for point in points:
-            result = float(g_o.getsingleresult(phase, getattr(
-                g_o.ResultTypes.Soil, type_of_result), point[0], point[1]))
-            results.append(result)
-        return np.array(results)
+        plx_phase = getattr(g_o, phase)
+        if method == 'getsingleresult':
+            results = []
+            for point in points:
+                result = float(g_o.getsingleresult(plx_phase, getattr(
+                    g_o.ResultTypes.Soil, type_of_result), point[0], point[1]))
+                results.append(result)
+            return np.array(results)
+        if phase not in self._soil_mesh:
+            self._soil_mesh[phase] = MeshInterpolator.from_output(g_o, plx_phase)
+        if (phase, type_of_result) not in self._soil_nodal:
+            self._soil_nodal[phase, type_of_result] = np.asarray(g_o.getresults(
+                plx_phase, getattr(g_o.ResultTypes.Soil, type_of_result), 'node'), dtype=float)
+        return self._soil_mesh[phase].interpolate(self._soil_nodal[phase, type_of_result], points)
 
 #   Borehole Related
 
-    def _borehole_slay(self, BH_name, BH_slay_num, BH_slay_btm, BH_layer, BH_slay_mat):
-        '''
-        Creates new soil layers in a new borehole
-        Param:
-            BH_name:        borehole name
-            BH_xcoord:      x-coordinate of borehole
-            BH_sum_slay:    total number of soil layers in all boreholes (this should be the same for all boreholes)
-            BH_head:        groundwater level (i.e. head level)
-            BH_slay_num_00: soil layer ID, starting at 0
-            BH_slay_btm_00: bottom elevation of the above soil layer ID
-            BH_layer:       layer being assigned to
-            BH_slay_mat:    soil layer material
-        Return:
-            None
-        '''
-        # Sets the bottom level of a soil layer of specified borehole
-        self._g_i.setsoillayerlevel(BH_name, BH_slay_num, BH_slay_btm)
-        # Assigns soil material to a specified layer, other than the top (0) layer
-        if BH_slay_num is not 0:
-            self._g_i.set(BH_layer.Soil.Material, BH_slay_mat)
-
     def _bh_data_input(self):
         '''
-        Runs '_borehole_slay' function mutliple times to create all BHs in standard excel file.
+        Creates all BHs in standard excel file in bulk.
+        The layer matrix of all boreholes is validated with numpy, and boreholes, soil layers, layer levels and
+        materials are sent in two batches of commands around a single lookup of the soil layer names.
         Added soil layer is added to all boreholes. 
         Its thickness should be specified as zero if it does not exist at a specific borehole location.
         Param:
@@ -501,64 +507,56 @@ class BaseProject:
         Return:
             None
         '''
-        self._g_i.gotosoil()
-        # Re-reads dictionary of soil materials from Plaxis
-        self.mat_extract_para()
-        # Loops over iterable with automatic counter assigned
-        for ix, col_name in enumerate(self._dfg_BH_Data):
-            if 'MaterialName' in col_name:           # To escape the last column, where material ID is saved
-                continue
-            # Gets pandas series using column name
-            BH_i = self._dfg_BH_Data[col_name]
-            # Gets the indices with "BH_slay" in it
-            layer_index = [ix for ix in BH_i.index if 'BH_slay' in ix]
-            # Makes sure index is an even number
-            assert(len(layer_index) % 2 == 0)
-            # It will pop up an error messeage if number is odd
-            # Calculates the total number of soil layers
-            nsoillayer = int(len(layer_index)/2)
-            # Variable for x-coordinate of BH
-            plx_soillayers = []
-            x_coord = BH_i['BH_xcoord']
-            if 'BH_ycoord' in BH_i.index:                         # check if it's 3D case
-                y_coord = BH_i['BH_ycoord']
-                plx_BH = self._g_i.borehole(
-                                            x_coord, y_coord)     # Adds a new 3D borehole
-            else:
-                plx_BH = self._g_i.borehole(x_coord)              # Adds a new 2D borehole
-            # Variable for groundwater level at BH
-            BH_head = BH_i['BH_head']
-            # Allocates a list for holding soil layer information
-            # Sets the water level inside the borehole
-            self._g_i.Boreholes[-1].Head.set(BH_head)
-            # Renames new borehole with column name
-            plx_BH.rename(col_name)
-            # Adds the total number of soil layers
-            if ix == 0:
-                for i in np.arange(nsoillayer):
-                    plx_soillayers.append(self._g_i.soillayer(0))
-            # Generates a dictionary of soil layers generated in Plaxis
-            plx_soillayer = {}
-            for x in self._g_i.Soillayers[:]:
-                plx_soillayer[str(x.Name)] = x
-            # Slices the dataFrame to get the soil layering info only
-            soil_layer = BH_i[layer_index]
-            # print(soil_layer)
-            # Loops over the soil layers, special handling for the top layer
-            for i in np.arange(nsoillayer):          
-                if i == 0:                             
-                    self._borehole_slay(plx_BH, int(
-                        soil_layer[0]), soil_layer[1], 0, 0)
-                else:
-                    mat_index = soil_layer.index[2*i]
-                    Mat_Name = self._dfg_BH_Data.loc[mat_index, 'MaterialName']
-                    self._borehole_slay(plx_BH, int(soil_layer[2*i]), soil_layer[2*i+1],
-                                       plx_soillayer['Soillayer_'+str(i)],
-                                       self._plx_mat[Mat_Name])
-        self._plx_soillayer = plx_soillayer
-        # print(self._plx_soillayer)
+        df_BH = self._dfg_BH_Data
+        bh_names = [x for x in df_BH.columns if 'MaterialName' not in x]
+        # Gets the indices with "BH_slay" in it, pairs of layer number and bottom level
+        layer_index = [ix for ix in df_BH.index if 'BH_slay' in ix]
+        if len(layer_index) % 2 != 0:
+            raise ValueError('Borehole data must hold pairs of soil layer number and bottom level')
+        nsoillayer = int(len(layer_index)/2)
+        layers = df_BH.loc[layer_index, bh_names].to_numpy(dtype=float)
+        layer_num = layers[0::2]                  # (nsoillayer x nBH)
+        layer_btm = layers[1::2]
+        # Validates the layer matrix
+        if np.isnan(layers).any():
+            raise ValueError('Missing soil layer data in boreholes: ' +
+                             ', '.join(np.array(bh_names)[np.isnan(layers).any(axis=0)]))
+        if not (layer_num == layer_num[:, :1]).all():
+            raise ValueError('Soil layer numbers differ between boreholes')
+        upward = (np.diff(layer_btm, axis=0) > 0).any(axis=0)
+        if upward.any():
+            raise ValueError('Soil layer bottoms rise with depth in boreholes: ' +
+                             ', '.join(np.array(bh_names)[upward]))
+        layer_num = layer_num[:, 0].astype(int).tolist()
+        x_coord = df_BH.loc['BH_xcoord', bh_names].to_numpy(dtype=float).tolist()
+        BH_head = df_BH.loc['BH_head', bh_names].to_numpy(dtype=float).tolist()
+        if 'BH_ycoord' in df_BH.index:             # check if it's 3D case
+            y_coord = df_BH.loc['BH_ycoord', bh_names].to_numpy(dtype=float).tolist()
+            locations = ['{!r} {!r}'.format(x, y) for x, y in zip(x_coord, y_coord)]
+        else:
+            locations = [repr(x) for x in x_coord]
+        # Boreholes and soil layers
+        commands = ['gotosoil']
+        for name, location, head in zip(bh_names, locations, BH_head):
+            commands.append('borehole ' + location)
+            commands.append('rename Boreholes[-1] "{}"'.format(name))
+            commands.append('set {}.Head {!r}'.format(name, head))
+        commands.extend(['soillayer 0'] * nsoillayer)
+        self._run_commands(commands)
+        # Single lookup of the soil layers, in their order in Plaxis
+        self._plx_soillayer = self._name_index(self._g_i.Soillayers)
+        soillayer_names = list(self._plx_soillayer)[-nsoillayer:]
+        # Layer levels of all boreholes and layer materials
+        materials = self._material_names('SoilMat')
+        commands = ['setsoillayerlevel {} {} {!r}'.format(bh, num, btm)
+                    for i, num in enumerate(layer_num)
+                    for bh, btm in zip(bh_names, layer_btm[i].tolist())]
+        for i in range(1, nsoillayer):            # the top layer keeps its material
+            Mat_Name = df_BH.loc[layer_index[2*i], 'MaterialName']
+            commands.append('set {}.Soil.Material {}'.format(soillayer_names[i-1], materials[str(Mat_Name)]))
+        self._run_commands(commands)
         self.logger.info(
-            str(ix) + " Nos. of Soil Materials Imported into Plaxis")
+            str(len(bh_names)) + " Nos. of Boreholes Imported into Plaxis")
         return
 
     def bh_extract_data(self):
@@ -587,7 +585,7 @@ class BaseProject:
         Return:
             None    
         '''
-        if filename.endswith('.xlsm'):
+        if workbook.is_workbook(filename):
             self._bh_read_data_excel(filename)
         else:
             self.logger.error('Filetype not implemented!!!')
@@ -601,14 +599,7 @@ class BaseProject:
         Return:
             None            
         '''
-        if len(self.g_i.Boreholes) == 0:  # if no borehole in Plaxis, just return Ture
-            self.logger.info("No BH information in Plaxis Model")
-            return
-        self._g_i.gotosoil()
-        for x in self._g_i.Boreholes[:]:
-            self._g_i.delete(x)
-        self.logger.debug("{} BHs has been deleted".format(
-            len(self.g_i.Boreholes)))
+        self.delete_objects('Boreholes', mode='gotosoil')
 
 #================================================================================================================================================================
 #   'STRUCTURES' TAB FUNCTIONS
@@ -628,7 +619,7 @@ class BaseProject:
         Return:
             dfgv_Plate_Prop: viewable dataframe of plate materials
         '''
-        if filename.endswith('.xlsm') or filename.endswith('.xlsx'):
+        if workbook.is_workbook(filename):
             self.dfgv_Plate_Prop = self._plate_read_prop_excel(filename)
         else:
             self.logger.error('Filetype not implemented yet!')
@@ -643,7 +634,7 @@ class BaseProject:
         Return:
             self._dfg_Plate_Prop: a dataframe containing plate information
         '''
-        df_Plate_Prop = pd.read_excel(filename, sheet_name=sheetname)
+        df_Plate_Prop = self._read_sheet(filename, sheetname)
         # Drops the last row of data if it's incomplete "NaN" entry.
         df_Plate_Prop.dropna(inplace=True)
         # Sets column named 'Plate_ID' as index of rows
@@ -703,6 +694,30 @@ class BaseProject:
             dict_mats[mat.MaterialName.value] = mat
         return dict_mats
 
+    def mat_extract_table(self, material_type='SoilMat', properties=None):
+        '''
+        Extracts the properties of all materials of a type in a single 'tabulate' call.
+        Param:
+            material_type: string, indicating type of materials/structure elements
+                           'PlateMat2D'  = 2D plate elements
+                           'AnchorMat2D' = 2D anchor elements
+                           'SoilMat'     = soil materials
+            properties:    list of property names, e.g. ['MaterialName', 'Eref'].
+                           Default = None, i.e. all properties reported by Plaxis
+        Return:
+            A typed dataframe with one row per material, indexed by 'MaterialName'
+        '''
+        mats = self.g_i.filter(self.g_i.Materials, material_type)
+        if properties is not None and 'MaterialName' not in properties:
+            properties = ['MaterialName'] + list(properties)
+        df_mat = self._tabulate(mats, properties)
+        if 'MaterialName' in df_mat.columns:
+            df_mat = df_mat.set_index('MaterialName', drop=False)
+            df_mat.index.name = None
+        if properties is not None:
+            df_mat = df_mat[[x for x in properties if x in df_mat.columns]]
+        return df_mat
+
     def plate_extract_prop(self):
         '''
         Extracts existing plate information in Plaxis to a dictionary
@@ -727,13 +742,9 @@ class BaseProject:
         columns = ['MaterialNumber', 'MaterialName', 'Elasticity', 'IsIsotropic',
                    'IsEndBearing', 'EA', 'EA2', 'EI', 'nu', 'd', 'w', 'Mp', 'Np',
                    'Np2', 'RayleighAlpha', 'RayleighBeta', 'Gref', 'Colour']
-        df_plate_extract_para = pd.DataFrame(columns=columns)
-        plate_dict            = self.plate_extract_prop()
-        for plate_name in plate_dict:
-            plate = plate_dict[plate_name]
-            for prop in columns:
-                df_plate_extract_para.loc[plate_name,
-                                          prop] = getattr(plate, prop).value
+        df_plate_extract_para = self.mat_extract_table('PlateMat2D', columns)
+        self.logger.info(
+            '{} Plate material information extracted!'.format(len(df_plate_extract_para)))
         return df_plate_extract_para
 
 #   Anchor Material Related 
@@ -747,7 +758,7 @@ class BaseProject:
         Return:
             dfgv_Anchor_Prop: viewable dataframe of anchor materials
         '''
-        if filename.endswith('.xlsm') or filename.endswith('.xlsx'):
+        if workbook.is_workbook(filename):
             self.dfgv_Anchor_Prop = self._anchor_read_prop_excel(filename)
         else:
             self.logger.error('Filetype not implemented yet!')
@@ -762,7 +773,7 @@ class BaseProject:
         Return:
             self._dfg_Anchor_Prop: a dataframe containing plate information
         '''
-        df_Anchor_Prop = pd.read_excel(filename, sheet_name=sheetname)
+        df_Anchor_Prop = self._read_sheet(filename, sheetname)
         df_Anchor_Prop.dropna(inplace=True)
         df_Anchor_Prop.set_index('Anchor_ID', inplace=True)
         # Remove rows with all zeros
@@ -835,33 +846,11 @@ class BaseProject:
             None
         Return:
             self._plx_soilpoly: a dictionary of SoilPolygons
-        '''        
-        self._plx_soilpoly = {}     # Clears existing dictionary to be refreshed
-        geometry = []
-        geometry_key = []
+        '''
         self._g_i.gotostages()
-        # Create a list of SoilPolygon Names as key (index) for the dictionary of Plaxis objects
-        sort_geo0 = self._g_i.tabulate(self._g_i.SoilPolygons)
-        sort_geo1 = re.split('\n', sort_geo0)
-        sort_geo2 = [re.split('\t', x)[0]
-                     for x in sort_geo1 if 'N/A' not in x][1:]
-        geometry_key = sort_geo2
-        # Converts the counter of nos. of SoilPolygons to integer
-        read_nos_geo = self._g_i.count(self._g_i.SoilPolygons)
-        nos_geo  = int(read_nos_geo[:read_nos_geo.rfind(" items")])
-        geometry = self._g_i.SoilPolygons[:]
-
-        for igeo in range(nos_geo):
-            Read_Geom_Name = geometry_key[igeo]
-            Read_Geom_Code = geometry[igeo]
-            self._plx_soilpoly[Read_Geom_Name] = Read_Geom_Code
-        # print(self._plx_soilpoly)
+        self._plx_soilpoly = self._name_index(self._g_i.SoilPolygons)
         print("Nos. of SoilPolygons Extracted into Dictionary = " +
               str(len(self._plx_soilpoly)))
-        if len(self._plx_soilpoly) == nos_geo:
-            print("Nos. of Items in Dictionary Match Plaxis File")
-        else:
-            print("Error: Nos. of Items in Dictionary DO NOT Match Plaxis File!")
         return self._plx_soilpoly
 
     def poly_extract(self):
@@ -919,123 +908,249 @@ class BaseProject:
 
     def soilpoly_extract_df(self):
         '''
-        Extracts existing Plaxis SoilPolygons into an dataFrame via dictionary
+        Extracts existing Plaxis SoilPolygons into an dataFrame via dictionary.
+        Area, BoundingBox and CoarsenessFactor of all polygons come from one 'tabulate' call and the
+        Plaxis objects from one slice, the bounding boxes are parsed in one vectorised pass.
         Param:
             None
         Return:
             self._dfg_Poly_Extract_BB: a dataFrame of SoilPolygons
-        '''        
-        self._soilpoly_extract()
-        # Define column headers and set-up dataframe
-        columns = {'PolygonName':[],
-                   'Area':[],
-                   'BB_xmin':[],'BB_xmax':[],
-                   'BB_ymax':[],'BB_ymin':[],
-                   'CoarsenessFactor':[],
-                   'BoundingBox':[], 'echoinfo':[]}
-        df_Poly_Extract_BB = pd.DataFrame(columns=columns)
-        # Populate dataframe
-        for igeo, iName in enumerate(self._plx_soilpoly):
-            # Converts 'plxscripting.plxproxy.PlxProxyIPText' into string
-            df_Poly_Extract_BB.loc[igeo,"PolygonName"] = str(self._plx_soilpoly[iName].Name)  
-            df_Poly_Extract_BB.loc[igeo,"Area"]        = self._plx_soilpoly[iName].Area
-            mm = re.search('min: \((.*); (.*); .*\) max: \((.*); (.*); .*\)', \
-                           str(self._plx_soilpoly[iName].BoundingBox))  
-            # Converts BoundingBox output into string first
-            if mm is not None:
-                data =  {'xmin': float(mm.group(1)),
-                         'ymin': float(mm.group(2)),
-                         'xmax': float(mm.group(3)),
-                         'ymax': float(mm.group(4))}
-            df_Poly_Extract_BB.loc[igeo,"BB_xmin"] = data['xmin']
-            df_Poly_Extract_BB.loc[igeo,"BB_xmax"] = data['xmax']
-            df_Poly_Extract_BB.loc[igeo,"BB_ymax"] = data['ymax']
-            df_Poly_Extract_BB.loc[igeo,"BB_ymin"] = data['ymin']
-            df_Poly_Extract_BB.loc[igeo,"CoarsenessFactor"] = self._plx_soilpoly[iName].CoarsenessFactor
-            self._dfg_Poly_Extract_BB = df_Poly_Extract_BB
-            # print(self._dfg_Poly_Extract_BB)
-        self.logger.info("Nos. of SoilPolygons Extracted into Dataframe = " + str(len(self._plx_soilpoly)))
+        '''
+        self._g_i.gotostages()
+        soilpolys = self._g_i.SoilPolygons
+        df_tab    = self._tabulate(soilpolys, ['Area', 'BoundingBox', 'CoarsenessFactor'])
+        objects   = soilpolys[:]
+        if len(objects) != len(df_tab):
+            self.logger.error("Nos. of SoilPolygons tabulated ({}) DO NOT Match Plaxis File ({})!".format(
+                              len(df_tab), len(objects)))
+        self._plx_soilpoly = dict(zip(df_tab.index, objects))
+        # Define column headers and set-up typed dataframe
+        nos_geo = len(df_tab)
+        bb      = BaseProject._parse_bounding_box(df_tab['BoundingBox'])
+        df_Poly_Extract_BB = pd.DataFrame({
+            'PolygonName':      np.asarray(df_tab.index, dtype=object),
+            'Area':             pd.to_numeric(df_tab['Area'], errors='coerce').to_numpy(dtype=float),
+            'BB_xmin':          bb['xmin'].to_numpy(dtype=float),
+            'BB_xmax':          bb['xmax'].to_numpy(dtype=float),
+            'BB_ymax':          bb['ymax'].to_numpy(dtype=float),
+            'BB_ymin':          bb['ymin'].to_numpy(dtype=float),
+            'CoarsenessFactor': pd.to_numeric(df_tab['CoarsenessFactor'], errors='coerce').to_numpy(dtype=float),
+            'BoundingBox':      df_tab['BoundingBox'].astype(str).to_numpy(dtype=object),
+            'echoinfo':         np.full(nos_geo, np.nan)},
+            index=pd.RangeIndex(nos_geo))
+        self._dfg_Poly_Extract_BB = df_Poly_Extract_BB
+        self._soilpoly_index = None     # rebuilt from the new table on the next spatial query
+        self.logger.info("Nos. of SoilPolygons Extracted into Dataframe = " + str(nos_geo))
         return self._dfg_Poly_Extract_BB
 
-    def construct_soil_geom(self, path=''):
+    def construct_soil_geom(self, path='', tol=1e-3):
         '''
             Construct the geometries of Plaxis2D Model from the file path provided. If the path is left as defualt, 
-            the model will be saved first in order to get the path of the Plaxis folder
+            the model will be saved first in order to get the path of the Plaxis folder.
+            Soils are matched to the mesh polygons by area and bounding box in one join, see spatial.match_by_shape.
+            Polygons sharing area and bounding box (e.g. mirror images) are told apart by centroid and outline,
+            reading the vertices of those Plaxis polygons only.
             Param: 
                 Path : path to the Plaxis 2D folder
+                tol:   tolerance on areas and coordinates used to match soils and polygons
             Return: 
-                A Pandas dataframe holding the soil name ID and shapely polygons. 
+                A Pandas dataframe holding the soil name ID, the name of its polygon and shapely polygons.
         '''
         if self.plx_file_path == '':
             str_path = self.g_i.save()
             m = re.search(r'.*: (.*).p2dx', str_path)
             path = m.group(1)+'.p2dxdat'
             self.plx_file_path = path
-        self.soils = BaseProject.polygon_from_meshinfo(path)
-        for soil in self.g_i.soils:
-            name = soil.Name.value
-            results = self.soils[abs(np.array(
-                (self.soils.area - soil.Parent.Area.value))) < 1e-4]  # check the area first
-            if results.shape[0] > 1:  # if more polygons have the same area.
-                box = self.get_soil_bounding_box(name)
-                # lets check the centroid first
-                results_further = results[results.centroid.within(box)]
-                if results_further.shape[0] == 1:
-                    ix = results_further.index[0]
-                    self.soils.loc[ix, 'soil_ID'] = name
-                else:                                                   # centroid provide more choices
-                    # neet to check in a hard way, to go over all vertices and make sure all within the bounding box
-                    for ix, row in results_further.iterrows():
-                        polygon = row.geometry
-                        the_polygon = True
-                        for pt in polygon.exterior.coords[:]:
-                            x, y = round(pt[0], 3), round(pt[1], 3)
-                            if Point((x, y)).disjoint(box):
-                                the_polygon = False
-                                break
-                        if the_polygon:
-                            self.soils.loc[ix, 'soil_ID'] = name
-                            break
-            elif results.shape[0] == 1:
-                ix = results.index[0]
-                self.soils.loc[ix, 'soil_ID'] = name
-            else:
-                print('It is likely that the model has not been saved!')
-            return self.soils
+        elif path == '':
+            path = self.plx_file_path
+        mesh = load_mesh(path)
+        self.soils = mesh.polygons_gdf().copy()
+        # Area and bounding box of the polygon holding each soil, two 'tabulate' calls in total
+        df_soil = self._tabulate(self._g_i.Soils, ['Parent'])
+        df_poly = self._tabulate(self._g_i.Polygons, ['Area', 'BoundingBox'])
+        parents = df_soil['Parent'].astype(str).str.strip()
+        df_ref  = df_poly.reindex(parents.to_numpy())
+        bb      = BaseProject._parse_bounding_box(df_ref['BoundingBox'])
+        matched = match_by_shape(mesh.areas(), mesh.bounds(),
+                                 pd.to_numeric(df_ref['Area'], errors='coerce').to_numpy(dtype=float),
+                                 bb[['xmin', 'ymin', 'xmax', 'ymax']].to_numpy(dtype=float), tol,
+                                 centroids=mesh.centroids(), geometries=self.soils.geometry.to_numpy(),
+                                 ref_vertices=lambda i: self._polygon_vertices(parents.iloc[i]))
+        found = matched >= 0
+        self.soils['soil_ID'] = None
+        self.soils['PolygonName'] = None
+        self.soils.iloc[matched[found], self.soils.columns.get_loc('soil_ID')] = df_soil.index[found]
+        self.soils.iloc[matched[found], self.soils.columns.get_loc('PolygonName')] = parents[found].to_numpy()
+        self._soilgeom_index = None     # rebuilt from the new geometry on the next spatial query
+        if not found.all():
+            print('It is likely that the model has not been saved! Soils not found in the mesh: ' +
+                  ', '.join(df_soil.index[~found]))
+        return self.soils
+
+    def _polygon_vertices(self, name):
+        '''
+        Returns an array (k x 2) of the vertices of a Plaxis polygon, e.g. 'Polygon_1'
+        '''
+        polygon = getattr(self._g_i, name)
+        return np.array([(pt.x.value, pt.y.value) for pt in polygon.Points[:]], dtype=float)
 
     def construct_soil_material_table(self):
         '''
+        Reads the material and activity of every soil in every phase, one 'tabulate' call per phase.
         Param:
             None
         Return:
-            None
+            self.soil_stage: a StageMatrix (phases x soils) of material codes and activity,
+                             also kept as self.soil_material, see StageMatrix.to_frame
         '''
-        self.soil_material = pd.DataFrame()
-        for phase in self.g_i.Phases:
-            for soil in self.g_i.Soils:
-                self.soil_material.loc[soil.Name.value, phase.Name.value] = (
-                    soil.Material[phase].Name, soil.Active[phase])
+        phases = self._name_index(self._g_i.Phases)
+        tables = collections.OrderedDict()
+        for name, phase in phases.items():
+            tables[name] = self._tabulate(self._g_i.Soils, ['Material', 'Active'], phase)
+        self.soil_stage    = StageMatrix.from_tables(tables)
+        self.soil_material = self.soil_stage.to_frame()
+        return self.soil_stage
 
-    def get_soil_by_material_name(self, phase, material_name, plot=False):
+    def get_soil_by_material_name(self, phase, material_name, plot=False, active=None):
         '''
         Param:
-            None
+            phase:         name of the phase
+            material_name: name of the material
+            plot:          plot the soils found over the soils from construct_soil_geom
+            active:        True/False to keep only the active/inactive soils. Default = None, i.e. all
         Return:
-            None
+            A list of soil names
         '''
-        results = self.soil_material[self.soil_material[phase]
-                                     == material_name].index
+        results = self.soil_stage.soils_with(material_name, phase, active)
         if plot:
             ax = self.soils.plot(alpha=0.5, figsize=(10, 10), edgecolor='k')
-            self.soils[results].plot(ax=ax)
+            self.soils[self.soils.soil_ID.isin(results)].plot(ax=ax)
+        return results
 
-    def get_soil_by_bounding_box():
-        pass
+    def get_soil_by_bounding_box(self, xmin, ymin, xmax, ymax, predicate='within', plot=False):
+        '''
+        Finds the soil polygons in a rectangular zone through the spatial index of the soil polygons
+        Param:
+            xmin, ymin, xmax, ymax: extent of the zone (m)
+            predicate:              'within', polygons whose bounding box lies inside the zone (edges included),
+                                    or 'intersects', polygons overlapping the zone, checked against the soil
+                                    geometry from construct_soil_geom
+            plot:                   plot the polygons found over the soils from construct_soil_geom
+        Return:
+            A list of SoilPolygon names
+        '''
+        if predicate == 'within':
+            names = self._soil_index().in_box(xmin, ymin, xmax, ymax)
+        elif predicate == 'intersects':
+            names = self._soil_geom_index().intersecting((xmin, ymin, xmax, ymax))
+        else:
+            raise ValueError("predicate must be 'within' or 'intersects', not " + str(predicate))
+        if plot:
+            ax = self.soils.plot(alpha=0.5, figsize=(10, 10), edgecolor='k')
+            self.soils[self.soils.PolygonName.isin(names)].plot(ax=ax)
+        return names
+
+    def get_soil_at_points(self, points):
+        '''
+        Finds the soil polygon holding each point, checked against the soil geometry from construct_soil_geom
+        Param:
+            points: array (n x 2) of coordinates
+        Return:
+            An array of SoilPolygon names, None for points outside all soils
+        '''
+        return self._soil_geom_index().at_points(points)
+
+    def _soil_index(self):
+        '''
+        Returns the spatial index of the bounding boxes of the soil polygons, built once from
+        self._dfg_Poly_Extract_BB and reused until the polygons are extracted again.
+        Only for bounding box queries (in_box), the polygons are not known before meshing.
+        '''
+        if self._soilpoly_index is None:
+            if getattr(self, '_dfg_Poly_Extract_BB', None) is None:
+                self.soilpoly_extract_df()
+            self._soilpoly_index = PolygonIndex.from_bounding_boxes(self._dfg_Poly_Extract_BB)
+        return self._soilpoly_index
+
+    def _soil_geom_index(self):
+        '''
+        Returns the spatial index of the soil polygons built from their geometry (construct_soil_geom),
+        for intersection and point queries. The bounding boxes only prefilter the candidates.
+        '''
+        if self._soilgeom_index is None:
+            if getattr(self, 'soils', None) is None:
+                self.construct_soil_geom()
+            soils = self.soils[self.soils['PolygonName'].notna()]
+            self._soilgeom_index = PolygonIndex.from_polygons(soils['PolygonName'].to_numpy(),
+                                                              soils.geometry.to_numpy())
+        return self._soilgeom_index
 
 #----------------------------------------------------------------------------------------------------------------------------------------------------------------
 #  ELS PACKAGE FUNCTIONS
 #----------------------------------------------------------------------------------------------------------------------------------------------------------------
 
+    def build_geometry(self, element, df_coord, materials=None, interfaces=False, lineload_value=None,
+                       extra_commands=()):
+        '''
+        Creates all elements of a coordinate table in a single batch of commands, i.e. one mode switch and
+        one server call, instead of several calls per element. Elements, lines, points and interfaces are
+        named after the index of the table, as done by the draw_* functions.
+        Param:
+            element:        'plate', 'n2nanchor', 'lineload', 'line' or 'waterlevel'
+            df_coord:       dataframe of coordinates (x1, y1, x2, y2, ...), indexed by the element ID
+            materials:      dictionary {element ID: Plaxis name of the material}. Default = None
+            interfaces:     True to add negative and positive interfaces along the lines. Default = False
+            lineload_value: qy_start of lineloads. Default = None
+            extra_commands: commands appended to the batch, e.g. to group the new elements
+        Return:
+            A dictionary {name: Plaxis object} of everything created, built from one listing per object type
+        '''
+        mode, collection, label = _GEOMETRY_COMMANDS[element]
+        commands = [mode]
+        created  = collections.defaultdict(list)
+        for ix, coords in zip(df_coord.index, df_coord.values.tolist()):
+            commands.append('{} {}'.format(element, ' '.join(repr(float(x)) for x in coords)))
+            elem_name = line_name = None
+            if collection is not None:
+                elem_name = label + '_' + str(ix)
+                commands.append('rename {}[-1] "{}"'.format(collection, elem_name))
+                created[collection].append(elem_name)
+            if element != 'waterlevel':
+                line_name = 'Line_' + str(ix)
+                commands.append('rename Lines[-1] "{}"'.format(line_name))
+                created['Lines'].append(line_name)
+                owner = elem_name if elem_name is not None else line_name
+                for i, end in enumerate(['First', 'Second']):
+                    pt_name = 'Point_{}_{}'.format(owner, i+1)
+                    commands.append('rename {}.{} "{}"'.format(line_name, end, pt_name))
+                    created['Points'].append(pt_name)
+            if materials is not None:
+                commands.append('set {}.Material {}'.format(elem_name, materials[str(ix)]))
+            if lineload_value is not None:
+                commands.append('set {}.qy_start {}'.format(elem_name, repr(float(lineload_value))))
+            if interfaces:
+                for side, side_collection, side_label in [('neginterface', 'NegativeInterfaces', 'NegInterface'),
+                                                          ('posinterface', 'PositiveInterfaces', 'PosInterface')]:
+                    intf_name = side_label + '_' + str(ix)
+                    commands.append('{} {}'.format(side, line_name))
+                    commands.append('rename {}[-1] "{}"'.format(side_collection, intf_name))
+                    created[side_collection].append(intf_name)
+        commands.extend(extra_commands)
+        self._run_commands(commands)
+        plx_objects = {}
+        for collection_name, names in created.items():
+            listing = self._name_index(getattr(self._g_i, collection_name))
+            plx_objects.update({x: listing[x] for x in names if x in listing})
+        return plx_objects
+
+    def _material_names(self, material_type):
+        '''
+        Returns a dictionary {MaterialName: Plaxis name} of the materials of a type, in one call
+        '''
+        mats = self.g_i.filter(self.g_i.Materials, material_type)
+        df_mat = self._tabulate(mats, ['MaterialName'])
+        return dict(zip(df_mat.MaterialName.astype(str), df_mat.index))
+
     def draw_plate(self, filename, sheetname="PP_PlateCoord_SFormat"):
         '''
         Draws plate elements from excel.
@@ -1046,54 +1161,22 @@ class BaseProject:
             plx_plate_ele:  a dictionary of plates
             plx_plate_line: a dictionary of lines of plates
         '''
-        self.plx_plate_ele = {}; self.plx_plate_line = {}; self._plx_plate_pts = {}
-        self._plx_plate_negintf = {}; self._plx_plate_posintf = {}
-        self.plate_extract_prop()
-        df_Plate_Coord = pd.read_excel(filename, sheet_name=sheetname)
-        df_Plate_Coord.dropna(inplace = True)
-        df_Plate_Coord = df_Plate_Coord.loc[~(df_Plate_Coord==0).all(axis=1)]
-        df_Plate_Coord.set_index('MaterialName', inplace = True)
-        # print(df_Plate_Coord)
-        # Cycles through rows in dataframe
-        for ix, row in df_Plate_Coord.iterrows():
-            Pts = []
-            for key,value in zip(row.index,row.values):
-                Pts.append(value)               # Adds coordinates as a list
-            self._g_i.gotostructures()
-            element_01 = self._g_i.plate(*Pts)  # Inserts coordinates without brackets into Plaxis to draw Plate
-            element_02 = element_01[-1]         # Split list to retain Plate element entry
-            element_03 = element_01[2]          # Split list to retain Line entry
-            element_04 = []
-            element_04.append(element_01[0]); element_04.append(element_01[1]) # Split list to retain Points entry
-            plate_materialname = str(ix)
-            # print(plate_materialname)
-            # plx_Plate_Mat[plate_materialname] Reads the detailed Plaxis ID for named plate/anchor material
-            # e.g. 'S1': <AnchorMat2D {816D907F-D41F-422A-9BAE-24F3203E24BC}>
-            element_02.setmaterial(self._plx_plate[plate_materialname])  # Assigns Plate material
-            line_name = "Line_"+str(ix)
-            element_03.rename(line_name)            # Renames Line
-            plate_name = "Plate_"+str(ix)
-            element_02.rename(plate_name)           # Renames Plate
-            self.plx_plate_ele[plate_materialname]  =  element_02   # Keep Dictionary of Plates
-            self.plx_plate_line[plate_materialname] =  element_03   # Keep Dictionary of Lines of Plates
-            self._plx_plate_pts[plate_materialname]  =  element_04  # Keep Dictionary of Points of Plates
-            for i, item in enumerate(element_04):
-                pt_name = "Point_"+str(plate_name)+"_"+str(i+1)     # Renames Points
-                item.rename(pt_name)
-            # Adds interfaces
-            element_05 = self._g_i.neginterface(element_03)    
-            element_06 = self._g_i.posinterface(element_03)  
-            neginterface_name = "NegInterface_"+str(ix)
-            element_05.rename(neginterface_name)                    # Renames Interfaces
-            posinterface_name = "PosInterface_"+str(ix)
-            element_06.rename(posinterface_name) 
-            self._plx_plate_negintf = element_05                    # Keep Dictionary of Negative Interfaces
-            self._plx_plate_posintf = element_06                    # Keep Dictionary of Positive Interfaces
-        # Draws line at toe
-        Pts_toe = [(df_Plate_Coord.iloc[0,2], df_Plate_Coord.iloc[0,3]), (df_Plate_Coord.iloc[1,2], df_Plate_Coord.iloc[1,3])]
-        print(Pts_toe)
-        self._g_i.line(*Pts_toe)
-        self._g_i.rename(self._g_i.Lines[-1], "Line_WallToe")
+        df_Plate_Coord = self._read_coord_sheet(filename, sheetname, 'MaterialName')
+        materials = self._material_names('PlateMat2D')
+        # Draws line at toe, in the same batch
+        Pts_toe = [df_Plate_Coord.iloc[0,2], df_Plate_Coord.iloc[0,3], df_Plate_Coord.iloc[1,2], df_Plate_Coord.iloc[1,3]]
+        toe_commands = ['line ' + ' '.join(repr(float(x)) for x in Pts_toe),
+                        'rename Lines[-1] "Line_WallToe"']
+        plx_objects = self.build_geometry('plate', df_Plate_Coord,
+                                          materials={str(x): materials[str(x)] for x in df_Plate_Coord.index},
+                                          interfaces=True, extra_commands=toe_commands)
+        ids = [str(x) for x in df_Plate_Coord.index]
+        self.plx_plate_ele      = {x: plx_objects.get('Plate_'+x) for x in ids}   # Keep Dictionary of Plates
+        self.plx_plate_line     = {x: plx_objects.get('Line_'+x) for x in ids}    # Keep Dictionary of Lines of Plates
+        self._plx_plate_pts     = {x: [plx_objects.get('Point_Plate_{}_{}'.format(x, i)) for i in (1, 2)]
+                                   for x in ids}                                   # Keep Dictionary of Points of Plates
+        self._plx_plate_negintf = {x: plx_objects.get('NegInterface_'+x) for x in ids}
+        self._plx_plate_posintf = {x: plx_objects.get('PosInterface_'+x) for x in ids}
         self.logger.info("Nos. of Plate Elements Imported into Plaxis = " + str(len(self.plx_plate_ele)))
         return self.plx_plate_ele, self.plx_plate_line
 
@@ -1105,9 +1188,7 @@ class BaseProject:
         Return:
             None
         '''
-        self._g_i.gotostructures()
-        for x in self._g_i.plates[:]:
-            self._g_i.delete(x)
+        self.delete_objects('Plates', mode='gotostructures')
         return
 
     def draw_anchor(self, filename, sheetname="PP_AnchorCoord_SFormat"):
@@ -1119,37 +1200,16 @@ class BaseProject:
         Return:
             plx_anchor_ele:  a dictionary of n2n anchors
             plx_anchor_line: a dictionary of lines of n2n anchors
-        '''        
-        self.plx_anchor_ele = {}; self.plx_anchor_line = {}; self._plx_anchor_pts = {}
-        self.anchor_extract_prop()
-        df_Anchor_Coord = pd.read_excel(filename, sheet_name=sheetname)
-        df_Anchor_Coord.dropna(inplace = True)
-        df_Anchor_Coord = df_Anchor_Coord.loc[~(df_Anchor_Coord==0).all(axis=1)]
-        df_Anchor_Coord.set_index('MaterialName', inplace = True)
-        # Cycles through rows in dataframe
-        for ix, row in df_Anchor_Coord.iterrows():
-            Pts = []
-            for key,value in zip(row.index,row.values):
-                Pts.append(value)                   # Adds coordinates as a list
-            self._g_i.gotostructures()
-            element_01 = self._g_i.n2nanchor(*Pts)  # Inserts coordinates without brackets into Plaxis to draw Anchor
-            element_02 = element_01[-1]             # Split list to retain NodeToNodeAnchor element entry
-            element_03 = element_01[2]              # Split list to retain Line entry
-            element_04 = []
-            element_04.append(element_01[0]); element_04.append(element_01[1]) # Split list to retain Points entry
-            anchor_materialname = str(ix)
-            # print(anchor_materialname)
-            element_02.setmaterial(self._plx_anchor[anchor_materialname])      # Assigns Anchor material
-            line_name   = "Line_"+str(ix)
-            element_03.rename(line_name)                            # Renames Line
-            anchor_name = "Anchor_"+str(ix)
-            element_02.rename(anchor_name)                          # Renames Anchor
-            for i, item in enumerate(element_04):
-                pt_name = "Point_"+str(anchor_name)+"_"+str(i+1)    # Renames Points
-                item.rename(pt_name)
-            self.plx_anchor_ele[anchor_materialname]  = element_02   # Keep Dictionary of N2NAnchors
-            self.plx_anchor_line[anchor_materialname] = element_03   # Keep Dictionary of Lines of N2NAnchors
-            self._plx_anchor_pts[anchor_materialname]  = element_04  # Keep Dictionary of Points of N2NAnchors
+        '''
+        df_Anchor_Coord = self._read_coord_sheet(filename, sheetname, 'MaterialName')
+        materials = self._material_names('AnchorMat2D')
+        plx_objects = self.build_geometry('n2nanchor', df_Anchor_Coord,
+                                          materials={str(x): materials[str(x)] for x in df_Anchor_Coord.index})
+        ids = [str(x) for x in df_Anchor_Coord.index]
+        self.plx_anchor_ele  = {x: plx_objects.get('Anchor_'+x) for x in ids}    # Keep Dictionary of N2NAnchors
+        self.plx_anchor_line = {x: plx_objects.get('Line_'+x) for x in ids}      # Keep Dictionary of Lines of N2NAnchors
+        self._plx_anchor_pts = {x: [plx_objects.get('Point_Anchor_{}_{}'.format(x, i)) for i in (1, 2)]
+                                for x in ids}                                     # Keep Dictionary of Points of N2NAnchors
         self.logger.info("Nos. of Anchor Elements Imported into Plaxis = " + str(len(self.plx_anchor_ele)))
         return self.plx_anchor_ele, self.plx_anchor_line
 
@@ -1161,9 +1221,7 @@ class BaseProject:
         Return:
             None
         '''
-        self._g_i.gotostructures()
-        for x in self._g_i.n2nanchor[:]:
-            self._g_i.delete(x)
+        self.delete_objects('NodeToNodeAnchors', mode='gotostructures')
 
     def draw_lineload(self, filename, sheetname="PP_LineLoad_SFormat", lineload_value=-20.0):
         '''
@@ -1175,42 +1233,18 @@ class BaseProject:
         Return:
             plx_lineload_ele:  a dictionary of lineloads
             plx_lineload_line: a dictionary of lines of lineloads
-        '''        
-        self.plx_lineload_ele = {}; self.plx_lineload_line = {}; self._plx_lineload_pts = {}  
-        df_LineLoad_Coord = pd.read_excel(filename, sheet_name=sheetname)
-        df_LineLoad_Coord.dropna(inplace = True)
-        df_LineLoad_Coord = df_LineLoad_Coord.loc[~(df_LineLoad_Coord==0).all(axis=1)]
-        df_LineLoad_Coord.set_index('LineLoadName', inplace = True)
-        # Cycles through rows in dataframe
-        for ix, row in df_LineLoad_Coord.iterrows():
-            Pts = []
-            for key,value in zip(row.index,row.values):
-                Pts.append(value)                   # Adds coordinates as a list
-            self._g_i.gotostructures()
-            element_01 = self._g_i.lineload(*Pts)   # Inserts coordinates without brackets into Plaxis to draw LineLoad
-            element_02 = element_01[-1]             # Split list to retain LineLoad entry
-            element_03 = element_01[2]              # Split list to retain Line entry
-            element_04 = []
-            element_04.append(element_01[0]); element_04.append(element_01[1])  # Split list to retain Points entry
-            lineload_name = str(ix)
-            # print(element_01, element_02, element_03, element_04, lineload_name)
-            self._g_i.set(element_02.qy_start, lineload_value)                  # Assigns Lineload value
-            line_name     = "Line_"+str(ix)
-            element_03.rename(line_name)                             # Renames Line
-            lineload_name = "LineLoad_"+str(ix)
-            element_02.rename(lineload_name)                         # Renames Lineload
-            for i, item in enumerate(element_04):
-                pt_name = "Point_"+str(lineload_name)+"_"+str(i+1)   # Renames Points
-                item.rename(pt_name)
-            self.plx_lineload_ele[lineload_name]  = element_02  # Keep dictionary of Lineload
-            self.plx_lineload_line[lineload_name] = element_03  # Keep dictionary of Lines of Lineload
-            self._plx_lineload_pts[lineload_name] = element_04  # Keep dictionary of Points of Lineload
-        # print(self.plx_lineload_ele)
-        group_line = [*self.plx_lineload_ele.values()]
-        group_name = str(lineload_name)
-        group_name = "Group_"+str(group_name[:group_name.index("_")])+"s"
-        # print(group_line, group_name)
-        self._g_i.group(group_line).rename(group_name)
+        '''
+        df_LineLoad_Coord = self._read_coord_sheet(filename, sheetname, 'LineLoadName')
+        names = ['LineLoad_'+str(x) for x in df_LineLoad_Coord.index]
+        # Groups the lineloads in the same batch
+        group_commands = ['group ' + ' '.join(names), 'rename Groups[-1] "Group_LineLoads"']
+        plx_objects = self.build_geometry('lineload', df_LineLoad_Coord, lineload_value=lineload_value,
+                                          extra_commands=group_commands)
+        ids = [str(x) for x in df_LineLoad_Coord.index]
+        self.plx_lineload_ele  = {'LineLoad_'+x: plx_objects.get('LineLoad_'+x) for x in ids}  # Keep dictionary of Lineload
+        self.plx_lineload_line = {'LineLoad_'+x: plx_objects.get('Line_'+x) for x in ids}      # Keep dictionary of Lines of Lineload
+        self._plx_lineload_pts = {'LineLoad_'+x: [plx_objects.get('Point_LineLoad_{}_{}'.format(x, i)) for i in (1, 2)]
+                                  for x in ids}                                                # Keep dictionary of Points of Lineload
         self.logger.info("Nos. of LineLoads Imported into Plaxis = " + str(len(self.plx_lineload_ele)))
         return self.plx_lineload_ele, self.plx_lineload_line
 
@@ -1222,9 +1256,7 @@ class BaseProject:
         Return:
             None
         '''
-        self._g_i.gotostructures()
-        for x in self._g_i.lineloads[:]:
-            self._g_i.delete(x)
+        self.delete_objects('LineLoads', mode='gotostructures')
 
     def draw_rect_poly(rect_dep, rect_wid, ref_x, ref_y):
         '''
@@ -1255,30 +1287,12 @@ class BaseProject:
         Return:
             None
         '''
-        self._plx_exc_line = {}; self._plx_exc_pts = {}
-        df_Exc_Coord = pd.read_excel(filename, sheet_name=sheetname)
-        df_Exc_Coord.dropna(inplace = True)
-        df_Exc_Coord = df_Exc_Coord.loc[~(df_Exc_Coord==0).all(axis=1)]
-        df_Exc_Coord.set_index('ExcavationLevel', inplace = True)
-        # Cycles through rows in dataframe
-        for ix, row in df_Exc_Coord.iterrows():
-            Pts = []
-            for key,value in zip(row.index,row.values):
-                Pts.append(value)              # Adds coordinates as a list
-            self._g_i.gotostructures()
-            element_01 = self._g_i.line(*Pts)  # Inserts coordinates without brackets into Plaxis to draw Line
-            element_02 = element_01[-1]        # Split list to retain Line entry
-            element_03 = []
-            element_03.append(element_01[0]); element_03.append(element_01[1]) # Split list to retain Points entry
-            exc_ID = str(ix)
-            # print(exc_ID)
-            line_name   = "Line_"+str(ix)
-            element_02.rename(line_name)                             # Renames Line
-            for i, item in enumerate(element_03):
-                pt_name = "Point_"+str(line_name)+"_"+str(i+1)   # Renames Points
-                item.rename(pt_name)
-            self._plx_exc_line[exc_ID] =  element_02  # Keep Dictionary of Lines of Line
-            self._plx_exc_pts[exc_ID]  =  element_03  # Keep Dictionary of Points of Lines
+        df_Exc_Coord = self._read_coord_sheet(filename, sheetname, 'ExcavationLevel')
+        plx_objects = self.build_geometry('line', df_Exc_Coord)
+        ids = [str(x) for x in df_Exc_Coord.index]
+        self._plx_exc_line = {x: plx_objects.get('Line_'+x) for x in ids}   # Keep Dictionary of Lines of Line
+        self._plx_exc_pts  = {x: [plx_objects.get('Point_Line_{}_{}'.format(x, i)) for i in (1, 2)]
+                              for x in ids}                                  # Keep Dictionary of Points of Lines
         self.logger.info("Nos. of Excavation Levels Imported into Plaxis = " + str(len(self._plx_exc_line)))
         return
 
@@ -1291,24 +1305,10 @@ class BaseProject:
         Return:
             None
         '''
-        self._plx_dewtr_line = {}
-        df_Dewtr_Coord = pd.read_excel(filename, sheet_name=sheetname)
-        df_Dewtr_Coord.dropna(inplace = True)
-        df_Dewtr_Coord = df_Dewtr_Coord.loc[~(df_Dewtr_Coord==0).all(axis=1)]
-        df_Dewtr_Coord.set_index('DewaterLevel', inplace = True)
-        # Cycles through rows in dataframe
-        for ix, row in df_Dewtr_Coord.iterrows():
-            Pts = []
-            for key,value in zip(row.index,row.values):
-                Pts.append(value)                    # Adds coordinates as a list
-            self._g_i.gotoflow()
-            element_01 = self._g_i.waterlevel(*Pts)  # Inserts coordinates to draw water level
-            dewtr_ID = str(ix)
-            # print(dewtr_ID)
-            dewtr_name   = "UserWaterLvl_"+str(ix)
-            element_01.rename(dewtr_name)            # Renames UserWaterLevel
-            self._plx_dewtr_line[dewtr_ID] =  element_01  # Keep Dictionary of UserWaterLevel
-        # print(self._plx_dewtr_line)
+        df_Dewtr_Coord = self._read_coord_sheet(filename, sheetname, 'DewaterLevel')
+        plx_objects = self.build_geometry('waterlevel', df_Dewtr_Coord)
+        # Keep Dictionary of UserWaterLevel
+        self._plx_dewtr_line = {str(x): plx_objects.get('UserWaterLvl_'+str(x)) for x in df_Dewtr_Coord.index}
         self.logger.info("Nos. of UserWaterLevels Imported into Plaxis = " + str(len(self._plx_dewtr_line)))
         return
 
@@ -1341,21 +1341,9 @@ class BaseProject:
             path - path to the data of plaxis
             b_plot: True - plot a graph of points; False - no plot
         example:
-        >>> ponits_from_meshinfo('data.meshinfo',b_plot=True)
+        >>> points_from_meshinfo('data.meshinfo',b_plot=True)
         '''
-        with open(os.path.join(path, 'data.meshinfo')) as fin:
-            meshdata = fin.read()
-        points_block = re.findall(r'POINTS((.|\n)*?)CURVES', meshdata)[0][0]
-        points_str_list = points_block.strip().split('\n')
-        df_points = pd.DataFrame(dict(x=[], y=[], z=[]))
-        geometry = []
-        for point_str in points_str_list:
-            m = re.search(r'(P.*) =.*\((.*),(.*),(.*)\)', point_str)
-            df_points.loc[m.group(1), 'x'] = float(m.group(2))
-            df_points.loc[m.group(1), 'y'] = float(m.group(3))
-            df_points.loc[m.group(1), 'z'] = float(m.group(4))
-            geometry.append(Point(float(m.group(2)), float(m.group(3))))
-        gdf = gpd.GeoDataFrame(df_points, geometry=geometry)
+        gdf = load_mesh(path).points_gdf()
         if plot:
             gdf.plot(figsize=(10, 10), color='k', marker='o', markersize=3)
         return gdf
@@ -1372,34 +1360,16 @@ class BaseProject:
         example:
         >>> curve_from_meshinfo('data.meshinfo',b_plot=True)
         '''
-        points_gdf = BaseProject.ponits_from_meshinfo(path)
-        import pandas as pd
-        with open(os.path.join(path, 'data.meshinfo')) as fin:
-            meshdata = fin.read()
-        curves_block = re.findall(r'CURVES((.|\n)*?)SURFACES', meshdata)[0][0]
-        curve_str_list = curves_block.strip().split('\n')
-        df_curves = pd.DataFrame(dict(pt1=[], pt2=[]))
-        for curve_str in curve_str_list:
-            m = re.search(r'(C.*) =.*\((.*),(.*)\)', curve_str)
-            df_curves.loc[m.group(1), 'pt1'] = m.group(2).strip()
-            df_curves.loc[m.group(1), 'pt2'] = m.group(3).strip()
-        # form the curve below
-        geometry = []
-        for ix, row in df_curves.iterrows():
-            pt1_ix, pt2_ix = row['pt1'], row['pt2']
-            pt1 = points_gdf.loc[pt1_ix, 'geometry']
-            pt2 = points_gdf.loc[pt2_ix, 'geometry']
-            geometry.append(LineString([pt1, pt2]))
-        curves_gdf = gpd.GeoDataFrame(df_curves, geometry=geometry)
+        mesh = load_mesh(path)
+        curves_gdf = mesh.curves_gdf()
         if plot is True:
-            ax = points_gdf.plot(figsize=(20, 20), color='b',
-                                 marker='o', markersize=5)
+            ax = mesh.points_gdf().plot(figsize=(20, 20), color='b',
+                                        marker='o', markersize=5)
             curves_gdf.plot(ax=ax, color='k')
         return curves_gdf
 
     def delete_all_materials(self):
-        for mat in self.g_i.materials:
-            self.g_i.delete(mat)
+        self.delete_objects('Materials')
 
     @staticmethod
     def polygon_from_meshinfo(path, plot=True):
@@ -1413,39 +1383,7 @@ class BaseProject:
         example:
         >>> polygon_from_meshinfo('data.meshinfo',b_plot=True)
         '''
-        curves_gdf = BaseProject.curve_from_meshinfo(path)
-        with open(os.path.join(path, 'data.meshinfo')) as fin:
-            meshdata = fin.read()
-        surface_block = re.findall(
-            r'SURFACES((.|\n)*?)INTERFACE_ELEMENTS', meshdata)[0][0]
-        surface_str_list = surface_block.strip().split('\n')
-        polygon_ID = []
-        geometry = []
-        for surface in surface_str_list:
-            m = re.search(r'(S.*) =.*\((.*)\)', surface)
-            polygon_ID.append(m.group(1))
-            list = m.group(2).strip().split(',')
-            list = [x.strip() for x in list]
-            # let's form the polygon here
-            polygon_vertices = []
-            for ix, line in enumerate(list):
-                if '-' in line:
-                    line_ends = curves_gdf.loc[line[1:]
-                                               ]['geometry'].coords[:][::-1]
-                else:
-                    line_ends = curves_gdf.loc[line]['geometry'].coords[:]
-                if ix == 0:
-                    polygon_vertices.append(line_ends[0])
-                    polygon_vertices.append(line_ends[1])
-                else:
-                    polygon_vertices.append(line_ends[1])
-            geometry.append(Polygon(polygon_vertices))
-        #     print(list)
-        polygon_gdf = gpd.GeoDataFrame(dict(ID=polygon_ID, geometry=geometry))
-        polygon_gdf['area'] = polygon_gdf.area
-        polygon_gdf['centroid'] = polygon_gdf.centroid
-        polygon_gdf.set_index('ID', inplace=True)
-        return polygon_gdf
+        return load_mesh(path).polygons_gdf()
 
 #================================================================================================================================================================
 #   'FLOW CONDITIONS' TAB FUNCTIONS
@@ -1466,24 +1404,16 @@ class BaseProject:
         Return:
             None
         '''
-        dewtr_extX  = (self._dfg_Poly_Extract_BB['BB_xmin']>=dewtr_xmin) & \
-                      (self._dfg_Poly_Extract_BB['BB_xmax']<=dewtr_xmax)
-        df_poly01   = self._dfg_Poly_Extract_BB.loc[dewtr_extX]
-        # Set Clusters above dewtr_uwlvl to Dry
-        dry_extY      = (df_poly01['BB_ymax']<=dewtr_ymax) & (df_poly01['BB_ymin']>=exc_lvl)
-        df_dewtr_poly = df_poly01.loc[dry_extY]
+        index = self._soil_index()
+        # Set Clusters above excavation level to Dry
         self._g_i.gotowater()
-        for ix, row in df_dewtr_poly.iterrows():
-            if row['PolygonName'] in self._plx_soilpoly.keys():
-                self._g_i.setwaterdry(self._plx_soilpoly[row['PolygonName']], Phase_exc)
-        # Set Clusters above dewtr_uwlvl to Dry
-        dewtr_extY    = (df_poly01['BB_ymax']<=exc_lvl) & (df_poly01['BB_ymin']>=dewtr_ymin)
-        df_dewtr_poly = []
-        df_dewtr_poly = df_poly01.loc[dewtr_extY]
-        self._g_i.gotowater()
-        for ix, row in df_dewtr_poly.iterrows():
-            if row['PolygonName'] in self._plx_soilpoly.keys():
-                self._g_i.setwaterlevel(self._plx_soilpoly[row['PolygonName']], Phase_exc, dewtr_uwlvl)
+        for name in index.in_box(dewtr_xmin, exc_lvl, dewtr_xmax, dewtr_ymax):
+            if name in self._plx_soilpoly.keys():
+                self._g_i.setwaterdry(self._plx_soilpoly[name], Phase_exc)
+        # Set Clusters below excavation level to dewatering UserWaterLevel
+        for name in index.in_box(dewtr_xmin, dewtr_ymin, dewtr_xmax, exc_lvl):
+            if name in self._plx_soilpoly.keys():
+                self._g_i.setwaterlevel(self._plx_soilpoly[name], Phase_exc, dewtr_uwlvl)
         self.logger.info("Dewatering Set in Plaxis Model Phase: ")
         return
 
@@ -1581,6 +1511,27 @@ class BaseProject:
         self.logger.info("Safety Calculation Type [Phase_"+str(PhaseNew)+"] Added: "+str(PhaseName))
         return
 
+    def apply_phase_plan(self, plan):
+        '''
+        Creates and updates phases from a declarative PhasePlan.
+        The plan is diffed against the phases in Plaxis (read in one 'tabulate' call) and the
+        last applied plan, and only the commands that change something are sent, in one batch.
+        Param:
+            plan: PhasePlan
+        Return:
+            A list of names of the phases created or changed
+        '''
+        self._g_i.gotostages()
+        existing = self._tabulate(self._g_i.Phases, PhasePlan.TABULATED)
+        commands, touched = plan.compile(existing, self._applied_phase_plan)
+        if commands:
+            self._run_commands(commands)
+        self._applied_phase_plan = plan.copy()
+        self._touched_phases = touched
+        self.logger.info("Phase plan applied, {} commands sent, phases touched: {}".format(
+                         len(commands), ', '.join(touched) if touched else 'None'))
+        return touched
+
     def phase_extract(self):
         '''
         Extracts phases into a dictionary.
@@ -1646,10 +1597,7 @@ class BaseProject:
             None
         '''
         # Read excavation levels
-        df_Exc_Coord = pd.read_excel(filename, sheet_name=exc_sheetname)
-        df_Exc_Coord.dropna(inplace=True)
-        df_Exc_Coord = df_Exc_Coord.loc[~(df_Exc_Coord == 0).all(axis=1)]
-        df_Exc_Coord.set_index('ExcavationLevel', inplace=True)
+        df_Exc_Coord = self._read_coord_sheet(filename, exc_sheetname, 'ExcavationLevel')
         # Get total number of excavation phases
         total_exc = len(df_Exc_Coord)
         # Get last excavation phase
@@ -1685,17 +1633,10 @@ class BaseProject:
         Return:
             None
         '''
-        exc_extX    = (self._dfg_Poly_Extract_BB['BB_xmin']>=exc_xmin) & \
-                      (self._dfg_Poly_Extract_BB['BB_xmax']<=exc_xmax)
-        df_poly01   = self._dfg_Poly_Extract_BB.loc[exc_extX]
-        
-        exc_extY    = (df_poly01['BB_ymax']<=exc_ymax) & (df_poly01['BB_ymin']>=exc_ymin)
-        df_exc_poly = df_poly01.loc[exc_extY]
-        
         self._g_i.gotostages()
-        for ix, row in df_exc_poly.iterrows():
-            if row['PolygonName'] in self._plx_soilpoly.keys():
-                self._g_i.deactivate(self._plx_soilpoly[row['PolygonName']], Phase_exc)
+        for name in self._soil_index().in_box(exc_xmin, exc_ymin, exc_xmax, exc_ymax):
+            if name in self._plx_soilpoly.keys():
+                self._g_i.deactivate(self._plx_soilpoly[name], Phase_exc)
         self.logger.info("Excavation Added to Plaxis Model Phase: ")
         return
 
@@ -1716,22 +1657,13 @@ class BaseProject:
         self.phase_extract()
         self.soilpoly_extract_df()
         # Read excavation levels
-        df_Exc_Coord = pd.read_excel(filename, sheet_name=exc_sheetname)
-        df_Exc_Coord.dropna(inplace = True)
-        df_Exc_Coord = df_Exc_Coord.loc[~(df_Exc_Coord==0).all(axis=1)]
-        df_Exc_Coord.set_index('ExcavationLevel', inplace = True)
+        df_Exc_Coord = self._read_coord_sheet(filename, exc_sheetname, 'ExcavationLevel')
         # print(df_Exc_Coord, df_Exc_Coord.drop(df_Exc_Coord.index[[0]]))
         # Read anchor levels
-        df_Anchor_Coord = pd.read_excel(filename, sheet_name=anchor_sheetname)
-        df_Anchor_Coord.dropna(inplace = True)
-        df_Anchor_Coord = df_Anchor_Coord.loc[~(df_Anchor_Coord==0).all(axis=1)]
-        df_Anchor_Coord.set_index('MaterialName', inplace = True)    
+        df_Anchor_Coord = self._read_coord_sheet(filename, anchor_sheetname, 'MaterialName')
         # print(df_Anchor_Coord)    
         # Read dewater levels
-        df_Dewtr_Coord = pd.read_excel(filename, sheet_name=dewtr_sheetname)
-        df_Dewtr_Coord.dropna(inplace = True)
-        df_Dewtr_Coord = df_Dewtr_Coord.loc[~(df_Dewtr_Coord==0).all(axis=1)]
-        df_Dewtr_Coord.set_index('DewaterLevel', inplace = True)
+        df_Dewtr_Coord = self._read_coord_sheet(filename, dewtr_sheetname, 'DewaterLevel')
         # print(df_Dewtr_Coord)
 
         self._g_i.gotostages()
@@ -1816,6 +1748,42 @@ class BaseProject:
             phase.ShouldCalculate = True
         return
 
+    def shouldcalc_affected(self, plan=None, changed_objects=(), changed_phases=None):
+        '''
+        Sets only the phases affected by a change to be calculated, all other phases keep their results.
+        The phases left out are recorded in 'self.skipped_phases'.
+        Param:
+            plan:            PhasePlan describing the phases. Default = None, i.e. the last applied plan
+            changed_objects: names of the model objects or settings changed since the last calculation,
+                             e.g. ['LineLoad_1', 'SoilMat_Clay']
+            changed_phases:  names of the phases whose settings changed. Default = None, i.e. the
+                             phases touched by the last 'apply_phase_plan'
+        Return:
+            A list of names of the phases to be calculated
+        '''
+        plan = plan if plan is not None else self._applied_phase_plan
+        if plan is None:
+            self.logger.info("No phase plan available, all phases will be calculated")
+            self.allshouldcalc()
+            self.skipped_phases = []
+            self._touched_phases = []
+            return None
+        if changed_phases is None:
+            changed_phases = self._touched_phases
+        self._g_i.gotostages()
+        phase_names = list(self._tabulate(self._g_i.Phases, ['Identification']).index)
+        if any(not plan.users(x) for x in changed_objects):
+            affected = phase_names      # e.g. the mesh or a soil material, InitialPhase included
+        else:
+            affected = plan.affected(changed_objects, changed_phases)
+        commands = ['set {}.ShouldCalculate {}'.format(x, x in affected) for x in phase_names]
+        self._run_commands(commands)
+        self._touched_phases = []       # covered by this selection, not to be marked again
+        self.skipped_phases = [x for x in phase_names if x not in affected]
+        self.logger.info("Phases to be calculated: {}; skipped: {}".format(
+                         len(phase_names) - len(self.skipped_phases), len(self.skipped_phases)))
+        return [x for x in phase_names if x in affected]
+
     def runcalc(self):
         '''
         Runs Calculate.
@@ -1823,6 +1791,7 @@ class BaseProject:
         self._g_i.gotostages()
         t0 = time.time()
         self._g_i.calculate()
+        self.clear_soil_results()       # results of the previous calculation are stale
         t1 = time.time()
         self.logger.info("Calculation Runtime (mins): "+str(round((t1 - t0)/60, 2)))
         return
@@ -1840,35 +1809,14 @@ class BaseProject:
             Pandas DataFrame containing information of anchor force 
         '''
         phase = getattr(self._g_o, phase)
-        F = np.array(self.g_o.getresults(phase,
-                                         self.g_o.ResultTypes.NodeToNodeAnchor.AnchorForce2D, 'node'))
-        Fmax = np.array(self.g_o.getresults(phase,
-                                            self.g_o.ResultTypes.NodeToNodeAnchor.AnchorForceMax2D, 'node'))
-        x = np.array(self.g_o.getresults(
-            phase, self.g_o.ResultTypes.NodeToNodeAnchor.X, 'node'))
-        y = np.array(self.g_o.getresults(
-            phase, self.g_o.ResultTypes.NodeToNodeAnchor.Y, 'node'))
-        df = pd.DataFrame(dict(x=[], y=[], F=[], Fmax=[]))
-        df.x = x
-        df.y = y
-        df.F = F
-        df.Fmax = Fmax
-        # put the two end points at the same row
-        df_start = df.iloc[0:-1:2, :]
-        df_end = df.iloc[1:-1:2, :]
-        ix = 0
-        df_anchor = pd.DataFrame(
-            dict(xa=[], ya=[], xb=[], yb=[], F=[], Fmax=[]))
-        for xa, ya, xb, yb, fa, fb, fmax in zip(df_start.x, df_start.y, df_end.x, df_end.y, df_start.F, df_end.F, df_start.Fmax):
-            #import pdb; pdb.set_trace()
-            # we always put the left point as xa
-            if xa > xb:
-                xa, xb = xb, xa
-                ya, yb = yb, ya
-            # we want make sure the two points form the same anchor by checking the force.
-            assert(abs(fa-fb) < 1e-6)
-            df_anchor.loc[ix] = [xa, ya, xb, yb, fa, fmax]
-            ix += 1
+        rtypes = self.g_o.ResultTypes.NodeToNodeAnchor
+        pairs = results.pair_anchor_ends(
+            np.array(self.g_o.getresults(phase, rtypes.MaterialID, 'node')),
+            np.array(self.g_o.getresults(phase, rtypes.X, 'node')),
+            np.array(self.g_o.getresults(phase, rtypes.Y, 'node')),
+            dict(F=self.g_o.getresults(phase, rtypes.AnchorForce2D, 'node'),
+                 Fmax=self.g_o.getresults(phase, rtypes.AnchorForceMax2D, 'node')))
+        df_anchor = pd.DataFrame(pairs)[['xa', 'ya', 'xb', 'yb', 'F', 'Fmax']]
         return df_anchor.sort_values(by='ya', ascending=False)
 
     #----Private Method-----------------------------#
@@ -1881,7 +1829,7 @@ class BaseProject:
             filename:  name of the excel file
             sheetname: name of worksheet that contains the BH information
         '''
-        df_BH_Data = pd.read_excel(filename, sheet_name=sheetname)
+        df_BH_Data = self._read_sheet(filename, sheetname)
         # Column named 'BH_name' as the index of rows
         df_BH_Data.set_index('BH_name', inplace=True)
         df_BH_Data1 = df_BH_Data.drop(df_BH_Data.columns[df_BH_Data.columns.str.contains('Unnamed',
@@ -1890,6 +1838,129 @@ class BaseProject:
         self._dfg_BH_Data = df_BH_Data1[df_BH_Data1.MaterialName != 0]
         return self._dfg_BH_Data
 
+    def _read_sheet(self, filename, sheetname):
+        '''
+        Reads a worksheet of a standard input workbook. Each workbook is parsed once, see workbook.read_workbook
+        Param:
+            filename:  full file name of the workbook, including path
+            sheetname: name of worksheet
+        Return:
+            A dataframe of the worksheet
+        '''
+        return workbook.read_sheet(filename, sheetname)
+
+    def _read_coord_sheet(self, filename, sheetname, index_col):
+        '''
+        Reads a standard coordinate worksheet, with incomplete and all-zero (unused) rows removed.
+        Param:
+            filename:  full file name of the workbook, including path
+            sheetname: name of worksheet, e.g. "PP_PlateCoord_SFormat"
+            index_col: name of the column used as index of rows, e.g. 'MaterialName'
+        Return:
+            A dataframe of the coordinates
+        '''
+        df = self._read_sheet(filename, sheetname)
+        df.dropna(inplace=True)
+        df = df.loc[~(df == 0).all(axis=1)]
+        df.set_index(index_col, inplace=True)
+        return df
+
+    def _name_index(self, collection):
+        '''
+        Returns a dictionary {name: Plaxis object} of a collection, e.g. g_i.Plates, from two calls:
+        one 'tabulate' for the names and one slice for the objects, both in the same order.
+        '''
+        return dict(zip(self._object_names(collection), collection[:]))
+
+    def _object_names(self, objects):
+        '''
+        Returns the names of a collection or list of Plaxis objects, in their order, from one 'tabulate' call
+        '''
+        lines = [x for x in str(self._g_i.tabulate(objects, 'Name')).split('\n') if x.strip() != '']
+        return [x.split('\t')[0].strip() for x in lines[1:]]
+
+    def _count(self, objects):
+        '''
+        Returns the number of objects in a collection from one 'count' call
+        '''
+        read_nos = self._g_i.count(objects)
+        return int(read_nos[:read_nos.rfind(" items")])
+
+    @staticmethod
+    def _parse_bounding_box(boxes):
+        '''
+        Parses Plaxis bounding boxes, e.g. 'min: (0; -10; 0) max: (5; 0; 0)', in one vectorised pass.
+        Param:
+            boxes: pandas series of bounding box strings
+        Return:
+            A float dataframe with columns xmin, ymin, xmax, ymax
+        '''
+        bb = boxes.astype(str).str.extract(
+            r'min: \((?P<xmin>[^;]*); *(?P<ymin>[^;]*);[^)]*\) max: \((?P<xmax>[^;]*); *(?P<ymax>[^;]*);')
+        return bb.apply(pd.to_numeric, errors='coerce')
+
+    def _run_commands(self, commands):
+        '''
+        Sends a list of Plaxis commands to Input in a single request.
+        Param:
+            commands: list of command strings, e.g. ['gotostages', 'phase InitialPhase']
+        Return:
+            The replies of Plaxis, one per command
+        '''
+        return self._s_i.call_and_handle_commands(*commands)
+
+    def _tabulate(self, objects, properties=None, phase=None):
+        '''
+        Runs the Plaxis 'tabulate' command, i.e. one server call for any number of objects.
+        Param:
+            objects:    Plaxis object or list of objects, e.g. g_i.SoilPolygons
+            properties: list of property names. Default = None, i.e. all properties
+            phase:      phase for staged properties, e.g. 'Active'. Default = None
+        Return:
+            A typed dataframe indexed by the object name, see '_parse_tabulate'
+        '''
+        args = [objects]
+        if properties is not None:
+            args.append(' '.join(properties))
+        if phase is not None:
+            args.append(phase)
+        return BaseProject._parse_tabulate(self._g_i.tabulate(*args))
+
+    @staticmethod
+    def _parse_tabulate(text):
+        '''
+        Parses the tab-separated text returned by 'tabulate' into a dataframe.
+        The first line is the header and the first column holds the object names.
+        Numeric columns are cast to int/float, 'True'/'False' columns to bool and 'N/A' to NaN.
+        Param:
+            text: output of g_i.tabulate
+        Return:
+            A typed dataframe indexed by the object name
+        '''
+        lines  = [x.rstrip('\r') for x in str(text).split('\n') if x.strip() != '']
+        header = [x.strip() for x in lines[0].split('\t')]
+        rows   = [x.split('\t') for x in lines[1:]]
+        rows   = [(x + [''] * len(header))[:len(header)] for x in rows]  # pad ragged rows
+        df = pd.DataFrame(rows, columns=header)
+        df = df.apply(lambda col: col.str.strip())
+        df = df.replace({'N/A': np.nan, '': np.nan})
+        df.set_index(header[0], inplace=True)
+        df.index.name = None
+        for col in df.columns:
+            values = df[col].dropna()
+            if len(values) == 0:
+                continue
+            if values.isin(['True', 'False']).all():
+                df[col] = df[col].map({'True': True, 'False': False})
+                continue
+            numeric = pd.to_numeric(df[col], errors='coerce')
+            if numeric[df[col].notna()].notna().all():
+                if (numeric.notna().all()) and (numeric == np.round(numeric)).all() and \
+                   not values.str.contains(r'[.eE]').any():
+                    numeric = numeric.astype(np.int64)
+                df[col] = numeric
+        return df
+
     #--------Properties--------------------------------------------------
 
     @property
@@ -0,0 +1,181 @@
+# Import Python libraries
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+
+
+class BranchExecutor:
+    '''
+    Runs sweep cases that share their first phases and differ only in the later ones.
+    The shared prefix is calculated once and saved as a checkpoint, every variant is then
+    forked from a copy of the checkpoint and only its own phases are calculated, so the
+    checkpoint itself is never written to.
+    Checkpoints are kept in 'checkpoint_dir' and the least recently used ones are deleted
+    once the folder grows beyond 'budget_bytes'.
+    '''
+
+    def __init__(self, proj, checkpoint_dir, budget_bytes=20 * 1024**3, suffix='.p2dx'):
+        '''
+        Param:
+            proj:           BaseProject connected to Plaxis Input
+            checkpoint_dir: folder holding the checkpoint files
+            budget_bytes:   disk budget of the checkpoints. Default = 20 GB
+            suffix:         suffix of plaxis file, i.e. ".p3D" or ".p2dx"
+        '''
+        self.proj = proj
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        self.budget_bytes = budget_bytes
+        self.suffix = suffix
+        self.logger = logging.getLogger(__name__)
+        self._index_file = self.checkpoint_dir / 'checkpoints.json'
+        self._index = {}
+        if self._index_file.exists():
+            with open(self._index_file, 'r') as fin:
+                self._index = json.load(fin)
+
+    @staticmethod
+    def prefix_key(prefix, model_key):
+        '''
+        Returns the checkpoint name of a shared prefix.
+        Param:
+            prefix:    PhasePlan of the shared phases
+            model_key: string identifying the model the phases run on, e.g. a hash of the geometry and
+                       material inputs. Required, so different models never share a checkpoint
+        '''
+        if not model_key:
+            raise ValueError('A model key is needed to tell the checkpoints of different models apart')
+        text = json.dumps([model_key] + [[x.name, x.signature()] for x in prefix.ordered()])
+        return 'ckpt_' + hashlib.sha1(text.encode()).hexdigest()[:16]
+
+    def run(self, prefix, variants, model_key, build=None, output_dir=None):
+        '''
+        Calculates the shared prefix once (or reuses its checkpoint) and forks every variant from it.
+        Param:
+            prefix:     PhasePlan of the phases shared by all variants
+            variants:   dictionary {variant name: PhasePlan of the phases specific to the variant},
+                        the first phase of a variant starts from a phase of the prefix
+            model_key:  string identifying the model built by 'build', part of the checkpoint key
+            build:      callable taking the project, building geometry, materials and mesh.
+                        Only called when the prefix has no checkpoint yet
+            output_dir: folder where each variant is copied from the checkpoint and calculated, as
+                        '<variant name><suffix>'. Default = None, i.e. a scratch copy that is overwritten
+        Return:
+            A dictionary {variant name: list of names of the phases calculated}
+        '''
+        key = self.prefix_key(prefix, model_key)
+        if not self._has_checkpoint(key):
+            self.logger.info("Calculating shared phases for checkpoint " + key)
+            if build is not None:
+                build(self.proj)
+            self.proj.apply_phase_plan(prefix)
+            self.proj.allshouldcalc()
+            self.proj.runcalc()
+            self.proj.savecopy(str(self.checkpoint_dir), key, self.suffix)
+            self._register(key)
+            self._evict(keep=key)
+        else:
+            self.logger.info("Reusing checkpoint " + key)
+        calculated = {}
+        workdir = Path(output_dir) if output_dir is not None else self.checkpoint_dir / 'scratch'
+        for name, variant in variants.items():
+            self._touch(key)
+            filename = name if output_dir is not None else 'variant'
+            self._fork(key, workdir, filename)
+            self.proj.restore(str(workdir), filename, self.suffix)
+            plan = prefix.copy()
+            for spec in variant.ordered():
+                plan.add(spec)
+            self.proj._applied_phase_plan = prefix.copy()      # state saved in the checkpoint
+            touched = self.proj.apply_phase_plan(plan)
+            calculated[name] = self.proj.shouldcalc_affected(plan, changed_phases=touched)
+            self.proj.runcalc()         # results are saved into the copy
+            self.logger.info("Variant {} calculated from checkpoint, {} phases skipped".format(
+                             name, len(self.proj.skipped_phases)))
+        return calculated
+
+    def clear(self):
+        '''
+        Deletes all checkpoints
+        '''
+        for key in list(self._index):
+            self._delete(key)
+        self._save_index()
+
+    #----Private Method-----------------------------#
+
+    def _paths(self, key):
+        '''
+        Returns the plaxis file and its data folder of a checkpoint
+        '''
+        fileloc = Path(self.checkpoint_dir, key).with_suffix(self.suffix)
+        return fileloc, fileloc.with_suffix(self.suffix + 'dat')
+
+    def _fork(self, key, dirname, filename):
+        '''
+        Copies the plaxis file and data folder of a checkpoint to '<dirname>/<filename><suffix>',
+        replacing an older copy
+        '''
+        source, source_data = self._paths(key)
+        target = Path(dirname, filename).with_suffix(self.suffix)
+        target_data = target.with_suffix(self.suffix + 'dat')
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if target_data.exists():
+            shutil.rmtree(target_data)
+        shutil.copy2(source, target)
+        if source_data.exists():
+            shutil.copytree(source_data, target_data)
+        return target
+
+    def _has_checkpoint(self, key):
+        return key in self._index and self._paths(key)[0].exists()
+
+    def _size(self, key):
+        size = 0
+        for path in self._paths(key):
+            if path.is_file():
+                size += path.stat().st_size
+            elif path.is_dir():
+                for root, dirs, files in os.walk(path):
+                    size += sum(os.path.getsize(os.path.join(root, x)) for x in files)
+        return size
+
+    def _register(self, key):
+        self._index[key] = dict(size=self._size(key), last_used=time.time())
+        self._save_index()
+
+    def _touch(self, key):
+        self._index[key]['size'] = self._size(key)
+        self._index[key]['last_used'] = time.time()
+        self._save_index()
+
+    def _delete(self, key):
+        fileloc, datafolder = self._paths(key)
+        if fileloc.exists():
+            fileloc.unlink()
+        if datafolder.exists():
+            shutil.rmtree(datafolder)
+        self._index.pop(key, None)
+        self.logger.info("Checkpoint deleted: " + key)
+
+    def _evict(self, keep=None):
+        '''
+        Deletes the least recently used checkpoints until the folder fits in the disk budget
+        '''
+        total = sum(x['size'] for x in self._index.values())
+        for key in sorted(self._index, key=lambda x: self._index[x]['last_used']):
+            if total <= self.budget_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self._index[key]['size']
+            self._delete(key)
+        self._save_index()
+
+    def _save_index(self):
+        with open(self._index_file, 'w') as fout:
+            json.dump(self._index, fout, indent=2)
@@ -0,0 +1,175 @@
+# Import Python libraries
+import numpy as np
+try:
+    import shapely
+    from shapely.strtree import STRtree
+except ImportError:
+    STRtree = None
+    print('shapely not installed!')
+
+
+class MeshInterpolator:
+    '''
+    Interpolates nodal results of the soil elements at any point on the client side, so slices, profiles
+    and grids of thousands of points need one download of the mesh instead of one call per point.
+    The elements are straight-sided Lagrange triangles of any order (15-noded: order 4, 6-noded: order 2).
+    The local numbering of Plaxis is not needed: corners and the lattice position of every node are
+    recovered from the node coordinates, and the shape functions are written in area coordinates
+        N_ijk = l_i(L1) * l_j(L2) * l_k(L3),   l_m(L) = prod_{q<m} (p*L - q) / (q + 1),   i + j + k = p
+    '''
+
+    def __init__(self, xy, order=None):
+        '''
+        Param:
+            xy:    array (elements x nodes per element x 2) of the node coordinates of every element
+            order: row order of the results, i.e. results[order] lists them element by element.
+                   Default = None, i.e. the results come element by element already
+        '''
+        self.xy = np.asarray(xy, dtype=np.float64)
+        n_el, n_nodes = self.xy.shape[:2]
+        p = int(round((np.sqrt(8 * n_nodes + 1) - 3) / 2))
+        if (p + 1) * (p + 2) // 2 != n_nodes:
+            raise ValueError('{} nodes per element is not a triangle'.format(n_nodes))
+        self.p = p
+        self.order = order
+        self._corners = self._find_corners()
+        self._lattice = self._find_lattice()
+        self._tree = None
+
+    @classmethod
+    def from_results(cls, x, y, element_id):
+        '''
+        Builds the interpolator from nodal results read element by element, e.g.
+        getresults(phase, ResultTypes.Soil.X/Y/ElementID, 'node'). Rows are grouped by element.
+        '''
+        element_id = np.asarray(element_id)
+        order = np.argsort(element_id, kind='stable')
+        counts = np.unique(element_id, return_counts=True)[1]
+        if len(counts) == 0 or (counts != counts[0]).any():
+            raise ValueError('Nodal results are not listed element by element')
+        xy = np.column_stack([np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)])[order]
+        return cls(xy.reshape(len(counts), counts[0], 2), order)
+
+    @classmethod
+    def from_output(cls, g_o, phase):
+        '''
+        Downloads the soil mesh of a phase from Plaxis Output, three 'getresults' calls in total
+        '''
+        soil = g_o.ResultTypes.Soil
+        return cls.from_results(g_o.getresults(phase, soil.X, 'node'),
+                                g_o.getresults(phase, soil.Y, 'node'),
+                                g_o.getresults(phase, soil.ElementID, 'node'))
+
+    def _find_corners(self):
+        '''
+        Returns an array (elements x 3) of the local indices of the corner nodes.
+        The node farthest from the centre is a corner, the one farthest from it another,
+        and the one farthest from the line through both the last.
+        '''
+        xy = self.xy
+        rows = np.arange(len(xy))
+        centre = xy.mean(axis=1, keepdims=True)
+        a = np.argmax(((xy - centre) ** 2).sum(axis=2), axis=1)
+        b = np.argmax(((xy - xy[rows, a][:, None]) ** 2).sum(axis=2), axis=1)
+        ab = xy[rows, b] - xy[rows, a]
+        ap = xy - xy[rows, a][:, None]
+        c = np.argmax(np.abs(ab[:, None, 0] * ap[:, :, 1] - ab[:, None, 1] * ap[:, :, 0]), axis=1)
+        return np.column_stack([a, b, c])
+
+    def _area_coordinates(self, points, elements):
+        '''
+        Returns an array (points x 3) of the area coordinates of points in their elements
+        '''
+        corners = self.xy[elements[:, None], self._corners[elements]]        # points x 3 x 2
+        v1 = corners[:, 1] - corners[:, 0]
+        v2 = corners[:, 2] - corners[:, 0]
+        vp = points - corners[:, 0]
+        det = v1[:, 0] * v2[:, 1] - v1[:, 1] * v2[:, 0]
+        l2 = (vp[:, 0] * v2[:, 1] - vp[:, 1] * v2[:, 0]) / det
+        l3 = (v1[:, 0] * vp[:, 1] - v1[:, 1] * vp[:, 0]) / det
+        return np.column_stack([1.0 - l2 - l3, l2, l3])
+
+    def _find_lattice(self):
+        '''
+        Returns an int array (elements x nodes x 3) of the lattice position (i, j, k) of every node
+        '''
+        n_el, n_nodes = self.xy.shape[:2]
+        elements = np.repeat(np.arange(n_el), n_nodes)
+        area = self._area_coordinates(self.xy.reshape(-1, 2), elements)
+        return np.rint(area * self.p).astype(np.int64).reshape(n_el, n_nodes, 3)
+
+    def _basis(self, area, lattice):
+        '''
+        Returns an array (points x nodes) of the shape functions at area coordinates 'area' (points x 3)
+        '''
+        p = self.p
+        basis = np.ones(lattice.shape[:2])
+        for axis in range(3):
+            L = area[:, axis][:, None]
+            m = lattice[:, :, axis]
+            for q in range(p):
+                factor = (p * L - q) / (q + 1)
+                basis *= np.where(m > q, factor, 1.0)
+        return basis
+
+    def locate(self, points):
+        '''
+        Finds the element holding each point through an STRtree over the element triangles.
+        Return:
+            An int64 array (points) of element indices, -1 for points outside the mesh
+        '''
+        if STRtree is None:
+            raise ImportError('shapely is needed to locate points in the mesh')
+        if self._tree is None:
+            rows = np.arange(len(self.xy))
+            corners = self.xy[rows[:, None], self._corners]
+            self._tree = STRtree(shapely.polygons(corners))
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        ipt, iel = self._tree.query(shapely.points(points), predicate='intersects')
+        elements = np.full(len(points), -1, dtype=np.int64)
+        # keep the first element for points on shared edges
+        order = np.lexsort((iel, ipt))
+        ipt, iel = ipt[order], iel[order]
+        hit, first = np.unique(ipt, return_index=True)
+        elements[hit] = iel[first]
+        return elements
+
+    def weights(self, points):
+        '''
+        Returns what is needed to interpolate any result at the points, to be reused across result types.
+        Return:
+            elements: int64 array (points) of element indices, -1 outside the mesh
+            basis:    array (points x nodes per element) of the shape functions, NaN outside the mesh
+        '''
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        elements = self.locate(points)
+        inside = elements >= 0
+        basis = np.full((len(points), self.xy.shape[1]), np.nan)
+        if inside.any():
+            area = self._area_coordinates(points[inside], elements[inside])
+            basis[inside] = self._basis(area, self._lattice[elements[inside]])
+        return elements, basis
+
+    def interpolate(self, values, points=None, weights=None):
+        '''
+        Interpolates nodal results at points.
+        Param:
+            values:  nodal results in the order read from Plaxis, or a dictionary {name: results}
+            points:  array (n x 2) of coordinates
+            weights: output of 'weights' for the same points, instead of 'points'
+        Return:
+            A float array (n), NaN outside the mesh, or a dictionary {name: array} if 'values' is a dictionary
+        '''
+        if weights is None:
+            weights = self.weights(points)
+        if isinstance(values, dict):
+            return {k: self.interpolate(v, weights=weights) for k, v in values.items()}
+        elements, basis = weights
+        nodal = np.asarray(values, dtype=np.float64)
+        if self.order is not None:
+            nodal = nodal[self.order]
+        nodal = nodal.reshape(self.xy.shape[:2])
+        results = np.full(len(elements), np.nan)
+        inside = elements >= 0
+        results[inside] = (basis[inside] * nodal[elements[inside]]).sum(axis=1)
+        return results
@@ -0,0 +1,321 @@
+# Import Python libraries
+import hashlib
+import json
+import logging
+import os
+import shutil
+import numpy as np
+import pandas as pd
+try:
+    import shapely
+except ImportError:
+    shapely = None
+try:
+    import geopandas as gpd
+except ImportError:
+    gpd = None
+
+logger = logging.getLogger(__name__)
+
+# Sections of data.meshinfo parsed into arrays. Every other section is kept as raw entries, i.e. lists of
+# (name, [arguments as strings]): their entries differ in length and type and nothing reads them in bulk
+GEOMETRY_SECTIONS = ('POINTS', 'CURVES', 'SURFACES')
+
+# Suffix of the folder caching the parsed mesh topology next to the .p2dxdat folder, one .npy file per array
+CACHE_SUFFIX = '.meshcache'
+CACHE_ARRAYS = ('point_ids', 'points', 'curve_ids', 'curves', 'surface_ids', 'surface_ptr',
+                'surface_curves', 'surface_flip', 'ring_ptr', 'ring_points')
+
+
+class MeshTopology:
+    '''
+    Geometry of a Plaxis model as written in data.meshinfo, held in contiguous arrays:
+        point_ids:      array (n) of point names, e.g. 'P_1'
+        points:         float64 array (n x 3) of point coordinates
+        curve_ids:      array (m) of curve names
+        curves:         int32 array (m x 2) of the indices of the end points of each curve
+        surface_ids:    array (k) of surface names
+        surface_ptr:    int64 array (k + 1), curves of surface i are surface_curves[surface_ptr[i]:surface_ptr[i+1]]
+        surface_curves: int32 array of curve indices, CSR layout
+        surface_flip:   bool array, True where a curve is used reversed (written '-C_1')
+        sections:       dictionary {section name: list of (name, arguments)} of the other sections,
+                        left as parsed strings (name is None for entries without '=')
+    GeoDataFrames are only built when asked for, and then kept.
+    '''
+
+    def __init__(self, point_ids, points, curve_ids, curves, surface_ids, surface_ptr, surface_curves,
+                 surface_flip, sections=None):
+        self.point_ids      = np.asarray(point_ids, dtype=object)
+        self.points         = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self.curve_ids      = np.asarray(curve_ids, dtype=object)
+        self.curves         = np.asarray(curves, dtype=np.int32).reshape(-1, 2)
+        self.surface_ids    = np.asarray(surface_ids, dtype=object)
+        self.surface_ptr    = np.asarray(surface_ptr, dtype=np.int64)
+        self.surface_curves = np.asarray(surface_curves, dtype=np.int32)
+        self.surface_flip   = np.asarray(surface_flip, dtype=bool)
+        self.sections       = sections if sections is not None else {}
+        self._gdf = {}
+        self._rings = None
+
+    def rings(self):
+        '''
+        Returns the closed boundary of every surface as point indices, in CSR layout.
+        Return:
+            ring_ptr:    int64 array (k + 1), ring i is ring_points[ring_ptr[i]:ring_ptr[i+1]]
+            ring_points: int32 array of point indices, first point repeated at the end
+        '''
+        if self._rings is None:
+            ends   = self.curves[self.surface_curves]
+            start  = np.where(self.surface_flip, ends[:, 1], ends[:, 0])
+            finish = np.where(self.surface_flip, ends[:, 0], ends[:, 1])
+            first  = self.surface_ptr[:-1]
+            ring_points = np.insert(finish, first, start[first]).astype(np.int32)
+            ring_ptr    = self.surface_ptr + np.arange(len(self.surface_ptr))
+            self._rings = (ring_ptr, ring_points)
+        return self._rings
+
+    def _shoelace(self):
+        '''
+        Returns the signed area and the first moments of every surface, computed over the rings
+        '''
+        if len(self.surface_ids) == 0:
+            return np.zeros(0), np.zeros(0), np.zeros(0)
+        ring_ptr, ring_points = self.rings()
+        xy   = self.points[ring_points, :2]
+        x0, y0 = xy[:-1, 0], xy[:-1, 1]
+        x1, y1 = xy[1:, 0], xy[1:, 1]
+        cross  = x0 * y1 - x1 * y0
+        # Drop the segments joining one ring to the next
+        valid  = np.ones(len(cross), dtype=bool)
+        valid[ring_ptr[1:-1] - 1] = False
+        cross  = np.where(valid, cross, 0.0)
+        segment_start = ring_ptr[:-1]
+        area2 = np.add.reduceat(cross, segment_start)
+        mx    = np.add.reduceat(cross * (x0 + x1), segment_start)
+        my    = np.add.reduceat(cross * (y0 + y1), segment_start)
+        return area2 / 2.0, mx, my
+
+    def areas(self):
+        '''
+        Returns the area of every surface, without building polygons
+        '''
+        return np.abs(self._shoelace()[0])
+
+    def centroids(self):
+        '''
+        Returns an array (k x 2) of the centroids of every surface, without building polygons
+        '''
+        area, mx, my = self._shoelace()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.column_stack([mx / (6.0 * area), my / (6.0 * area)])
+
+    def bounds(self):
+        '''
+        Returns an array (k x 4) of the bounding boxes of every surface, columns xmin, ymin, xmax, ymax
+        '''
+        if len(self.surface_ids) == 0:
+            return np.zeros((0, 4))
+        ring_ptr, ring_points = self.rings()
+        xy = self.points[ring_points, :2]
+        start = ring_ptr[:-1]
+        return np.column_stack([np.minimum.reduceat(xy[:, 0], start), np.minimum.reduceat(xy[:, 1], start),
+                                np.maximum.reduceat(xy[:, 0], start), np.maximum.reduceat(xy[:, 1], start)])
+
+    def points_gdf(self):
+        '''
+        Returns a GeoDataFrame of the points indexed by point name, columns x, y, z
+        '''
+        if 'points' not in self._gdf:
+            df = pd.DataFrame(self.points, columns=['x', 'y', 'z'], index=self.point_ids)
+            self._gdf['points'] = gpd.GeoDataFrame(df, geometry=shapely.points(self.points[:, :2]))
+        return self._gdf['points']
+
+    def curves_gdf(self):
+        '''
+        Returns a GeoDataFrame of the curves indexed by curve name, columns pt1, pt2 (point names)
+        '''
+        if 'curves' not in self._gdf:
+            df = pd.DataFrame(dict(pt1=self.point_ids[self.curves[:, 0]], pt2=self.point_ids[self.curves[:, 1]]),
+                              index=self.curve_ids)
+            coords = self.points[self.curves.ravel(), :2]
+            geometry = shapely.linestrings(coords, indices=np.repeat(np.arange(len(self.curves)), 2))
+            self._gdf['curves'] = gpd.GeoDataFrame(df, geometry=geometry)
+        return self._gdf['curves']
+
+    def polygons_gdf(self):
+        '''
+        Returns a GeoDataFrame of the surfaces indexed by surface name (ID), columns geometry, area, centroid
+        '''
+        if 'polygons' not in self._gdf:
+            ring_ptr, ring_points = self.rings()
+            owner = np.repeat(np.arange(len(self.surface_ids)), np.diff(ring_ptr))
+            rings = shapely.linearrings(self.points[ring_points, :2], indices=owner)
+            polygon_gdf = gpd.GeoDataFrame(dict(ID=self.surface_ids, geometry=shapely.polygons(rings)))
+            polygon_gdf['area'] = polygon_gdf.area
+            polygon_gdf['centroid'] = polygon_gdf.centroid
+            polygon_gdf.set_index('ID', inplace=True)
+            self._gdf['polygons'] = polygon_gdf
+        return self._gdf['polygons']
+
+
+def read_meshinfo(path):
+    '''
+    Reads data.meshinfo in a single streaming pass, without holding the whole file in memory.
+    Param:
+        path: path to the data folder of plaxis (.p2dxdat), or to the meshinfo file itself
+    Return:
+        A MeshTopology
+    '''
+    filename = path if os.path.isfile(path) else os.path.join(path, 'data.meshinfo')
+    point_ids, coords = [], []
+    curve_ids, curve_ends = [], []
+    surface_ids, surface_refs, surface_len = [], [], []
+    sections = {}
+    section = None
+    with open(filename) as fin:
+        for line in fin:
+            line = line.strip()
+            if not line:
+                continue
+            token = line.split()[0]
+            if '=' not in line and token.isupper() and token.replace('_', '').isalpha():
+                section = token                 # section header, e.g. 'POINTS'
+                if section not in GEOMETRY_SECTIONS:
+                    sections.setdefault(section, [])
+                continue
+            if '=' not in line:
+                if section is not None and section not in GEOMETRY_SECTIONS:
+                    sections[section].append((None, line.split()))
+                continue
+            name, _, value = line.partition('=')
+            args = value[value.find('(') + 1:value.rfind(')')].split(',')
+            if section == 'POINTS':
+                point_ids.append(name.strip())
+                coords.append(args)
+            elif section == 'CURVES':
+                curve_ids.append(name.strip())
+                curve_ends.append(args)
+            elif section == 'SURFACES':
+                surface_ids.append(name.strip())
+                surface_refs.extend(args)
+                surface_len.append(len(args))
+            elif section is not None:
+                sections[section].append((name.strip(), [x.strip() for x in args]))
+    points = np.array(coords, dtype=np.float64).reshape(-1, 3)
+    # Replace names by indices through one lookup table per section
+    point_index = {x: i for i, x in enumerate(point_ids)}
+    curves = np.array([[point_index[x.strip()] for x in ends] for ends in curve_ends],
+                      dtype=np.int32).reshape(-1, 2)
+    curve_index = {x: i for i, x in enumerate(curve_ids)}
+    refs = [x.strip() for x in surface_refs]
+    surface_flip = np.array([x.startswith('-') for x in refs], dtype=bool)
+    surface_curves = np.array([curve_index[x.lstrip('-')] for x in refs], dtype=np.int32)
+    surface_ptr = np.concatenate([[0], np.cumsum(surface_len, dtype=np.int64)])
+    return MeshTopology(point_ids, points, curve_ids, curves, surface_ids, surface_ptr, surface_curves,
+                        surface_flip, sections)
+
+
+def load_mesh(path, cache=True):
+    '''
+    Returns the mesh topology of a model, memory-mapped from the cache next to the .p2dxdat folder
+    when it is up to date, otherwise parsed with 'read_meshinfo' and written to the cache.
+    The cache is invalidated when Plaxis rewrites data.meshinfo: the modification time and size are
+    checked first and the sha1 hash of the file only when they differ, so a touched but unchanged
+    file does not trigger a new parse.
+    Param:
+        path:  path to the data folder of plaxis (.p2dxdat)
+        cache: False to always parse the file. Default = True
+    Return:
+        A MeshTopology, its arrays are read-only when loaded from the cache
+    '''
+    filename = os.path.join(path, 'data.meshinfo')
+    if not cache:
+        return read_meshinfo(filename)
+    cache_dir = str(path).rstrip('/\\') + CACHE_SUFFIX
+    stat = os.stat(filename)
+    stamp = dict(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+    manifest = _read_manifest(cache_dir)
+    if manifest is not None:
+        fresh = manifest.get('mtime_ns') == stamp['mtime_ns'] and manifest.get('size') == stamp['size']
+        if not fresh and manifest.get('sha1') == _file_hash(filename):
+            fresh = True
+            manifest.update(stamp)      # same content, only the stamp moved
+            _write_manifest(cache_dir, manifest)
+        if fresh:
+            try:
+                return _load_cache(cache_dir, manifest)
+            except (OSError, ValueError) as e:   # a damaged cache is simply rebuilt
+                logger.warning("Mesh cache ignored ({}): {}".format(e, cache_dir))
+    mesh = read_meshinfo(filename)
+    try:
+        _write_cache(cache_dir, mesh, dict(stamp, sha1=_file_hash(filename)))
+    except OSError as e:
+        logger.warning("Mesh cache not written: {}".format(e))
+    return mesh
+
+
+def clear_mesh_cache(path):
+    '''
+    Deletes the mesh cache of the data folder of plaxis 'path'
+    '''
+    cache_dir = str(path).rstrip('/\\') + CACHE_SUFFIX
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
+
+
+def _file_hash(filename, blocksize=1 << 20):
+    sha = hashlib.sha1()
+    with open(filename, 'rb') as fin:
+        for block in iter(lambda: fin.read(blocksize), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _read_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, 'manifest.json'), 'r') as fin:
+            return json.load(fin)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(cache_dir, manifest):
+    with open(os.path.join(cache_dir, 'manifest.json'), 'w') as fout:
+        json.dump(manifest, fout, indent=2)
+
+
+def _write_cache(cache_dir, mesh, manifest):
+    '''
+    Writes the arrays of a MeshTopology as .npy files into a temporary folder, then swaps it in
+    '''
+    ring_ptr, ring_points = mesh.rings()
+    arrays = dict(point_ids=mesh.point_ids.astype(str), points=mesh.points,
+                  curve_ids=mesh.curve_ids.astype(str), curves=mesh.curves,
+                  surface_ids=mesh.surface_ids.astype(str), surface_ptr=mesh.surface_ptr,
+                  surface_curves=mesh.surface_curves, surface_flip=mesh.surface_flip,
+                  ring_ptr=ring_ptr, ring_points=ring_points)
+    tmp_dir = cache_dir + '.tmp'
+    if os.path.isdir(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    for key in CACHE_ARRAYS:
+        np.save(os.path.join(tmp_dir, key + '.npy'), arrays[key])
+    with open(os.path.join(tmp_dir, 'sections.json'), 'w') as fout:
+        json.dump(mesh.sections, fout)
+    _write_manifest(tmp_dir, manifest)
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
+    os.replace(tmp_dir, cache_dir)
+    logger.info("Mesh cache written: " + cache_dir)
+
+
+def _load_cache(cache_dir, manifest):
+    arrays = {key: np.load(os.path.join(cache_dir, key + '.npy'), mmap_mode='r') for key in CACHE_ARRAYS}
+    with open(os.path.join(cache_dir, 'sections.json'), 'r') as fin:
+        sections = {k: [tuple(x) for x in v] for k, v in json.load(fin).items()}
+    mesh = MeshTopology(arrays['point_ids'], arrays['points'], arrays['curve_ids'], arrays['curves'],
+                        arrays['surface_ids'], arrays['surface_ptr'], arrays['surface_curves'],
+                        arrays['surface_flip'], sections)
+    mesh._rings = (arrays['ring_ptr'], arrays['ring_points'])
+    logger.info("Mesh loaded from cache: " + cache_dir)
+    return mesh
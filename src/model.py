@@ -6,6 +6,8 @@ from src.geoplot import GEOPlot
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
+from phaseplan import PhasePlan, PhaseSpec
+import results
 
 
 def flatten_dict(dictionary):
@@ -20,19 +22,9 @@ def flatten_dict(dictionary):
 
 
 def post_process(proj, filename):
-    df = pd.DataFrame()
-    ix = 0
     g_o = proj._g_o
-    for phase in g_o.Phases:
-        if phase.Name.value == 'InitialPhase':
-            continue
-        else:
-            for step in phase.Steps:
-                val = g_o.getcurveresults(
-                    g_o.Curvepoints.Nodes[0], step, g_o.ResultTypes.Soil.Utot)
-                df.loc[ix, 'y'] = val
-                df.loc[ix, 'time'] = step.Reached.Time.value
-                ix += 1
+    hist = results.curve_histories(g_o, [g_o.Curvepoints.Nodes[0]], ['Soil.Utot'])
+    df = pd.DataFrame(dict(y=hist.values['Soil.Utot'][0], time=hist.time))
     proj._s_o.close()
     fig = GEOPlot.get_figure()
     fig.add_trace(go.Scatter(x=df.time, y=df.y*1000, line=dict(color='black')))
@@ -139,17 +131,15 @@ def build_model(proj,
 
 
 def build_stages(proj, step_size=3, n_step=12):
-    # Construct Stages
-    g_i = proj._g_i
-    g_i.gotostages()
-    n_stage = n_step
-    for i in range(1, n_stage):
-        this_phase = g_i.phase(g_i.Phases[-1])
-        this_phase.Identification = 'Consolidation'
-        this_phase.DeformCalcType = 'Consolidation'
-        this_phase.TimeInterval = step_size**i
-        this_phase.Identification = f'Consolidation at {step_size**i} days'
-        g_i.activate(g_i.LineLoads,this_phase)
-        g_i.activate(g_i.Drains, this_phase)
-        g_i.activate(g_i.GroundwaterFlowBCs, this_phase)
-        g_i.activate(g_i.Plates,this_phase)
+    # Construct Stages, only the phases that differ from the model are sent to Plaxis
+    plan = PhasePlan()
+    parent = 'InitialPhase'
+    for i in range(1, n_step):
+        this_phase = plan.add(PhaseSpec(f'Phase_{i}', parent,
+                                        identification=f'Consolidation at {step_size**i} days',
+                                        calc_type='Consolidation',
+                                        time_interval=step_size**i,
+                                        activate=['LineLoads', 'Drains', 'GroundwaterFlowBCs', 'Plates']))
+        parent = this_phase.name
+    proj.apply_phase_plan(plan)
+    return plan
@@ -2,6 +2,7 @@
 import csv
 import collections
 import enum
+import hashlib
 import imp
 import logging
 import math
@@ -22,6 +23,8 @@ except ImportError:
     print('geopandas not installed!')
 from pathlib import Path
 from plxscripting.plx_scripting_exceptions import PlxScriptingError
+import results
+import resultstore
 
 
 __version__ = 1.0
@@ -58,6 +61,11 @@ class OutputBase:
         self._s_i, self._g_i = self._new_server(host, 10000)
         self._s_o, self._g_o = self._new_server(host, 10001)
         self._model_geometry = {}
+        self._node_geometry = {}     # {(result category, phase name, or None if shared): (x, y)}, see _node_coords
+        self._updated_mesh = {}      # {phase name: True if the phase uses updated mesh}
+        self._results_cache = results.ResultCache()
+        self._project_key = None     # key of the project open in Output in the result cache, '' if unknown
+        self._anchor_ids = True      # False once Plaxis has no element/node IDs for anchors
         self._model_phases = pd.DataFrame(dict(name=[], ID=[], plxobj=[]))
         self.plx_file_path = ''
         # Define a namedtuple for solvertype
@@ -99,9 +107,117 @@ class OutputBase:
         pathformat = Path(dirname, basename).with_suffix(suffix)
         fileloc    = str(pathformat)
         self._s_o.open(fileloc)
+        self.clear_geometry_cache()     # new file, new mesh
+        self._project_key = self._output_project_key() or ''
         self.logger.info("Plaxis file opened: " + fileloc)
         return
 
+    def configure_results_cache(self, budget_bytes=512 * 1024**2, spill_dir=None):
+        '''
+        Sets up the cache of getresults
+        Param:
+            budget_bytes: memory kept for results, least recently used results are evicted beyond it
+            spill_dir:    folder where evicted results are saved as .npy and read back. Default = None, i.e. dropped
+        '''
+        self._results_cache = results.ResultCache(budget_bytes, spill_dir)
+
+    def getresults(self, phase, result_type, location='node', step=None, cache=True):
+        '''
+        Cached g_o.getresults. Results are kept by (project, phase, step, result type, location),
+        so reading the same result again does not call Plaxis Output. The project is the file open in
+        Plaxis Output and its modification time, read once when the file is opened (restore_o) or after
+        clear_geometry_cache; when they cannot be read, results are not cached.
+        Param:
+            phase:       Plaxis phase, e.g. g_o.Phases[-1]
+            result_type: name of the result type, e.g. 'Soil.Uy', or the Plaxis result type
+            location:    'node' or 'stresspoint'
+            step:        Plaxis step of the phase. Default = None, i.e. the end of the phase
+            cache:       False to read from Plaxis without keeping the result, e.g. when streaming steps
+        Return:
+            A read-only numpy array
+        '''
+        target = phase if step is None else step
+        if cache and self._project_key is None:
+            self._project_key = self._output_project_key() or ''
+        if not cache or not self._project_key:
+            return np.array(self.g_o.getresults(target, results.result_type(self.g_o, result_type), location))
+        key = (self._project_key, str(phase), str(step), str(result_type), location)
+        values = self._results_cache.get(key)
+        if values is None:
+            values = self._results_cache.put(key, self.g_o.getresults(
+                target, results.result_type(self.g_o, result_type), location))
+        return values
+
+    def _output_project_key(self):
+        '''
+        Returns a key of the project open in Plaxis Output, made of its file path and the latest
+        modification time of the file and its data folder, or None if the file cannot be found
+        '''
+        try:
+            fileloc = str(self.g_o.Project.Filename.value)
+        except (AttributeError, PlxScriptingError):
+            return None
+        if not fileloc or not os.path.isfile(fileloc):
+            return None
+        stamps = [os.stat(fileloc).st_mtime_ns]
+        datadir = fileloc + 'dat'       # e.g. Testing123.p2dx -> Testing123.p2dxdat
+        if os.path.isdir(datadir):
+            stamps += [x.stat().st_mtime_ns for x in os.scandir(datadir) if x.is_file()]
+        return hashlib.sha1('{}|{}'.format(fileloc, max(stamps)).encode()).hexdigest()[:16]
+
+    def iter_phases(self, phases=None):
+        '''
+        Yields the phases one at a time. Coordinates kept for a phase of its own (updated mesh) are
+        dropped once the caller moves on, so a loop over the phases holds one phase at a time.
+        Param:
+            phases: list of phases. Default = None, i.e. all phases
+        '''
+        for phase in (self.g_o.Phases[:] if phases is None else phases):
+            yield phase
+            name = str(phase)
+            for key in [x for x in self._node_geometry if x[1] == name]:
+                del self._node_geometry[key]
+
+    def iter_steps(self, phases=None, steps=True):
+        '''
+        Yields (label, phase, step) for every step of the phases, see iter_phases.
+        Labels are 'phase name/step number', e.g. 'Phase_3/12'.
+        Param:
+            phases: list of phases. Default = None, i.e. all phases
+            steps:  False to yield the end of each phase only, as (phase name, phase, None)
+        '''
+        for phase in self.iter_phases(phases):
+            if not steps:
+                yield str(phase), phase, None
+                continue
+            for i, step in enumerate(phase.Steps[:]):
+                yield '{}/{}'.format(phase, i), phase, step
+
+    def iter_result_chunks(self, phase, result_types, location='node', step=None, chunk_size=1 << 16):
+        '''
+        Yields the results of a phase or step in blocks of fixed size, see results.result_chunks.
+        The results are not kept in the result cache.
+        Param:
+            phase:        Plaxis phase, e.g. g_o.Phases[-1]
+            result_types: names of the result types, e.g. ['Soil.Ux', 'Soil.Uy'], one column each
+            location:     'node' or 'stresspoint'
+            step:         Plaxis step of the phase. Default = None, i.e. the end of the phase
+            chunk_size:   rows per block
+        Yield:
+            results.Chunk(start, total, block), block a float64 array (rows x result types)
+        '''
+        return results.result_chunks(self.g_o, phase if step is None else step, result_types,
+                                     location, chunk_size)
+
+    def clear_geometry_cache(self):
+        '''
+        Forgets the node coordinates kept by _node_coords and the key of the project open in Output,
+        e.g. after the model has been meshed again
+        '''
+        self._node_geometry.clear()
+        self._updated_mesh.clear()
+        self._project_key = None
+
     def _get_usr_info(self):
         '''
         FOR PASSWORD PROTECTED CONNECTION TO PLAXIS - TO BE DEVELOPED
@@ -157,6 +273,19 @@ class OutputBase:
         logger.setLevel(logging.DEBUG)
         return logger
 
+    def export_results(self, root, **kwargs):
+        '''
+        Writes the results of all phases to a columnar store, to be queried offline through
+        resultstore.ResultStore without Plaxis. See resultstore.export_results for the options.
+        Param:
+            root: folder of the store
+        Return:
+            A ResultStore
+        '''
+        store = resultstore.export_results(self.g_o, root, **kwargs)
+        self.logger.info("Results exported to " + str(root))
+        return store
+
     def save_temp_files():
         pass
 
@@ -179,6 +308,104 @@ class OutputBase:
         else:
             return self._get_n2nanchor_forces_one_phase(phases)
 
+    def get_anchor_force_table(self, phases):
+        '''
+        Gets the forces of all node-to-node anchors in all phases as one long-format table
+        Param:
+            phases: list of phases, e.g. g_o.Phases[1:]
+        Return:
+            A dataframe with columns phase, anchor, anchor_name, xa, ya, xb, yb, node_a, node_b, F, Fmin, Fmax,
+            see results.anchor_table
+        '''
+        phase_pairs = collections.OrderedDict()
+        for phase in phases:
+            phase_pairs[str(phase)] = self._anchor_pairs(phase)
+        return results.anchor_table(phase_pairs)
+
+    def get_anchor_force_matrix(self, phases, value='F'):
+        '''
+        Gets the force of every node-to-node anchor in every phase as an (anchor x phase) matrix,
+        with the envelope over the phases
+        Param:
+            phases: list of phases, e.g. g_o.Phases[1:]
+            value:  'F', 'Fmin' or 'Fmax'
+        Return:
+            matrix:   dataframe (anchor x phase) of the forces, NaN where an anchor is not active
+            envelope: dataframe (anchor) of min, max and the phases where they occur
+        '''
+        return results.pivot_anchor_forces(self.get_anchor_force_table(phases), value)
+
+    def get_envelopes(self, phases=None, groups=None, steps=False):
+        '''
+        Gets the envelopes of structural forces, i.e. max and min per node over all phases (or steps) and
+        the phase (or step) where they occur. Results are read and reduced one phase or step at a time,
+        so memory stays proportional to the number of nodes.
+        Param:
+            phases: list of phases. Default = None, i.e. all phases
+            groups: dictionary of the structures followed, see results.ENVELOPE_GROUPS. Default = None, i.e. all
+            steps:  True to follow every step of every phase, False for the end of each phase
+        Return:
+            A dictionary {group: results.Envelope}, see Envelope.to_frame for a table
+        '''
+        groups = results.ENVELOPE_GROUPS if groups is None else groups
+        envelopes = {group: results.Envelope(quantities) for group, (category, quantities) in groups.items()}
+        node_ids = {}       # {category: (x, ids)}, node IDs from the full coordinates of a phase
+        for label, phase, step in self.iter_steps(phases, steps):
+            for group, (category, quantities) in groups.items():
+                rtypes = [category + '.' + q for q in quantities]
+                try:
+                    for start, total, block in self.iter_result_chunks(phase, rtypes, step=step):
+                        if start == 0:
+                            x, y = self._node_coords(phase, category, total)
+                            if category not in node_ids or node_ids[category][0] is not x:
+                                node_ids[category] = (x, results.position_ids(x, y))
+                            ids = node_ids[category][1]
+                        stop = start + len(block)
+                        envelopes[group].update(label, dict(zip(quantities, block.T)),
+                                                x[start:stop], y[start:stop], ids[start:stop])
+                except (AttributeError, PlxScriptingError):     # no such structure in this phase
+                    continue
+        return envelopes
+
+    def get_node_histories(self, points, result_types=('Soil.Utot',), phases=None, skip_initial=True):
+        '''
+        Gets the time histories of the soil nodes nearest to points over all steps, for points that are
+        not curve points. Steps are read one at a time and only the nodes followed are kept.
+        Param:
+            points:       array (n x 2) of coordinates
+            result_types: names of the nodal result types, e.g. ['Soil.Ux', 'Soil.Uy']
+            phases:       list of phases. Default = None, i.e. all phases
+            skip_initial: skip the InitialPhase. Default = True
+        Return:
+            A results.History, values of the nodes in the order of the points
+        '''
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        phase_names, phase_ix, times, columns = [], [], [], []
+        current, nodes = None, None
+        for label, phase, step in self.iter_steps(phases):
+            name = str(phase)
+            if skip_initial and name == 'InitialPhase':
+                continue
+            if name != current:
+                current = name
+                phase_names.append(name)
+                nodes = None
+            column = np.empty((len(points), len(result_types)))
+            for start, total, block in self.iter_result_chunks(phase, result_types, step=step):
+                if nodes is None:       # nodes of the phase, from the coordinates going with its results
+                    x, y = self._node_coords(phase, 'Soil', total)
+                    nodes = np.array([np.argmin((x - px) ** 2 + (y - py) ** 2) for px, py in points],
+                                     dtype=np.int64)
+                inside = (nodes >= start) & (nodes < start + len(block))
+                column[inside] = block[nodes[inside] - start]
+            columns.append(column)
+            phase_ix.append(len(phase_names) - 1)
+            times.append(step.Reached.Time.value)
+        data = np.stack(columns, axis=2) if columns else np.empty((len(points), len(result_types), 0))
+        values = {str(x): data[:, i, :] for i, x in enumerate(result_types)}
+        return results.History(phase_names, np.asarray(phase_ix, dtype=np.int32),
+                               np.asarray(times, dtype=np.float64), values)
+
     def get_material_df(self, phase) -> pd.DataFrame:
         '''
         Returns a dataframe of materials used in a particular phase specified by the 'phase'
@@ -227,44 +454,67 @@ class OutputBase:
         Return: 
             Pandas dataframe containing information of anchor forces
         '''
-        anchor_name = np.array(self.g_o.getresults(
-                                phase, self.g_o.ResultTypes.NodeToNodeAnchor.MaterialID, 'node'))
-        F    = np.array(self.g_o.getresults(
-                        phase, self.g_o.ResultTypes.NodeToNodeAnchor.AnchorForce2D, 'node'))
-        Fmin = np.array(self.g_o.getresults(
-                        phase, self.g_o.ResultTypes.NodeToNodeAnchor.AnchorForceMin2D, 'node'))
-        Fmax = np.array(self.g_o.getresults(
-                        phase, self.g_o.ResultTypes.NodeToNodeAnchor.AnchorForceMax2D, 'node'))
-        x    = np.array(self.g_o.getresults(
-                        phase, self.g_o.ResultTypes.NodeToNodeAnchor.X, 'node'))
-        y    = np.array(self.g_o.getresults(
-                        phase, self.g_o.ResultTypes.NodeToNodeAnchor.Y, 'node'))
-        df   = pd.DataFrame(dict(anchor_name=[], x=[], y=[], F=[], Fmin=[], Fmax=[]))
-        df.anchor_name = anchor_name
-        df.x = x ; df.y = y
-        df.F = F; df.Fmin = Fmin; df.Fmax = Fmax
-        # print(df)
-        # Put the two end points at the same row
-        df_start = df.iloc[0::2, :]
-        df_end   = df.iloc[1::2, :]
-        ix = 0
-        # print(df_start)
-        # print(df_end)
-        df_anchor_o = pd.DataFrame(dict(anchor_name=[], xa=[], ya=[], xb=[], yb=[], F=[], Fmin=[], Fmax=[]))
-        for anchor_name, xa, ya, xb, yb, fa, fb, fmin, fmax in zip(df_start.anchor_name, df_start.x, df_start.y, 
-                        df_end.x, df_end.y, df_start.F, df_end.F, df_start.Fmin, df_start.Fmax):
-            # We always put the left point as xa
-            if xa > xb:
-                xa, xb = xb, xa
-                ya, yb = yb, ya
-            # We want make sure the two points form the same anchor by checking the force.
-            assert(abs(fa-fb) < 1e-6)
-            df_anchor_o.loc[ix] = [anchor_name, xa, ya, xb, yb, fa, fmin, fmax]
-            ix += 1
-        df_anchor_o.sort_values(by='ya', ascending=False)
+        df_anchor_o = pd.DataFrame(self._anchor_pairs(phase))
+        df_anchor_o = df_anchor_o[['anchor_name', 'xa', 'ya', 'xb', 'yb', 'F', 'Fmin', 'Fmax']]
         df_anchor_o.set_index("anchor_name", inplace = True)
         return df_anchor_o
 
+    def _anchor_pairs(self, phase):
+        '''
+        Reads the node-to-node anchor results of a phase and pairs the two ends of every anchor,
+        see results.pair_anchor_ends
+        '''
+        anchor_name = self.getresults(phase, 'NodeToNodeAnchor.MaterialID')
+        F    = self.getresults(phase, 'NodeToNodeAnchor.AnchorForce2D')
+        Fmin = self.getresults(phase, 'NodeToNodeAnchor.AnchorForceMin2D')
+        Fmax = self.getresults(phase, 'NodeToNodeAnchor.AnchorForceMax2D')
+        x, y = self._node_coords(phase, 'NodeToNodeAnchor', len(F))
+        element_id, node_id = None, None
+        if self._anchor_ids:
+            try:
+                element_id = self.getresults(phase, 'NodeToNodeAnchor.ElementID')
+                node_id    = self.getresults(phase, 'NodeToNodeAnchor.NodeID')
+            except (AttributeError, PlxScriptingError):    # not available, pair by MaterialID only
+                self._anchor_ids = False
+        return results.pair_anchor_ends(anchor_name, x, y, dict(F=F, Fmin=Fmin, Fmax=Fmax),
+                                        element_id, node_id)
+
+    def _node_coords(self, phase, category='Soil', n=None):
+        '''
+        Returns the node coordinates of a result category as float64 arrays. Soil coordinates are read once
+        per mesh and shared by the phases without updated mesh, unless their nodes differ in number from the
+        shared set. Structures (plates, anchors, ...) differ with the elements active, so their coordinates
+        are kept per phase, as are the soil coordinates of phases using updated mesh.
+        Param:
+            phase:    Plaxis phase, e.g. g_o.Phases[-1]
+            category: result category, e.g. 'Soil', 'Plate' or 'NodeToNodeAnchor'
+            n:        number of nodes of the results the coordinates go with, checked against the kept set
+        Return:
+            x, y: read-only float64 arrays
+        '''
+        name = str(phase)
+        keys = [(category, name)]
+        if category == 'Soil':
+            if name not in self._updated_mesh:
+                try:
+                    self._updated_mesh[name] = bool(phase.Deform.UseUpdatedMesh.value)
+                except (AttributeError, PlxScriptingError):
+                    self._updated_mesh[name] = False
+            if not self._updated_mesh[name]:
+                keys.append((category, None))
+        for key in keys:
+            xy = self._node_geometry.get(key)
+            if xy is not None and (n is None or len(xy[0]) == n):
+                return xy
+        x = self.getresults(phase, category + '.X').astype(np.float64, copy=False)
+        y = self.getresults(phase, category + '.Y').astype(np.float64, copy=False)
+        shared = (category, None)
+        if shared in keys and shared not in self._node_geometry:
+            self._node_geometry[shared] = (x, y)
+        else:
+            self._node_geometry[(category, name)] = (x, y)
+        return x, y
+
     def _sort_anchor_force_by_phases(self, dict_n2n: dict) -> pd.DataFrame: 
         '''
         Groups the anchor forces by anchor name
@@ -273,18 +523,13 @@ class OutputBase:
         Return: 
             anchor_results in a format {anchor_id: df_forces}
         '''
+        frames = [dict_n2n[key].assign(Phase=key) for key in dict_n2n]   # looping over phases
+        if not frames:
+            return {}
+        df_all = pd.concat(frames)      # concatenated once
         anchor_results = {}
-        for key in dict_n2n: #looping over phases
-            anchor_result = dict_n2n[key]
-        #     import pdb; pdb.set_trace()
-            for index, row in anchor_result.iterrows(): #loop over anchors
-                data = row.to_frame().transpose()
-                data['Phase'] = key
-                data.set_index('Phase', inplace=True)
-                if index in anchor_results.keys():
-                    anchor_results[index] = anchor_results[index].append(data)
-                else:
-                    anchor_results[index] = data
+        for index, data in df_all.groupby(level=0, sort=False):   # split by anchor
+            anchor_results[index] = data.set_index('Phase')
         return anchor_results
 
 #================================================================================================================================================================
@@ -303,22 +548,42 @@ class OutputBase:
         Return: 
             Pandas dataframe containing displacement information
         '''
-        # Extract displacement info at nodes as arrays
-        soilX  = np.array(self.g_o.getresults(phase, self.g_o.ResultTypes.Soil.X, 'node'))
-        soilY  = np.array(self.g_o.getresults(phase, self.g_o.ResultTypes.Soil.Y, 'node'))
-        soilUy = np.array(self.g_o.getresults(phase, self.g_o.ResultTypes.Soil.Uy, 'node'))
-        # Define column headers and set-up dataframe
-        columns = ['x', 'y', 'Uy']
-        df = pd.DataFrame(columns=columns)
-        for i, (x, y, Uy) in enumerate(zip(soilX, soilY, soilUy)):
-            if xmin < x < xmax: 
-                if abs(y - ycut) < 1E-6: 
-                    df.loc[i,'x']  = x
-                    df.loc[i,'y']  = y
-                    df.loc[i,'Uy'] = Uy*1000  # Convert settlement into mm
+        section = self.get_section(phase, [(xmin, ycut), (xmax, ycut)], ['Soil.Uy'])
+        df = pd.DataFrame(dict(x=section['x'], y=section['y'],
+                               Uy=section['Soil.Uy']*1000))  # Convert settlement into mm
         df_settle_o = df.sort_values(by='x', ascending=True)
         self.logger.info("Settlement Data Extracted.")
         return df_settle_o
+
+    def get_section(self, phase, polyline, result_types=('Soil.Ux', 'Soil.Uy', 'Soil.Utot', 'Soil.PExcess'),
+                    tol=1E-6, include_ends=False):
+        '''
+        Gets soil results at the nodes along a cut line in a certain phase, all result types in one pass
+        Param:
+            phase:        phase name, e.g. g_o.Phases[-1]
+            polyline:     vertices of the cut line, e.g. [(xmin, ycut), (xmax, ycut)] or [(x, ytop), (x, ybot)]
+            result_types: names of the soil results, e.g. 'Soil.Uy'
+            tol:          distance within which a node is on the line
+            include_ends: keep the nodes at the two ends of the line
+        Return:
+            A dictionary of float64 arrays: s (distance along the line), x, y and one array per result type
+        '''
+        values = {x: self.getresults(phase, x) for x in result_types}
+        n = len(next(iter(values.values()))) if values else None
+        soilX, soilY = self._node_coords(phase, 'Soil', n)
+        return results.cut_line(soilX, soilY, values, polyline, tol, include_ends)
+
+    def get_hsection(self, phase, xmin, xmax, ycut, **kwargs):
+        '''
+        Gets soil results along a horizontal cut section, see get_section
+        '''
+        return self.get_section(phase, [(xmin, ycut), (xmax, ycut)], **kwargs)
+
+    def get_vsection(self, phase, xcut, ymin, ymax, **kwargs):
+        '''
+        Gets soil results along a vertical cut section from top to bottom, see get_section
+        '''
+        return self.get_section(phase, [(xcut, ymax), (xcut, ymin)], **kwargs)
     
     def plot_displ_hsect(self, df):
         '''
@@ -0,0 +1,306 @@
+# Import Python libraries
+import collections
+import hashlib
+import json
+import numbers
+
+
+_PhaseSpec = collections.namedtuple('_PhaseSpec',
+                                    'name parent identification calc_type loading_type time_interval '
+                                    'pwp_calc_type solver activate deactivate properties')
+
+
+class PhaseSpec(_PhaseSpec):
+    '''
+    Declarative description of one calculation phase.
+    Param:
+        name:           Plaxis name of the phase, e.g. 'Phase_3'. Used as the key of the plan
+        parent:         name of the phase it starts from. Default = 'InitialPhase'
+        identification: text description of the phase. Default = name
+        calc_type:      'Plastic', 'Consolidation' or 'Safety'. Default = 'Plastic'
+        loading_type:   e.g. 'Staged construction', 'Minimum excess pore pressure' or 'Degree of consolidation'
+        time_interval:  consolidation time interval in days
+        pwp_calc_type:  pore pressure calculation type, e.g. 'Phreatic'
+        solver:         solver type, e.g. 'Picos (multicore iterative)'
+        activate:       names of the objects to be activated in this phase, e.g. ['LineLoads', 'Plate_W1']
+        deactivate:     names of the objects to be deactivated in this phase
+        properties:     any other phase property as {'Deform.MaxSteps': 200, ...}
+    '''
+    __slots__ = ()
+
+    def __new__(cls, name, parent='InitialPhase', identification=None, calc_type='Plastic',
+                loading_type=None, time_interval=None, pwp_calc_type=None, solver=None,
+                activate=(), deactivate=(), properties=None):
+        if identification is None:
+            identification = name
+        properties = tuple(sorted((properties or {}).items()))
+        return super().__new__(cls, name, parent, identification, calc_type, loading_type,
+                               time_interval, pwp_calc_type, solver,
+                               tuple(activate), tuple(deactivate), properties)
+
+    def settings(self):
+        '''
+        Returns the Plaxis properties set by this phase, in the order they should be sent.
+        Return:
+            An ordered dictionary {property path: value}, entries left as None are skipped
+        '''
+        settings = collections.OrderedDict()
+        settings['Identification'] = self.identification
+        settings['DeformCalcType'] = self.calc_type
+        settings['Deform.LoadingType'] = self.loading_type
+        settings['TimeInterval'] = self.time_interval
+        settings['PorePresCalcType'] = self.pwp_calc_type
+        settings['Solver'] = self.solver
+        for key, value in self.properties:
+            settings[key] = value
+        return collections.OrderedDict((k, v) for k, v in settings.items() if v is not None)
+
+    def signature(self):
+        '''
+        Returns a short hash of the phase definition, parent included.
+        '''
+        text = json.dumps([self.parent, list(self.settings().items()),
+                           sorted(self.activate), sorted(self.deactivate)], default=str)
+        return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+class PhasePlan:
+    '''
+    A tree of phases (each phase refers to its parent), kept in insertion order.
+    Compile it against the phases in Plaxis with 'compile' to get the minimal list of commands.
+    '''
+
+    def __init__(self, phases=()):
+        self._phases = collections.OrderedDict()
+        self._depends = collections.defaultdict(set)
+        for spec in phases:
+            self.add(spec)
+
+    def add(self, spec):
+        '''
+        Adds (or replaces) a phase in the plan.
+        Param:
+            spec: PhaseSpec
+        Return:
+            The PhaseSpec added
+        '''
+        if spec.name == spec.parent:
+            raise ValueError('Phase {} cannot start from itself'.format(spec.name))
+        self._phases[spec.name] = spec
+        return spec
+
+    def plastic(self, name, parent='InitialPhase', PwpCalcType='Phreatic',
+                SolverType='Picos (multicore iterative)', **kwargs):
+        '''
+        Adds a Plastic type Phase with the same defaults as BaseProject.add_plastic
+        '''
+        properties = dict({'Deform.ResetDisplacementsToZero': False,
+                           'Deform.UseCavitationCutOff': True}, **kwargs.pop('properties', {}))
+        return self.add(PhaseSpec(name, parent, calc_type='Plastic', pwp_calc_type=PwpCalcType,
+                                  solver=SolverType, properties=properties, **kwargs))
+
+    def consolidation(self, name, parent='InitialPhase', LoadType='Staged construction', ConsParam=1,
+                      SolverType='Picos (multicore iterative)', **kwargs):
+        '''
+        Adds a Consolidation type Phase with the same defaults as BaseProject.add_consolidation
+        '''
+        properties = dict({'Deform.UseCavitationCutOff': True}, **kwargs.pop('properties', {}))
+        time_interval = None
+        if LoadType == 'Staged construction':
+            time_interval = ConsParam
+        elif LoadType == 'Minimum excess pore pressure':
+            properties['Deform.Loading.PStop'] = ConsParam
+        elif LoadType == 'Degree of consolidation':
+            properties['Deform.Loading.ConsolidDegree'] = ConsParam
+        return self.add(PhaseSpec(name, parent, calc_type='Consolidation', loading_type=LoadType,
+                                  time_interval=time_interval, solver=SolverType,
+                                  properties=properties, **kwargs))
+
+    def safety(self, name, parent='InitialPhase', IterPara=True, MaxStep=100,
+               SolverType='Picos (multicore iterative)', **kwargs):
+        '''
+        Adds a Safety type Phase with the same defaults as BaseProject.add_safety
+        '''
+        properties = {'Deform.UseCavitationCutOff': True,
+                      'Deform.UseDefaultIterationParams': IterPara}
+        if IterPara is False:
+            properties['Deform.MaxSteps'] = MaxStep
+        properties.update(kwargs.pop('properties', {}))
+        return self.add(PhaseSpec(name, parent, calc_type='Safety', solver=SolverType,
+                                  properties=properties, **kwargs))
+
+    def __getitem__(self, name):
+        return self._phases[name]
+
+    def __contains__(self, name):
+        return name in self._phases
+
+    def __iter__(self):
+        return iter(self.ordered())
+
+    def __len__(self):
+        return len(self._phases)
+
+    def children(self, name):
+        '''
+        Returns the names of the phases starting directly from phase 'name'
+        '''
+        return [x.name for x in self._phases.values() if x.parent == name]
+
+    def descendants(self, name):
+        '''
+        Returns the names of all phases downstream of phase 'name', in plan order
+        '''
+        found = []
+        stack = self.children(name)
+        while stack:
+            child = stack.pop(0)
+            found.append(child)
+            stack.extend(self.children(child))
+        return [x.name for x in self.ordered() if x.name in found]
+
+    def depends(self, name, *objects):
+        '''
+        Records that phase 'name' depends on model objects or settings it does not (de)activate,
+        e.g. plan.depends('Phase_4', 'SoilMat_Clay', 'Mesh')
+        '''
+        self._depends[name].update(objects)
+
+    def references(self, name):
+        '''
+        Returns the names of the model objects and settings phase 'name' refers to directly
+        '''
+        spec = self._phases[name]
+        return set(spec.activate) | set(spec.deactivate) | self._depends.get(name, set())
+
+    def users(self, obj):
+        '''
+        Returns the names of the phases that refer to model object or setting 'obj' directly
+        '''
+        return [x for x in self._phases if obj in self.references(x)]
+
+    def affected(self, changed_objects=(), changed_phases=()):
+        '''
+        Returns the phases that have to be recalculated after a change, i.e. every phase that
+        refers to a changed object, every changed phase, and all their descendants.
+        An object no phase refers to (e.g. a soil material or the mesh) affects the whole plan.
+        Param:
+            changed_objects: names of the model objects or settings changed
+            changed_phases:  names of the phases whose own settings changed
+        Return:
+            A list of phase names, in plan order
+        '''
+        roots = set(x for x in changed_phases if x in self._phases)
+        for obj in changed_objects:
+            users = self.users(obj)
+            if not users:
+                return [x.name for x in self.ordered()]
+            roots.update(users)
+        affected = set(roots)
+        for name in roots:
+            affected.update(self.descendants(name))
+        return [x.name for x in self.ordered() if x.name in affected]
+
+    def ordered(self):
+        '''
+        Returns the phases with every parent placed before its children.
+        Parents not in the plan (e.g. 'InitialPhase') are assumed to exist in Plaxis already.
+        '''
+        ordered, placed = [], set()
+        pending = list(self._phases.values())
+        while pending:
+            ready = [x for x in pending if x.parent not in self._phases or x.parent in placed]
+            if not ready:
+                raise ValueError('Phase plan has a cycle: ' + ', '.join(x.name for x in pending))
+            for spec in ready:
+                ordered.append(spec)
+                placed.add(spec.name)
+                pending.remove(spec)
+        return ordered
+
+    def compile(self, existing=None, applied=None):
+        '''
+        Diffs the plan against the phases in Plaxis and returns the commands that bring Plaxis in line.
+        Only what differs is emitted, so re-running a plan with one changed phase touches that phase only.
+        Param:
+            existing: dataframe of the Plaxis phases indexed by phase name, as returned by
+                      BaseProject._tabulate(g_i.Phases, PhasePlan.TABULATED). Default = None, i.e. no phases
+            applied:  the PhasePlan last sent to Plaxis, used for the settings and activations that
+                      cannot be read back in bulk. Default = None
+        Return:
+            commands: list of Plaxis command strings
+            touched:  list of names of the phases created or changed
+        '''
+        commands, touched = [], []
+        for spec in self.ordered():
+            phase_commands = []
+            before = applied[spec.name] if (applied is not None and spec.name in applied) else None
+            exists = existing is not None and spec.name in existing.index
+            if not exists:
+                phase_commands.append('phase {}'.format(spec.parent))
+                phase_commands.append('rename Phases[-1] {}'.format(_quote(spec.name)))
+                before = None
+            elif _differs(existing.loc[spec.name].get('PreviousPhase'), spec.parent):
+                phase_commands.append('set {}.PreviousPhase {}'.format(spec.name, spec.parent))
+            for key, value in spec.settings().items():
+                if exists and key in PhasePlan.TABULATED and key in existing.columns:
+                    current = existing.loc[spec.name, key]
+                elif before is not None:
+                    current = before.settings().get(key)
+                else:
+                    current = None
+                if current is None or _differs(current, value):
+                    phase_commands.append('set {}.{} {}'.format(spec.name, key, _quote(value)))
+            old_on  = set(before.activate) if before is not None else set()
+            old_off = set(before.deactivate) if before is not None else set()
+            for obj in spec.activate:
+                if obj not in old_on:
+                    phase_commands.append('activate {} {}'.format(obj, spec.name))
+            for obj in spec.deactivate:
+                if obj not in old_off:
+                    phase_commands.append('deactivate {} {}'.format(obj, spec.name))
+            # Undo activations dropped from the plan
+            for obj in sorted(old_on - set(spec.activate)):
+                phase_commands.append('deactivate {} {}'.format(obj, spec.name))
+            for obj in sorted(old_off - set(spec.deactivate)):
+                phase_commands.append('activate {} {}'.format(obj, spec.name))
+            if phase_commands:
+                commands.extend(phase_commands)
+                touched.append(spec.name)
+        return commands, touched
+
+    def copy(self):
+        plan = PhasePlan(self._phases.values())
+        for name, objects in self._depends.items():
+            plan.depends(name, *objects)
+        return plan
+
+
+# Phase properties read back from Plaxis in one 'tabulate' call when compiling a plan
+PhasePlan.TABULATED = ['PreviousPhase', 'Identification', 'DeformCalcType', 'TimeInterval',
+                       'PorePresCalcType', 'Solver']
+
+
+def _quote(value):
+    '''
+    Formats a python value as a Plaxis command argument
+    '''
+    if isinstance(value, bool):
+        return 'True' if value else 'False'
+    if isinstance(value, numbers.Integral):
+        return repr(int(value))
+    if isinstance(value, numbers.Real):
+        return repr(float(value))
+    return '"{}"'.format(str(value).replace('"', "'"))
+
+
+def _differs(current, value, tol=1e-9):
+    '''
+    Compares a value read from Plaxis with the one in the plan
+    '''
+    if current is None or current != current:    # missing or NaN, i.e. never set
+        return True
+    try:
+        return abs(float(current) - float(value)) > tol * max(1.0, abs(float(value)))
+    except (TypeError, ValueError):
+        return str(current).strip() != str(value).strip()
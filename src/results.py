@@ -0,0 +1,485 @@
+# Import Python libraries
+import collections
+import hashlib
+import logging
+import os
+import numpy as np
+import pandas as pd
+try:
+    from plxscripting.plx_scripting_exceptions import PlxScriptingError
+except ImportError:     # the reducers need no Plaxis
+    class PlxScriptingError(Exception):
+        pass
+
+logger = logging.getLogger(__name__)
+
+# Structural results followed by OutputBase.get_envelopes
+#   group: (Plaxis result type category, quantities)
+ENVELOPE_GROUPS = {
+    'plate':        ('Plate', ['Nx2D', 'Q2D', 'M2D']),
+    'n2nanchor':    ('NodeToNodeAnchor', ['AnchorForce2D']),
+    'embeddedbeam': ('EmbeddedBeamRow', ['Nx2D', 'Q2D', 'M2D']),
+}
+
+# Time histories of curve points, see 'curve_histories'
+#   phases:   names of the phases read
+#   phase_ix: int32 array (steps), position in 'phases' of the phase of each step
+#   time:     float64 array (steps), reached time of each step
+#   values:   dictionary {result type name: float64 array (points x steps)}
+History = collections.namedtuple('History', 'phases phase_ix time values')
+
+# Block of results yielded by 'result_chunks'
+#   start: row of the first node (or stress point) of the block
+#   total: number of rows of the phase or step
+#   block: float64 array (rows x result types)
+Chunk = collections.namedtuple('Chunk', 'start total block')
+
+
+class ResultCache:
+    '''
+    Least recently used cache of result arrays within a memory budget. Arrays evicted from memory are
+    written to 'spill_dir' as .npy files when one is given, and read back from there on the next request.
+    Counters: hits (memory), disk_hits, misses.
+    '''
+
+    def __init__(self, budget_bytes=512 * 1024**2, spill_dir=None):
+        self.budget_bytes = budget_bytes
+        self.spill_dir = spill_dir
+        self.nbytes = 0
+        self.hits = self.disk_hits = self.misses = 0
+        self._entries = collections.OrderedDict()
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries or (self.spill_dir is not None and os.path.exists(self._spill_file(key)))
+
+    def get(self, key):
+        '''
+        Returns the array of a key, None if it is not cached
+        '''
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        if self.spill_dir is not None and os.path.exists(self._spill_file(key)):
+            self.disk_hits += 1
+            values = np.load(self._spill_file(key))
+            self._store(key, values)        # kept in memory only when it fits in the budget
+            return values
+        self.misses += 1
+        return None
+
+    def put(self, key, values):
+        '''
+        Caches a copy of an array, evicting the least recently used ones beyond the budget.
+        Returns the copy, read-only; the array given stays as it was.
+        '''
+        values = np.array(values)
+        self._store(key, values)
+        return values
+
+    def clear(self, disk=False):
+        '''
+        Empties the memory part of the cache, and the spilled files as well if disk is True
+        '''
+        self._entries.clear()
+        self.nbytes = 0
+        if disk and self.spill_dir is not None:
+            for fname in os.listdir(self.spill_dir):
+                if fname.endswith('.npy'):
+                    os.remove(os.path.join(self.spill_dir, fname))
+
+    def stats(self):
+        return dict(hits=self.hits, disk_hits=self.disk_hits, misses=self.misses,
+                    entries=len(self._entries), nbytes=self.nbytes)
+
+    def _store(self, key, values):
+        values.flags.writeable = False
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key).nbytes
+        if values.nbytes > self.budget_bytes:       # too big to keep in memory
+            self._spill(key, values)
+            return
+        self._entries[key] = values
+        self.nbytes += values.nbytes
+        while self.nbytes > self.budget_bytes:
+            old_key, old_values = self._entries.popitem(last=False)
+            self.nbytes -= old_values.nbytes
+            self._spill(old_key, old_values)
+
+    def _spill(self, key, values):
+        if self.spill_dir is not None and not os.path.exists(self._spill_file(key)):
+            np.save(self._spill_file(key), values)
+
+    def _spill_file(self, key):
+        return os.path.join(self.spill_dir, hashlib.sha1(repr(key).encode()).hexdigest() + '.npy')
+
+
+def cut_line(x, y, values, polyline, tol=1e-6, include_ends=False):
+    '''
+    Picks the nodes lying on a cut line (horizontal, vertical or any polyline) with array masks,
+    and returns them ordered along the line, for any number of result types at once.
+    Param:
+        x, y:         arrays of the node coordinates
+        values:       dictionary {name: array} of nodal results, same order as x and y
+        polyline:     array (k x 2) of the vertices of the cut line, e.g. [(xmin, ycut), (xmax, ycut)]
+        tol:          distance within which a node is on the line
+        include_ends: keep the nodes at the two ends of the line. Default = False, i.e. xmin < x < xmax
+    Return:
+        A dictionary of float64 arrays: s (distance along the line), x, y and one array per result type
+    '''
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    polyline = np.asarray(polyline, dtype=np.float64).reshape(-1, 2)
+    chainage = np.full(len(x), np.inf)
+    start = 0.0
+    for (xa, ya), (xb, yb) in zip(polyline[:-1], polyline[1:]):
+        length = np.hypot(xb - xa, yb - ya)
+        ux, uy = (xb - xa) / length, (yb - ya) / length
+        along  = (x - xa) * ux + (y - ya) * uy
+        across = np.abs((y - ya) * ux - (x - xa) * uy)
+        on = (across < tol) & (along > -tol) & (along < length + tol)
+        chainage = np.where(on, np.minimum(chainage, start + np.clip(along, 0.0, length)), chainage)
+        start += length
+    picked = np.isfinite(chainage)
+    if not include_ends:
+        picked &= (chainage > tol) & (chainage < start - tol)
+    order = np.flatnonzero(picked)[np.argsort(chainage[picked], kind='stable')]
+    section = dict(s=chainage[order], x=x[order], y=y[order])
+    for name, value in values.items():
+        section[name] = np.asarray(value, dtype=np.float64)[order]
+    return section
+
+
+def pair_anchor_ends(material_id, x, y, values, element_id=None, node_id=None, tol=1e-6):
+    '''
+    Pairs the two end nodes of every node-to-node anchor with array operations.
+    Ends are matched by element ID when given, otherwise as consecutive rows of the same MaterialID,
+    which is the order Plaxis lists them in. The end with the smaller x becomes end 'a', and both
+    ends of an anchor must carry the same force.
+    Param:
+        material_id: array of the MaterialID of each node
+        x, y:        arrays of the node coordinates
+        values:      dictionary {name: array} of nodal results, e.g. {'F': ..., 'Fmin': ..., 'Fmax': ...},
+                     the first one is used to check the pairs
+        element_id:  array of the element ID of each node. Default = None
+        node_id:     array of the node ID of each node, kept as node_a/node_b. Default = None
+        tol:         tolerance of the force check
+    Return:
+        A dictionary of arrays, one entry per anchor: anchor_name (MaterialID), xa, ya, xb, yb, the values
+        and node_a, node_b if node IDs are given, in the order Plaxis lists the anchors
+    '''
+    material_id = np.asarray(material_id)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    group = material_id if element_id is None else np.asarray(element_id)
+    order = np.argsort(group, kind='stable')
+    counts = np.unique(group, return_counts=True)[1]
+    if (counts % 2).any() or (element_id is not None and (counts != 2).any()):
+        raise ValueError('Anchor end nodes cannot be paired, {} nodes per {}'.format(
+                         counts.tolist(), 'element' if element_id is not None else 'material'))
+    a, b = order[0::2], order[1::2]
+    first = np.argsort(np.minimum(a, b), kind='stable')     # back to the order of Plaxis
+    a, b = a[first], b[first]
+    swap = x[a] > x[b]
+    a, b = np.where(swap, b, a), np.where(swap, a, b)
+    values = {k: np.asarray(v, dtype=np.float64) for k, v in values.items()}
+    if values:
+        check = next(iter(values.values()))
+        bad = np.abs(check[a] - check[b]) > tol * np.maximum(1.0, np.abs(check[a]))
+        if bad.any():
+            raise ValueError('{} anchors have ends with different forces'.format(int(bad.sum())))
+    pairs = dict(anchor_name=material_id[a], xa=x[a], ya=y[a], xb=x[b], yb=y[b])
+    if node_id is not None:
+        node_id = np.asarray(node_id)
+        pairs['node_a'], pairs['node_b'] = node_id[a], node_id[b]
+    for name, value in values.items():
+        pairs[name] = value[a]
+    return pairs
+
+
+def anchor_table(phase_pairs, decimals=3):
+    '''
+    Stacks the anchors of several phases into one long-format table, concatenated once.
+    Anchors are identified across phases by their end coordinates (rounded to 'decimals').
+    Param:
+        phase_pairs: ordered dictionary {phase name: output of pair_anchor_ends}
+    Return:
+        A dataframe with columns phase, anchor (integer ID), then the columns of pair_anchor_ends
+    '''
+    frames = []
+    for phase, pairs in phase_pairs.items():
+        df = pd.DataFrame(pairs)
+        df.insert(0, 'phase', phase)
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=['phase', 'anchor', 'anchor_name', 'xa', 'ya', 'xb', 'yb'])
+    df = pd.concat(frames, ignore_index=True)
+    ends = df[['xa', 'ya', 'xb', 'yb']].round(decimals)
+    df.insert(1, 'anchor', pd.MultiIndex.from_frame(ends).factorize()[0].astype(np.int32))
+    return df
+
+
+def pivot_anchor_forces(table, value='F'):
+    '''
+    Pivots a long-format anchor table (see anchor_table) into an (anchor x phase) matrix and its envelope.
+    Param:
+        table: dataframe with columns phase, anchor and 'value'
+        value: column to pivot, e.g. 'F'
+    Return:
+        matrix:   dataframe (anchor x phase) of the values, NaN where an anchor is missing, phases in table order
+        envelope: dataframe (anchor) with columns ya, min, max, phase_min, phase_max
+    '''
+    phases  = pd.unique(table['phase'])
+    anchors = np.sort(pd.unique(table['anchor']))
+    data = np.full((len(anchors), len(phases)), np.nan)
+    row = np.searchsorted(anchors, table['anchor'].to_numpy())
+    col = pd.Index(phases).get_indexer(table['phase'])
+    data[row, col] = table[value].to_numpy(dtype=np.float64)
+    matrix = pd.DataFrame(data, index=pd.Index(anchors, name='anchor'), columns=phases)
+    valid = ~np.isnan(data).all(axis=1)
+    imin = np.zeros(len(anchors), dtype=np.int64)
+    imax = np.zeros(len(anchors), dtype=np.int64)
+    imin[valid] = np.nanargmin(data[valid], axis=1)
+    imax[valid] = np.nanargmax(data[valid], axis=1)
+    ya = table.groupby('anchor')['ya'].first().reindex(anchors).to_numpy()
+    envelope = pd.DataFrame(dict(ya=ya, min=data[np.arange(len(anchors)), imin],
+                                 max=data[np.arange(len(anchors)), imax],
+                                 phase_min=np.where(valid, np.asarray(phases, dtype=object)[imin], None),
+                                 phase_max=np.where(valid, np.asarray(phases, dtype=object)[imax], None)),
+                            index=matrix.index)
+    return matrix, envelope
+
+
+def position_ids(x, y, decimals=3):
+    '''
+    Returns int64 IDs of nodes from their coordinates (rounded to 'decimals'), so the same node gets the
+    same ID in every phase. Nodes listed more than once at one position (e.g. shared by two plate elements)
+    share the ID of that position, see Envelope.update.
+    '''
+    scale = 10.0 ** decimals
+    xq = np.rint(np.asarray(x, dtype=np.float64) * scale).astype(np.int64) + (1 << 30)
+    yq = np.rint(np.asarray(y, dtype=np.float64) * scale).astype(np.int64) + (1 << 30)
+    return (xq << 32) | yq
+
+
+class Envelope:
+    '''
+    Running maximum and minimum of results per node over phases and steps, with the phase or step
+    where each occurs. Results are fed one phase or step at a time, so memory stays O(nodes)
+    whatever the number of steps. Nodes are identified by ID, new nodes (e.g. elements activated
+    in a later phase) are added as they appear.
+    '''
+
+    def __init__(self, quantities):
+        '''
+        Param:
+            quantities: names of the results followed, e.g. ['Nx2D', 'Q2D', 'M2D']
+        '''
+        self.quantities = list(quantities)
+        self.labels = []
+        self.ids = np.empty(0, dtype=np.int64)
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+        self.max = {k: np.empty(0) for k in self.quantities}
+        self.min = {k: np.empty(0) for k in self.quantities}
+        self.arg_max = {k: np.empty(0, dtype=np.int32) for k in self.quantities}
+        self.arg_min = {k: np.empty(0, dtype=np.int32) for k in self.quantities}
+
+    def update(self, label, values, x, y, ids=None):
+        '''
+        Adds the results of one phase or step, or of a block of its nodes: blocks of the same
+        phase or step given one after the other share the label.
+        Param:
+            label:  name of the phase or step, e.g. 'Phase_3' or 'Phase_3/12'
+            values: dictionary {quantity: array (nodes)}
+            x, y:   arrays of the node coordinates
+            ids:    int64 node IDs. Default = None, i.e. position_ids(x, y)
+        Nodes sharing an ID (coincident nodes) are reduced to their max and min first, so the envelope
+        of a position covers all the nodes stacked there.
+        '''
+        ids = position_ids(x, y) if ids is None else np.asarray(ids, dtype=np.int64)
+        self._add_nodes(ids, x, y)
+        nodes, inverse = np.unique(ids, return_inverse=True)
+        slots = np.searchsorted(self.ids, nodes)
+        if not self.labels or self.labels[-1] != label:
+            self.labels.append(label)
+        ilabel = len(self.labels) - 1
+        for k in self.quantities:
+            value = np.asarray(values[k], dtype=np.float64)
+            vmax = np.full(len(nodes), np.nan)
+            vmin = np.full(len(nodes), np.nan)
+            np.fmax.at(vmax, inverse, value)            # NaN only where all values of a node are NaN
+            np.fmin.at(vmin, inverse, value)
+            higher = ~(vmax <= self.max[k][slots])      # NaN (new node) counts as exceeded
+            lower  = ~(vmin >= self.min[k][slots])
+            self.max[k][slots[higher]] = vmax[higher]
+            self.arg_max[k][slots[higher]] = ilabel
+            self.min[k][slots[lower]] = vmin[lower]
+            self.arg_min[k][slots[lower]] = ilabel
+
+    def _add_nodes(self, ids, x, y):
+        new, first = np.unique(ids, return_index=True)
+        keep = ~np.isin(new, self.ids)
+        if not keep.any():
+            return
+        new, first = new[keep], first[keep]
+        all_ids = np.concatenate([self.ids, new])
+        order = np.argsort(all_ids, kind='stable')
+        self.ids = all_ids[order]
+        self.x = np.concatenate([self.x, np.asarray(x, dtype=np.float64)[first]])[order]
+        self.y = np.concatenate([self.y, np.asarray(y, dtype=np.float64)[first]])[order]
+        for state, fill in [(self.max, np.nan), (self.min, np.nan), (self.arg_max, -1), (self.arg_min, -1)]:
+            for k in self.quantities:
+                state[k] = np.concatenate([state[k], np.full(len(new), fill, dtype=state[k].dtype)])[order]
+
+    def to_frame(self):
+        '''
+        Returns a dataframe indexed by node ID with x, y and, for every quantity, its max, min and the
+        phase or step of each
+        '''
+        labels = np.asarray(self.labels + [None], dtype=object)
+        df = pd.DataFrame(dict(x=self.x, y=self.y), index=pd.Index(self.ids, name='id'))
+        for k in self.quantities:
+            df[k + '_max'] = self.max[k]
+            df[k + '_min'] = self.min[k]
+            df[k + '_max_at'] = labels[self.arg_max[k]]
+            df[k + '_min_at'] = labels[self.arg_min[k]]
+        return df
+
+
+def result_chunks(g_o, target, result_types, location='node', chunk_size=1 << 16):
+    '''
+    Reads results of a phase or step, one 'getresults' call per result type, and yields them in blocks
+    of at most 'chunk_size' rows, so reducers hold one phase plus one block whatever the number of steps.
+    Param:
+        g_o:          Plaxis Output global object
+        target:       Plaxis phase or step
+        result_types: names (e.g. 'Soil.Utot') or Plaxis result types, one column each
+        location:     'node' or 'stresspoint'
+        chunk_size:   rows per block
+    Yield:
+        A Chunk, see above. The block array is reused for the next block, copy it to keep it
+    '''
+    columns = [np.asarray(g_o.getresults(target, result_type(g_o, x), location), dtype=np.float64)
+               for x in result_types]
+    n = len(columns[0]) if columns else 0
+    if any(len(x) != n for x in columns):
+        raise ValueError('Results of different lengths: {}'.format([len(x) for x in columns]))
+    buffer = np.empty((min(chunk_size, n), len(columns)), dtype=np.float64)
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        block = buffer[:stop - start]
+        for i, column in enumerate(columns):
+            block[:, i] = column[start:stop]
+        yield Chunk(start, n, block)
+
+
+def result_type(g_o, name):
+    '''
+    Returns the Plaxis result type of a name, e.g. 'Soil.Utot' for g_o.ResultTypes.Soil.Utot.
+    Result type objects are returned unchanged.
+    '''
+    if not isinstance(name, str):
+        return name
+    obj = g_o.ResultTypes
+    for attr in name.split('.'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def curve_histories(g_o, points=None, result_types=('Soil.Utot',), phases=None, skip_initial=True,
+                    time_type='Soil.Time'):
+    '''
+    Reads the time histories of curve points. The steps of each phase are counted from one
+    'getcurveresultspath' call per phase for the first point and result type; every other point and
+    result type is read with one call per run of consecutive phases and split at those counts.
+    Param:
+        g_o:          Plaxis Output global object
+        points:       curve points, e.g. [g_o.Curvepoints.Nodes[0]]. Default = None, i.e. all curve nodes
+        result_types: names (e.g. 'Soil.Utot') or Plaxis result types to read
+        phases:       Plaxis phases to read. Default = None, i.e. all phases
+        skip_initial: skip the InitialPhase. Default = True
+        time_type:    result type giving the reached time of each step. When Plaxis does not provide it,
+                      or None is given, the time is read from Reached.Time of each step
+    Return:
+        A History, see above
+    '''
+    if points is None:
+        points = g_o.Curvepoints.Nodes[:]
+    if phases is None:
+        phases = g_o.Phases[:]
+    names  = [x if isinstance(x, str) else str(x) for x in result_types]
+    rtypes = [result_type(g_o, x) for x in result_types]
+    try:
+        time_rtype = result_type(g_o, time_type) if time_type is not None else None
+    except AttributeError:      # result type not available in this Plaxis version
+        time_rtype = None
+    read = [x for x in phases if not (skip_initial and x.Name.value == 'InitialPhase')]
+    phase_names = [x.Name.value for x in read]
+    firsts = [np.asarray(g_o.getcurveresultspath(points[0], x, x, rtypes[0]), dtype=np.float64) for x in read]
+    nsteps = [len(x) for x in firsts]
+    offsets = np.concatenate([[0], np.cumsum(nsteps, dtype=np.int64)])
+    phase_ix = np.repeat(np.arange(len(read), dtype=np.int32), nsteps)
+    data = np.empty((len(points), len(rtypes), offsets[-1]), dtype=np.float64)
+    if read:
+        data[0, 0] = np.concatenate(firsts)
+    runs = _phase_runs(g_o, read)
+    for ipt, point in enumerate(points):
+        for irt, rtype in enumerate(rtypes):
+            if ipt == 0 and irt == 0:
+                continue
+            for i0, i1 in runs:
+                data[ipt, irt, offsets[i0]:offsets[i1]] = _curve_path(g_o, point, read, i0, i1, rtype, offsets)
+    time = _step_times(g_o, points[0], read, runs, offsets, time_rtype) if read else np.empty(0)
+    values = {x: data[:, i, :] for i, x in enumerate(names)}
+    return History(phase_names, phase_ix, time, values)
+
+
+def _phase_runs(g_o, phases):
+    '''
+    Splits phases into runs of consecutive Plaxis phases, returned as (first, end) positions in 'phases'
+    '''
+    order = {str(x): i for i, x in enumerate(g_o.Phases[:])}
+    runs = []
+    for i, phase in enumerate(phases):
+        if runs and order.get(str(phase), -2) == order.get(str(phases[i-1]), -2) + 1:
+            runs[-1][1] = i + 1
+        else:
+            runs.append([i, i + 1])
+    return [tuple(x) for x in runs]
+
+
+def _curve_path(g_o, point, phases, i0, i1, rtype, offsets):
+    '''
+    Reads a result over the run of phases phases[i0:i1] in one call.
+    Raises ValueError if the number of values differs from the number of steps of the run.
+    '''
+    values = np.asarray(g_o.getcurveresultspath(point, phases[i0], phases[i1-1], rtype), dtype=np.float64)
+    if len(values) != offsets[i1] - offsets[i0]:
+        raise ValueError('{} values of {} read for {} steps of phases {} to {}'.format(
+                         len(values), rtype, offsets[i1] - offsets[i0], phases[i0], phases[i1-1]))
+    return values
+
+
+def _step_times(g_o, point, phases, runs, offsets, time_rtype):
+    '''
+    Returns the reached time of every step of the phases, one 'getcurveresultspath' call per run of
+    consecutive phases when Plaxis provides a time result type. Otherwise there is no curve result to
+    read over a range, and the time comes from Reached.Time of each step.
+    Raises ValueError if the number of times read differs from the number of steps of the results.
+    '''
+    if time_rtype is not None:
+        try:
+            return np.concatenate([_curve_path(g_o, point, phases, i0, i1, time_rtype, offsets)
+                                   for i0, i1 in runs])
+        except PlxScriptingError as e:
+            logger.debug("Time read per step: {}".format(e))
+    time = np.array([step.Reached.Time.value for phase in phases for step in phase.Steps], dtype=np.float64)
+    if len(time) != offsets[-1]:
+        raise ValueError('{} step times read for {} steps of results'.format(len(time), offsets[-1]))
+    return time
@@ -0,0 +1,222 @@
+# Import Python libraries
+import json
+import logging
+import shutil
+import numpy as np
+import pandas as pd
+from pathlib import Path
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+try:
+    from plxscripting.plx_scripting_exceptions import PlxScriptingError
+except ImportError:     # reading a store needs no Plaxis
+    class PlxScriptingError(Exception):
+        pass
+import results
+
+logger = logging.getLogger(__name__)
+
+# Results written by 'export_results', one Parquet dataset per group
+#   group: (Plaxis result type category, location, result names)
+EXPORT_GROUPS = {
+    'soil_node':   ('Soil', 'node', ['X', 'Y', 'Ux', 'Uy', 'Utot']),
+    'soil_stress': ('Soil', 'stresspoint', ['X', 'Y', 'SigxxE', 'SigyyE', 'SigxyE', 'PExcess']),
+    'plate':       ('Plate', 'node', ['X', 'Y', 'Nx2D', 'Q2D', 'M2D']),
+    'anchor':      ('NodeToNodeAnchor', 'node', ['MaterialID', 'X', 'Y', 'AnchorForce2D',
+                                                 'AnchorForceMin2D', 'AnchorForceMax2D']),
+}
+
+
+def export_results(g_o, root, phases=None, groups=None, all_steps=False, curve_points=None,
+                   curve_results=('Soil.Utot',), row_group_size=1 << 16):
+    '''
+    Reads the results of a calculated project from Plaxis Output once and writes them to a columnar store:
+    '<root>/<group>/phase=<phase name>/part-<step>.parquet', i.e. Parquet files partitioned by result
+    group and phase, which ResultStore queries offline with predicate pushdown.
+    Param:
+        g_o:            Plaxis Output global object
+        root:           folder of the store. A store already there is replaced, any other folder that is not
+                        empty raises FileExistsError
+        phases:         Plaxis phases to export. Default = None, i.e. all phases
+        groups:         dictionary of the result groups, see EXPORT_GROUPS. Default = None, i.e. EXPORT_GROUPS
+        all_steps:      True to write every step, False for the final step of each phase only
+        curve_points:   curve points whose time histories are written to group 'curve'.
+                        Default = None, i.e. all curve nodes, [] for none
+        curve_results:  result types of the time histories
+        row_group_size: rows per Parquet row group
+    Return:
+        A ResultStore on the folder written
+    '''
+    if pa is None:
+        raise ImportError('pyarrow is needed to write the result store')
+    root = Path(root)
+    if (root / 'manifest.json').is_file():
+        shutil.rmtree(root)
+    elif root.exists() and (not root.is_dir() or any(root.iterdir())):
+        raise FileExistsError('{} exists and is not a result store'.format(root))
+    root.mkdir(parents=True, exist_ok=True)
+    groups = EXPORT_GROUPS if groups is None else groups
+    if phases is None:
+        phases = g_o.Phases[:]
+    phase_names, nsteps = [], {}
+    for phase in phases:
+        name = phase.Name.value
+        phase_names.append(name)
+        targets = list(enumerate(phase.Steps[:])) if all_steps else [(-1, phase)]
+        nsteps[name] = len(targets)
+        for group, (category, location, names) in groups.items():
+            for step, target in targets:
+                folder = root / group / ('phase=' + name)
+                fname = folder / 'part-{}.parquet'.format(step if step >= 0 else 'final')
+                try:
+                    _write_group(g_o, target, category, location, names, step, folder, fname, row_group_size)
+                except (AttributeError, PlxScriptingError) as e:      # e.g. no plates in the model
+                    logger.warning("Group {} not exported for {}: {}".format(group, name, e))
+    if curve_points is None or len(curve_points) > 0:
+        _write_curves(g_o, root, phases, curve_points, curve_results, row_group_size)
+    with open(root / 'manifest.json', 'w') as fout:
+        json.dump(dict(phases=phase_names, groups=sorted(groups), all_steps=all_steps, steps=nsteps),
+                  fout, indent=2)
+    logger.info("Results of {} phases exported to {}".format(len(phase_names), root))
+    return ResultStore(root)
+
+
+def _write_group(g_o, target, category, location, names, step, folder, fname, row_group_size):
+    '''
+    Writes the results of one group at a phase or step, one 'getresults' call per result and one
+    row group per block of results (see results.result_chunks), so one phase is held at a time
+    '''
+    writer = None
+    try:
+        for start, total, block in results.result_chunks(g_o, target, [category + '.' + x for x in names],
+                                                          location, row_group_size):
+            table = pd.DataFrame({x: block[:, i].astype(np.int64) if x.endswith('ID') else block[:, i]
+                                  for i, x in enumerate(names)})
+            table['step'] = np.int32(step)
+            table = pa.Table.from_pandas(table, preserve_index=False)
+            if writer is None:
+                folder.mkdir(parents=True, exist_ok=True)
+                writer = pq.ParquetWriter(str(fname), table.schema)
+            writer.write_table(table, row_group_size=row_group_size)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _write_curves(g_o, root, phases, points, curve_results, row_group_size):
+    hist = results.curve_histories(g_o, points, curve_results, phases, skip_initial=False)
+    if len(hist.time) == 0:
+        return
+    n_points = next(iter(hist.values.values())).shape[0]
+    step = np.concatenate([np.arange(x) for x in np.bincount(hist.phase_ix, minlength=len(hist.phases))])
+    for ipt in range(n_points):
+        table = pd.DataFrame(dict(point=np.int32(ipt), step=step.astype(np.int32), time=hist.time,
+                                  phase=np.asarray(hist.phases, dtype=object)[hist.phase_ix]))
+        for name, values in hist.values.items():
+            table[name.split('.')[-1]] = values[ipt]
+        for phase, part in table.groupby('phase', sort=False):
+            folder = root / 'curve' / ('phase=' + phase)
+            folder.mkdir(parents=True, exist_ok=True)
+            pq.write_table(pa.Table.from_pandas(part.drop(columns='phase'), preserve_index=False),
+                           str(folder / 'part-{}.parquet'.format(ipt)), row_group_size=row_group_size)
+
+
+class ResultStore:
+    '''
+    Offline access to results written by 'export_results'. Filters on phase are resolved from the
+    folder names and filters on columns are pushed down to the Parquet row groups, so only the data
+    asked for is read from disk. No connection to Plaxis is needed.
+    '''
+
+    def __init__(self, root):
+        if pa is None:
+            raise ImportError('pyarrow is needed to read the result store')
+        self.root = Path(root)
+        with open(self.root / 'manifest.json', 'r') as fin:
+            self.manifest = json.load(fin)
+        self._datasets = {}
+
+    @property
+    def phases(self):
+        return list(self.manifest['phases'])
+
+    def dataset(self, group):
+        '''
+        Returns the pyarrow dataset of a result group, e.g. 'soil_node'
+        '''
+        if group not in self._datasets:
+            self._datasets[group] = ds.dataset(str(self.root / group), format='parquet', partitioning='hive')
+        return self._datasets[group]
+
+    def query(self, group, columns=None, phase=None, step=None, filter=None):
+        '''
+        Reads part of a result group.
+        Param:
+            group:   result group, e.g. 'soil_node', 'plate', 'anchor', 'curve'
+            columns: columns to read. Default = None, i.e. all
+            phase:   phase name or list of phase names. Default = None, i.e. all
+            step:    step number, 'final' for the last step of each phase. Default = None, i.e. all written
+            filter:  further pyarrow expression, e.g. (ds.field('Y') > -5)
+        Return:
+            A dataframe
+        '''
+        expr = None
+        if phase is not None:
+            phases = [phase] if isinstance(phase, str) else list(phase)
+            expr = ds.field('phase').isin(phases)
+        if step == 'final':
+            expr = _and(expr, self._final_filter())
+        elif step is not None:
+            expr = _and(expr, ds.field('step') == step)
+        if filter is not None:
+            expr = _and(expr, filter)
+        return self.dataset(group).to_table(columns=columns, filter=expr).to_pandas()
+
+    def get_displ_one_phase(self, xmin, xmax, ycut, phase, cut_name=None, tol=1e-6):
+        '''
+        Displacement along a horizontal cut section, as OutputBase.get_displ_one_phase
+        '''
+        expr = (ds.field('X') > xmin) & (ds.field('X') < xmax) & \
+               (ds.field('Y') > ycut - tol) & (ds.field('Y') < ycut + tol)
+        df = self.query('soil_node', ['X', 'Y', 'Uy'], phase=phase, step='final', filter=expr)
+        df = df.rename(columns={'X': 'x', 'Y': 'y'})
+        df['Uy'] = df['Uy'] * 1000  # Convert settlement into mm
+        return df.sort_values(by='x', ascending=True)
+
+    def get_anchor_results(self, phases=None):
+        '''
+        Node-to-node anchor results of the final step of each phase, in long format
+        '''
+        df = self.query('anchor', phase=phases, step='final')
+        df['phase'] = df['phase'].astype(str)
+        return df
+
+    def get_curve_history(self, point=0, result='Utot'):
+        '''
+        Time history of a curve point over all phases, as model.post_process
+        '''
+        df = self.query('curve', ['phase', 'step', 'time', result], filter=ds.field('point') == point)
+        order = {x: i for i, x in enumerate(self.phases)}
+        df['phase_order'] = df['phase'].astype(str).map(order)
+        df = df.sort_values(['phase_order', 'step']).drop(columns='phase_order').reset_index(drop=True)
+        return df.rename(columns={result: 'y'})
+
+    def _final_filter(self):
+        '''
+        Returns the expression selecting the last step written of every phase
+        '''
+        if not self.manifest['all_steps']:
+            return ds.field('step') == -1
+        expr = None
+        for phase, n in self.manifest['steps'].items():
+            last = (ds.field('phase') == phase) & (ds.field('step') == n - 1)
+            expr = last if expr is None else (expr | last)
+        return expr
+
+
+def _and(expr, other):
+    return other if expr is None else expr & other
@@ -0,0 +1,181 @@
+# Import Python libraries
+import numpy as np
+import pandas as pd
+try:
+    import shapely
+    from shapely.geometry import Point, box
+    from shapely.strtree import STRtree
+except ImportError:
+    STRtree = None
+    print('shapely not installed!')
+
+
+class PolygonIndex:
+    '''
+    Spatial index (STRtree) over polygons, built once, answering bounding box, point-in-polygon and
+    intersection queries in O(log n) instead of masking the full table for each query.
+    '''
+
+    def __init__(self, names, bounds, geometries=None):
+        '''
+        Param:
+            names:      names of the polygons, e.g. ['Polygon_1_1', ...]
+            bounds:     array (n x 4) of the bounding boxes, columns xmin, ymin, xmax, ymax
+            geometries: shapely polygons, used for exact point and intersection queries. Default = None,
+                        i.e. the bounding boxes stand for the polygons
+        '''
+        if STRtree is None:
+            raise ImportError('shapely is needed for the polygon index')
+        self.names  = np.asarray(names, dtype=object)
+        self.bounds = np.asarray(bounds, dtype=float).reshape(-1, 4)
+        self._boxes = shapely.box(self.bounds[:, 0], self.bounds[:, 1], self.bounds[:, 2], self.bounds[:, 3])
+        self._geometries = None if geometries is None else np.asarray(geometries, dtype=object)
+        self._tree = STRtree(self._boxes)
+
+    @classmethod
+    def from_bounding_boxes(cls, df, name_col='PolygonName'):
+        '''
+        Builds the index from a dataframe holding columns BB_xmin, BB_ymin, BB_xmax, BB_ymax,
+        e.g. the output of BaseProject.soilpoly_extract_df
+        '''
+        bounds = df[['BB_xmin', 'BB_ymin', 'BB_xmax', 'BB_ymax']].to_numpy(dtype=float)
+        return cls(df[name_col].to_numpy(), bounds)
+
+    @classmethod
+    def from_polygons(cls, names, geometries):
+        '''
+        Builds the index from shapely polygons, e.g. a GeoDataFrame from BaseProject.construct_soil_geom
+        '''
+        geometries = np.asarray(geometries, dtype=object)
+        return cls(names, shapely.bounds(geometries), geometries)
+
+    def __len__(self):
+        return len(self.names)
+
+    def in_box(self, xmin, ymin, xmax, ymax):
+        '''
+        Returns the names of the polygons whose bounding box lies inside the box (edges included)
+        '''
+        ix = self._tree.query(box(xmin, ymin, xmax, ymax), predicate='covers')
+        return list(self.names[np.sort(ix)])
+
+    def intersecting(self, geometry):
+        '''
+        Returns the names of the polygons intersecting a shapely geometry, or a box given as (xmin, ymin, xmax, ymax)
+        '''
+        if isinstance(geometry, (tuple, list)):
+            geometry = box(*geometry)
+        ix = np.sort(self._tree.query(geometry, predicate='intersects'))
+        if self._geometries is not None:
+            ix = ix[shapely.intersects(self._geometries[ix], geometry)]
+        return list(self.names[ix])
+
+    def at_point(self, x, y):
+        '''
+        Returns the names of the polygons containing point (x, y), boundary included
+        '''
+        return self.intersecting(Point(x, y))
+
+    def at_points(self, points):
+        '''
+        Locates many points at once.
+        Param:
+            points: array (n x 2) of coordinates
+        Return:
+            Array of the names of the first polygon containing each point, None if outside all polygons
+        '''
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        pts = shapely.points(points)
+        ipt, ipoly = self._tree.query(pts, predicate='intersects')
+        if self._geometries is not None:
+            inside = shapely.intersects(self._geometries[ipoly], pts[ipt])
+            ipt, ipoly = ipt[inside], ipoly[inside]
+        found = np.full(len(points), None, dtype=object)
+        # keep the first polygon for points on shared edges
+        order = np.lexsort((ipoly, ipt))
+        ipt, ipoly = ipt[order], ipoly[order]
+        hit, first = np.unique(ipt, return_index=True)
+        found[hit] = self.names[ipoly[first]]
+        return found
+
+
+def match_by_shape(areas, bounds, ref_areas, ref_bounds, tol=1e-3, centroids=None, ref_centroids=None,
+                   geometries=None, ref_vertices=None):
+    '''
+    Matches reference shapes (e.g. Plaxis soils) to polygons (e.g. mesh surfaces) by area, centroid and
+    bounding box. Both sides are quantised to 'tol' and joined on the key in one pass, and pairs that
+    are unique on both sides are checked against the exact values. Only genuine ties (several polygons
+    or references sharing a key, e.g. mirror images with the same area and bounding box) go to an exact
+    geometric check: the centroid of the reference, then the Hausdorff distance of the outlines.
+    A tie that cannot be resolved is left unmatched rather than assigned in list order.
+    Param:
+        areas:         array (n) of the areas of the polygons
+        bounds:        array (n x 4) of the bounding boxes of the polygons, xmin, ymin, xmax, ymax
+        ref_areas:     array (m) of the areas of the references, NaN if unknown
+        ref_bounds:    array (m x 4) of the bounding boxes of the references
+        tol:           tolerance on areas and coordinates
+        centroids:     array (n x 2) of the centroids of the polygons. Default = None
+        ref_centroids: array (m x 2) of the centroids of the references, part of the join key when given
+                       with 'centroids'. Default = None, i.e. computed from 'ref_vertices' for ties only
+        geometries:    shapely polygons (n), needed to break ties. Default = None
+        ref_vertices:  function returning the array (k x 2) of the vertices of a reference from its index,
+                       only called for ties, e.g. to read the few Plaxis polygons concerned. Default = None
+    Return:
+        An int64 array (m) of the index of the polygon matched to each reference, -1 if none
+    '''
+    cols  = ['area', 'xmin', 'ymin', 'xmax', 'ymax']
+    shape = np.column_stack([np.asarray(areas, dtype=float), np.asarray(bounds, dtype=float).reshape(-1, 4)])
+    ref   = np.column_stack([np.asarray(ref_areas, dtype=float), np.asarray(ref_bounds, dtype=float).reshape(-1, 4)])
+    if centroids is not None:
+        centroids = np.asarray(centroids, dtype=float).reshape(-1, 2)
+    if centroids is not None and ref_centroids is not None:
+        cols  = cols + ['cx', 'cy']
+        shape = np.column_stack([shape, centroids])
+        ref   = np.column_stack([ref, np.asarray(ref_centroids, dtype=float).reshape(-1, 2)])
+    valid = np.isfinite(ref).all(axis=1)
+    df_shape = pd.DataFrame(np.round(shape / tol).astype(np.int64), columns=cols)
+    df_shape['polygon'] = np.arange(len(shape))
+    df_ref = pd.DataFrame(np.round(ref[valid] / tol).astype(np.int64), columns=cols)
+    df_ref['reference'] = np.flatnonzero(valid)
+    joined = df_ref.merge(df_shape, on=cols, how='inner')
+    n_poly = joined.groupby('reference')['polygon'].transform('size').to_numpy()
+    n_ref  = joined.groupby('polygon')['reference'].transform('size').to_numpy()
+    unique = (n_poly == 1) & (n_ref == 1)
+    matched = np.full(len(ref), -1, dtype=np.int64)
+    matched[joined['reference'].to_numpy()[unique]] = joined['polygon'].to_numpy()[unique]
+    # Exact check of the unique pairs, rounding could mislead at the edge of a quantum
+    hit = matched >= 0
+    exact = np.abs(shape[matched[hit]] - ref[hit]).max(axis=1) <= tol
+    matched[np.flatnonzero(hit)[~exact]] = -1
+    free = np.ones(len(shape), dtype=bool)
+    free[matched[matched >= 0]] = False
+    # Ties of the join, then references not resolved by it (keys split by rounding), among the free polygons
+    ties = joined[~unique].groupby('reference')['polygon'].apply(list)
+    left = [x for x in np.flatnonzero(valid & (matched < 0)) if x not in ties.index]
+    candidates = [(x, np.asarray(ties[x]), True) for x in ties.index] + \
+                 [(x, np.flatnonzero(np.abs(shape - ref[x]).max(axis=1) <= tol), False) for x in left]
+    for iref, polygons, tie in candidates:
+        polygons = polygons[free[polygons]]
+        if tie or len(polygons) > 1:
+            polygons = _break_tie(iref, polygons, tol, centroids, geometries, ref_vertices)
+        if len(polygons) == 1:
+            matched[iref] = polygons[0]
+            free[polygons[0]] = False
+    return matched
+
+
+def _break_tie(iref, polygons, tol, centroids, geometries, ref_vertices):
+    '''
+    Returns the polygons among candidates with the same outline as reference 'iref', within 'tol',
+    none if the outline of the reference is not known
+    '''
+    if ref_vertices is None or (centroids is None and geometries is None):
+        return polygons[:0]
+    outline = shapely.Polygon(np.asarray(ref_vertices(iref), dtype=float).reshape(-1, 2))
+    if centroids is not None:
+        centroid = np.array([outline.centroid.x, outline.centroid.y])
+        polygons = polygons[np.abs(centroids[polygons] - centroid).max(axis=1) <= tol]
+    if geometries is not None and len(polygons) > 0:
+        geometries = np.asarray(geometries, dtype=object)
+        polygons = polygons[shapely.hausdorff_distance(geometries[polygons], outline) <= tol]
+    return polygons
@@ -0,0 +1,100 @@
+# Import Python libraries
+import numpy as np
+import pandas as pd
+
+
+class StageMatrix:
+    '''
+    Material and activity of every soil in every phase, held as compact arrays of shape (phases x soils):
+        codes:     int32 matrix of material codes, -1 where a soil has no material
+        active:    bitpacked uint8 matrix of the activity, one bit per soil (see numpy.packbits)
+        phases:    names of the phases, i.e. the rows
+        soils:     names of the soils, i.e. the columns
+        materials: names of the materials, the code of a material is its position in this list
+    '''
+
+    def __init__(self, phases, soils, materials, codes, active):
+        self.phases    = list(phases)
+        self.soils     = np.asarray(soils, dtype=object)
+        self.materials = list(materials)
+        self.codes     = np.asarray(codes, dtype=np.int32).reshape(len(self.phases), len(self.soils))
+        self.active    = np.asarray(active, dtype=np.uint8)
+        self._phase_index    = {x: i for i, x in enumerate(self.phases)}
+        self._material_index = {x: i for i, x in enumerate(self.materials)}
+
+    @classmethod
+    def from_tables(cls, tables):
+        '''
+        Builds the matrix from one table per phase.
+        Param:
+            tables: ordered dictionary {phase name: dataframe indexed by soil name, columns Material and Active},
+                    e.g. BaseProject._tabulate(g_i.Soils, ['Material', 'Active'], phase)
+        '''
+        phases = list(tables)
+        soils  = pd.Index(list(dict.fromkeys(x for df in tables.values() for x in df.index)))
+        materials = pd.unique(pd.concat([df['Material'] for df in tables.values()]).dropna().astype(str)) \
+            if tables else []
+        material_index = pd.Index(materials)
+        codes  = np.full((len(phases), len(soils)), -1, dtype=np.int32)
+        active = np.zeros((len(phases), len(soils)), dtype=bool)
+        for i, df in enumerate(tables.values()):
+            df = df.reindex(soils)
+            mat = df['Material']
+            has = mat.notna().to_numpy()
+            codes[i, has] = material_index.get_indexer(mat[has].astype(str))
+            active[i] = df['Active'].fillna(False).astype(bool).to_numpy()
+        return cls(phases, soils, materials, codes, np.packbits(active, axis=1))
+
+    @property
+    def shape(self):
+        return len(self.phases), len(self.soils)
+
+    def is_active(self, phase=None):
+        '''
+        Returns the bool activity of all soils in a phase (array of soils), or of all phases if phase is None
+        '''
+        active = np.unpackbits(self.active, axis=1, count=len(self.soils)).astype(bool)
+        return active if phase is None else active[self._phase_index[phase]]
+
+    def material_code(self, material_name):
+        '''
+        Returns the code of a material, -1 if no soil uses it
+        '''
+        return self._material_index.get(material_name, -1)
+
+    def soils_with(self, material_name, phase, active=None):
+        '''
+        Returns the names of the soils made of a material in a phase.
+        Param:
+            material_name: name of the material
+            phase:         name of the phase
+            active:        True/False to keep only the active/inactive soils. Default = None, i.e. all
+        '''
+        code = self.material_code(material_name)
+        mask = self.codes[self._phase_index[phase]] == code
+        if code < 0:
+            mask[:] = False
+        if active is not None:
+            mask &= self.is_active(phase) == active
+        return list(self.soils[mask])
+
+    def material_names(self):
+        '''
+        Returns a dataframe (soils x phases) of the material names, None where a soil has no material
+        '''
+        names = np.array(self.materials + [None], dtype=object)
+        return pd.DataFrame(names[self.codes].T, index=self.soils, columns=self.phases)
+
+    def activity(self):
+        '''
+        Returns a bool dataframe (soils x phases) of the activity
+        '''
+        return pd.DataFrame(self.is_active().T, index=self.soils, columns=self.phases)
+
+    def to_frame(self):
+        '''
+        Returns a dataframe (soils x (phase, 'Material'/'Active')) of the material name and activity of every
+        soil, e.g. df[phase, 'Material']
+        '''
+        df = pd.concat(dict(Material=self.material_names(), Active=self.activity()), axis=1)
+        return df.swaplevel(axis=1)[pd.MultiIndex.from_product([self.phases, ['Material', 'Active']])]
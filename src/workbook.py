@@ -0,0 +1,320 @@
+# Import Python libraries
+import collections
+import hashlib
+import json
+import logging
+import pickle
+import re
+import numpy as np
+import pandas as pd
+from pathlib import Path
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+# Standard input worksheets, e.g. PP_MC_SFormat, PP_PlateCoord_SFormat, PP_BHData_SFormat
+SFORMAT_PATTERN = r'^PP_.*_SFormat$'
+
+# Suffix of the folder holding a compiled workbook, one Arrow IPC file per sheet
+COMPILED_SUFFIX = '.plxin'
+
+# Layout of the standard input worksheets.
+#   index:    column used as index of rows by the readers
+#   columns:  columns that must be present
+#   dtypes:   columns that must be castable to the given type
+#   rows:     entries of the index column that must be present
+#   numeric:  True if every column other than the index must be numeric (coordinate sheets)
+SheetSchema = collections.namedtuple('SheetSchema', 'index columns dtypes rows numeric')
+
+_COORD_SCHEMA = dict(columns=[], dtypes={}, rows=[], numeric=True)
+SCHEMAS = {
+    'PP_MC_SFormat':          SheetSchema(index='Soil',
+                                          columns=['MaterialName'],
+                                          dtypes={'MaterialNumber': 'int64', 'SoilModel': 'int64',
+                                                  'DrainageType': 'int64', 'Colour': 'int64',
+                                                  'InterfaceStrength': 'int64', 'CrossPermeability': 'int64'},
+                                          rows=[], numeric=False),
+    'PP_Plate_SFormat':       SheetSchema(index='Plate_ID',
+                                          columns=['MaterialName'],
+                                          dtypes={'IsIsotropic': 'bool', 'IsEndBearing': 'bool'},
+                                          rows=[], numeric=False),
+    'PP_PlateCoord_SFormat':  SheetSchema(index='MaterialName', **_COORD_SCHEMA),
+    'PP_AnchorCoord_SFormat': SheetSchema(index='MaterialName', **_COORD_SCHEMA),
+    'PP_ExcCoord_SFormat':    SheetSchema(index='ExcavationLevel',
+                                          columns=['Exc_x1', 'Exc_y1', 'Exc_x2', 'Exc_y2'],
+                                          dtypes={}, rows=[], numeric=True),
+    'PP_DewtrCoord_SFormat':  SheetSchema(index='DewaterLevel',
+                                          columns=['Dewtr_x1', 'Dewtr_y1', 'Dewtr_x2', 'Dewtr_y2'],
+                                          dtypes={}, rows=[], numeric=True),
+    'PP_BHData_SFormat':      SheetSchema(index='BH_name',
+                                          columns=['MaterialName'],
+                                          dtypes={},
+                                          rows=['BH_xcoord', 'BH_head'], numeric=False),
+}
+
+# Workbooks parsed in this session, {file hash: {sheet name: dataframe}}
+_workbooks = {}
+
+
+def file_hash(filename, blocksize=1 << 20):
+    '''
+    Returns the sha1 hash of the content of a file
+    '''
+    sha = hashlib.sha1()
+    with open(filename, 'rb') as fin:
+        for block in iter(lambda: fin.read(blocksize), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def read_workbook(filename, cache_dir=None, pattern=SFORMAT_PATTERN):
+    '''
+    Parses all standard input worksheets of a workbook in one go.
+    The result is kept in memory and pickled on disk, both keyed by the hash of the file,
+    so a workbook is only parsed again after it has been edited.
+    Param:
+        filename:  full file name of the workbook, including path
+        cache_dir: folder of the disk cache. Default = None, i.e. '.wbcache' next to the workbook
+        pattern:   regular expression of the names of the sheets to be parsed
+    Return:
+        A dictionary {sheet name: dataframe}
+    '''
+    filename = Path(filename)
+    if filename.suffix == COMPILED_SUFFIX:
+        return load_compiled(filename)
+    compiled = filename.with_suffix(COMPILED_SUFFIX)
+    key = file_hash(filename)
+    if key in _workbooks:
+        return _workbooks[key]
+    if pa is not None and _compiled_source(compiled) == key:   # compiled form is up to date
+        _workbooks[key] = load_compiled(compiled)
+        return _workbooks[key]
+    cache_dir = Path(cache_dir) if cache_dir is not None else filename.parent / '.wbcache'
+    cache_file = cache_dir / '{}-{}.pkl'.format(filename.stem, key)
+    if cache_file.exists():
+        try:
+            with open(cache_file, 'rb') as fin:
+                sheets = pickle.load(fin)
+            logger.info("Workbook loaded from cache: " + str(cache_file))
+            _workbooks[key] = sheets
+            return sheets
+        except Exception as e:  # a corrupted cache is simply rebuilt
+            logger.warning("Workbook cache ignored ({}): {}".format(e, cache_file))
+    with pd.ExcelFile(filename) as xls:
+        names = [x for x in xls.sheet_names if re.match(pattern, x)]
+        sheets = {x: xls.parse(x) for x in names}
+    logger.info("Workbook parsed, {} sheets read: {}".format(len(sheets), filename))
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for old in cache_dir.glob(filename.stem + '-*.pkl'):  # drop caches of older revisions
+            old.unlink()
+        with open(cache_file, 'wb') as fout:
+            pickle.dump(sheets, fout, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError as e:
+        logger.warning("Workbook cache not written: {}".format(e))
+    _workbooks[key] = sheets
+    return sheets
+
+
+def read_sheet(filename, sheetname, cache_dir=None):
+    '''
+    Returns a copy of one worksheet of a workbook, parsed through 'read_workbook'.
+    Sheets outside the standard format are read directly.
+    Param:
+        filename:  full file name of the workbook, including path
+        sheetname: name of the worksheet
+    Return:
+        A dataframe, safe to be modified by the caller
+    '''
+    if not re.match(SFORMAT_PATTERN, sheetname) and Path(filename).suffix != COMPILED_SUFFIX:
+        return pd.read_excel(filename, sheet_name=sheetname)
+    sheets = read_workbook(filename, cache_dir)
+    if sheetname not in sheets:
+        raise KeyError('Worksheet {} not found in {}'.format(sheetname, filename))
+    return sheets[sheetname].copy()
+
+
+def clear_cache():
+    '''
+    Forgets the workbooks parsed in this session, the disk cache is kept
+    '''
+    _workbooks.clear()
+
+
+def is_workbook(filename):
+    '''
+    Returns True if 'filename' is an input workbook, either Excel or compiled
+    '''
+    return str(filename).endswith(('.xlsm', '.xlsx', COMPILED_SUFFIX))
+
+
+def validate_sheet(sheetname, df):
+    '''
+    Checks a worksheet against its layout in SCHEMAS.
+    Param:
+        sheetname: name of the worksheet, e.g. 'PP_MC_SFormat'
+        df:        dataframe of the worksheet, as read from Excel
+    Return:
+        None, a ValueError listing all problems is raised if the sheet does not follow the layout
+    '''
+    if sheetname not in SCHEMAS:
+        return
+    schema = SCHEMAS[sheetname]
+    errors = []
+    missing = [x for x in [schema.index] + schema.columns + list(schema.dtypes) if x not in df.columns]
+    if missing:
+        errors.append('missing columns ' + ', '.join(missing))
+    if schema.index in df.columns:
+        missing_rows = [x for x in schema.rows if x not in set(df[schema.index])]
+        if missing_rows:
+            errors.append('missing rows ' + ', '.join(missing_rows))
+    used = df.dropna()
+    for col, dtype in schema.dtypes.items():
+        if col in df.columns and not _has_dtype(df[col].dropna(), dtype):
+            errors.append('column {} is not {}'.format(col, dtype))
+    if schema.numeric:
+        for col in used.columns:
+            if col != schema.index and pd.to_numeric(used[col], errors='coerce').isna().any():
+                errors.append('column {} is not numeric'.format(col))
+    if errors:
+        raise ValueError('Worksheet {} does not follow the standard format: {}'.format(
+                         sheetname, '; '.join(errors)))
+
+
+def compile_workbook(filename, out=None, pattern=SFORMAT_PATTERN):
+    '''
+    Validates the standard worksheets of an Excel workbook and writes them into a compact columnar
+    form, i.e. a folder holding one uncompressed Arrow IPC file per sheet, which the readers
+    memory-map instead of parsing Excel. This only needs to be run again when the workbook changes.
+    Param:
+        filename: full file name of the Excel workbook, including path
+        out:      folder to write. Default = None, i.e. '<workbook name>.plxin' next to the workbook
+        pattern:  regular expression of the names of the sheets to be compiled
+    Return:
+        The path of the compiled workbook
+    '''
+    if pa is None:
+        raise ImportError('pyarrow is needed to compile workbooks')
+    filename = Path(filename)
+    out = Path(out) if out is not None else filename.with_suffix(COMPILED_SUFFIX)
+    with pd.ExcelFile(filename) as xls:
+        sheets = {x: xls.parse(x) for x in xls.sheet_names if re.match(pattern, x)}
+    out.mkdir(parents=True, exist_ok=True)
+    for old in out.glob('*.arrow'):
+        old.unlink()
+    for sheetname, df in sheets.items():
+        validate_sheet(sheetname, df)
+        tidy, meta = _tidy(df)
+        table = pa.Table.from_pandas(tidy, preserve_index=False)
+        table = table.replace_schema_metadata(dict(table.schema.metadata or {}, plxin=json.dumps(meta)))
+        with pa.OSFile(str(out / (sheetname + '.arrow')), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    with open(out / 'manifest.json', 'w') as fout:
+        json.dump(dict(source=str(filename), source_hash=file_hash(filename),
+                       sheets=sorted(sheets)), fout, indent=2)
+    logger.info("Workbook compiled, {} sheets written to {}".format(len(sheets), out))
+    return out
+
+
+def load_compiled(path):
+    '''
+    Loads a workbook written by 'compile_workbook'. The Arrow files are memory-mapped, so
+    numeric columns without missing values are handed over to pandas without a copy.
+    Param:
+        path: folder of the compiled workbook
+    Return:
+        A dictionary {sheet name: dataframe}
+    '''
+    if pa is None:
+        raise ImportError('pyarrow is needed to read compiled workbooks')
+    path = Path(path)
+    with open(path / 'manifest.json', 'r') as fin:
+        manifest = json.load(fin)
+    sheets = {}
+    for sheetname in manifest['sheets']:
+        source = pa.memory_map(str(path / (sheetname + '.arrow')), 'r')
+        table = pa.ipc.open_file(source).read_all()
+        sheets[sheetname] = _untidy(table.to_pandas(split_blocks=True), table.schema.metadata)
+    return sheets
+
+
+def _compiled_source(path):
+    '''
+    Returns the hash of the workbook a compiled folder was made from, None if there is none
+    '''
+    try:
+        with open(Path(path) / 'manifest.json', 'r') as fin:
+            return json.load(fin)['source_hash']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _has_dtype(values, dtype):
+    '''
+    Returns True if all values (NaN dropped) are of a type: 'bool' takes True/False and 1/0,
+    'int64' takes whole numbers
+    '''
+    if dtype == 'bool':
+        return bool(values.map(lambda x: isinstance(x, (bool, np.bool_)) or x in (0, 1)).all())
+    if dtype == 'int64':
+        numeric = pd.to_numeric(values, errors='coerce')
+        return bool(numeric.notna().all() and (numeric % 1 == 0).all())
+    try:
+        values.astype(dtype)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def _tidy(df):
+    '''
+    Makes a worksheet storable as a columnar file without changing what the readers get back.
+    Object columns (e.g. numbers mixed with text, '0' marking unused rows) are stored as JSON text,
+    and the column labels (text or numbers) are kept aside, see '_untidy'.
+    Return:
+        df:   dataframe with columns '0', '1', ... and no object column other than text
+        meta: dictionary {labels: column labels, json: columns stored as JSON text}
+    '''
+    encoded = []
+    columns = {}
+    for i in range(df.shape[1]):
+        values = df.iloc[:, i]
+        if values.dtype == object:
+            values = values.map(lambda x: json.dumps(x, default=_json_value))
+            encoded.append(str(i))
+        columns[str(i)] = values
+    labels = [_json_value(x) if not isinstance(x, str) else x for x in df.columns]
+    return pd.DataFrame(columns, index=df.index), dict(labels=labels, json=encoded)
+
+
+def _untidy(df, metadata):
+    '''
+    Restores a worksheet stored by '_tidy', as read from Excel
+    '''
+    if not metadata or b'plxin' not in metadata:
+        return df
+    meta = json.loads(metadata[b'plxin'])
+    for col in meta['json']:
+        df[col] = pd.Series([json.loads(x) for x in df[col]], index=df.index, dtype=object)
+    df.columns = meta['labels']
+    return df
+
+
+def _json_value(x):
+    '''
+    Converts numpy scalars (and any other value) for JSON, text as a last resort
+    '''
+    if isinstance(x, (bool, np.bool_)):
+        return bool(x)
+    if isinstance(x, np.integer):
+        return int(x)
+    if isinstance(x, np.floating):
+        return float(x)
+    if isinstance(x, (int, float)):
+        return x
+    return str(x)
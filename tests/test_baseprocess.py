@@ -0,0 +1,231 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from baseprocess import BaseProject
+
+TABLE = ('Name\tMaterialName\tMaterialNumber\tSoilModel\tDrainageType\tgammaUnsat\tUseAlternatives\tcinc\n'
+         'SoilMat_1\tClay\t1\t2\t1\t18.5\tFalse\tN/A\n'
+         'SoilMat_2\tSand\t2\t2\t0\t20\tTrue\t\n')
+
+
+class FakeCollection(list):
+    '''
+    Stand-in for a Plaxis collection, e.g. g_i.Plates, holding the names of its objects
+    '''
+    def table(self):
+        return 'Name\tName\n' + ''.join('{0}\t{0}\n'.format(x) for x in self)
+
+
+class FakeServer:
+    def __init__(self, g_i):
+        self.g_i = g_i
+
+    def call_and_handle_commands(self, *commands):
+        self.g_i.calls.append(('commands',) + commands)
+        for command in commands:
+            if command.startswith('delete '):
+                for name in command.split()[1:]:
+                    for objects in self.g_i.__dict__.values():
+                        if isinstance(objects, FakeCollection) and name in objects:
+                            objects.remove(name)
+        return ['OK'] * len(commands)
+
+
+class FakeInput:
+    '''
+    Stand-in for the Plaxis Input global object, recording the commands it receives
+    '''
+    def __init__(self, tables=None):
+        self.tables = tables or {}
+        self.calls = []
+
+    def tabulate(self, *args):
+        self.calls.append(('tabulate',) + args)
+        if isinstance(args[0], FakeCollection):
+            return self.tables.get(args[1:2], args[0].table())
+        return self.tables[args[0]]
+
+    def __getattr__(self, name):
+        if name.startswith('goto'):
+            return lambda: self.calls.append((name,))
+        raise AttributeError(name)
+
+    def count(self, objects):
+        self.calls.append(('count', objects))
+        return '{} items'.format(len(objects))
+
+    def filter(self, objects, kind):
+        return kind
+
+    Materials = 'Materials'
+
+
+def _project(g_i):
+    project = BaseProject.__new__(BaseProject)
+    project._g_i = g_i
+    project._s_i = FakeServer(g_i)
+    project.logger = logging.getLogger(__name__)
+    return project
+
+
+def test_parse_tabulate_types_columns():
+    df = BaseProject._parse_tabulate(TABLE)
+    assert list(df.index) == ['SoilMat_1', 'SoilMat_2']
+    assert df['MaterialNumber'].dtype == np.int64
+    assert df['gammaUnsat'].dtype == np.float64
+    assert df['UseAlternatives'].tolist() == [False, True]
+    assert df['cinc'].isna().all()
+    assert df.loc['SoilMat_1', 'MaterialName'] == 'Clay'
+
+
+def test_tabulate_makes_one_call():
+    g_i = FakeInput({'SoilMat': TABLE})
+    df = _project(g_i)._tabulate('SoilMat', ['MaterialName', 'SoilModel'], 'Phase_1')
+    assert g_i.calls == [('tabulate', 'SoilMat', 'MaterialName SoilModel', 'Phase_1')]
+    assert len(df) == 2
+
+
+def test_name_index_pairs_names_and_objects():
+    plates = ['obj_a', 'obj_b']
+    g_i = FakeInput()
+    g_i.tabulate = lambda objects, props: 'Name\tName\nPlate_1\tPlate_1\nPlate_2\tPlate_2\n'
+    assert _project(g_i)._name_index(plates) == {'Plate_1': 'obj_a', 'Plate_2': 'obj_b'}
+
+
+def test_mat_extract_table_is_indexed_by_material_name():
+    df = _project(FakeInput({'SoilMat': TABLE})).mat_extract_table('SoilMat', ['SoilModel', 'DrainageType'])
+    assert list(df.index) == ['Clay', 'Sand']
+    assert list(df.columns) == ['MaterialName', 'SoilModel', 'DrainageType']
+
+
+def test_mat_excel_rows_from_typed_table():
+    df = _project(FakeInput({'SoilMat': TABLE})).mat_extract_table('SoilMat')
+    df['cref'] = [5.0, 0.0]
+    df['phi'] = [np.nan, 32.0]
+    rows = BaseProject._mat_excel_rows(df)
+    assert rows[0][:4] == [1, 'Clay', 'Mohr-Coulomb', 'Undrained (A)']
+    assert rows[0][8] == 5.0 and rows[0][6] is None
+    assert rows[1][3] == 'Drained' and rows[1][7] == 32.0
+    assert all(len(x) == 25 for x in rows)
+
+
+def test_build_geometry_sends_one_batch():
+    g_i = FakeInput()
+    g_i.Plates = FakeCollection(['Plate_W1', 'Plate_W2'])
+    g_i.Lines = FakeCollection(['Line_W1', 'Line_W2'])
+    g_i.Points = FakeCollection(['Point_Plate_W1_1', 'Point_Plate_W1_2', 'Point_Plate_W2_1', 'Point_Plate_W2_2'])
+    df = pd.DataFrame({'x1': [0, 5], 'y1': [0, 0], 'x2': [0, 5], 'y2': [-10, -12]}, index=['W1', 'W2'])
+    created = _project(g_i).build_geometry('plate', df, materials={'W1': 'PlateMat_1', 'W2': 'PlateMat_2'})
+    commands = [x for x in g_i.calls if x[0] == 'commands']
+    assert len(commands) == 1
+    assert commands[0][1:8] == ('gotostructures', 'plate 0.0 0.0 0.0 -10.0', 'rename Plates[-1] "Plate_W1"',
+                                'rename Lines[-1] "Line_W1"', 'rename Line_W1.First "Point_Plate_W1_1"',
+                                'rename Line_W1.Second "Point_Plate_W1_2"', 'set Plate_W1.Material PlateMat_1')
+    assert commands[0][-1] == 'set Plate_W2.Material PlateMat_2'
+    # one listing per object type
+    assert len([x for x in g_i.calls if x[0] == 'tabulate']) == 3
+    assert sorted(created) == sorted(g_i.Plates + g_i.Lines + g_i.Points)
+
+
+def test_build_geometry_waterlevel_and_interfaces():
+    g_i = FakeInput()
+    g_i.UserWaterLevels = FakeCollection(['UserWaterLvl_1'])
+    df = pd.DataFrame({'x1': [0.0], 'y1': [-2.0], 'x2': [50.0], 'y2': [-2.0]}, index=[1])
+    _project(g_i).build_geometry('waterlevel', df)
+    assert g_i.calls[0][1:] == ('gotoflow', 'waterlevel 0.0 -2.0 50.0 -2.0', 'rename UserWaterLevels[-1] "UserWaterLvl_1"')
+
+    g_i = FakeInput()
+    for name in ['Lines', 'Points', 'NegativeInterfaces', 'PositiveInterfaces']:
+        setattr(g_i, name, FakeCollection())
+    _project(g_i).build_geometry('line', df, interfaces=True)
+    assert g_i.calls[0][1:] == ('gotostructures', 'line 0.0 -2.0 50.0 -2.0', 'rename Lines[-1] "Line_1"',
+                                'rename Line_1.First "Point_Line_1_1"', 'rename Line_1.Second "Point_Line_1_2"',
+                                'neginterface Line_1', 'rename NegativeInterfaces[-1] "NegInterface_1"',
+                                'posinterface Line_1', 'rename PositiveInterfaces[-1] "PosInterface_1"')
+
+
+def test_delete_objects_sends_one_delete():
+    g_i = FakeInput()
+    g_i.Plates = FakeCollection(['Plate_W1', 'Plate_W2', 'Plate_S1'])
+    assert _project(g_i).delete_objects('Plates', pattern=r'Plate_W.*', mode='gotostructures') == 2
+    assert g_i.calls[0] == ('gotostructures',)
+    deletes = [x for x in g_i.calls if x[0] == 'commands']
+    assert deletes == [('commands', 'delete Plate_W1 Plate_W2')]
+    assert g_i.Plates == ['Plate_S1']
+    assert g_i.calls[-1] == ('count', g_i.Plates)
+
+
+def test_delete_objects_inside_bounding_box():
+    g_i = FakeInput({('BoundingBox',): 'Name\tBoundingBox\n'
+                                     'Borehole_1\tmin: (0; -20; 0) max: (0; 0; 0)\n'
+                                     'Borehole_2\tmin: (50; -20; 0) max: (50; 0; 0)\n'})
+    g_i.Boreholes = FakeCollection(['Borehole_1', 'Borehole_2'])
+    assert _project(g_i).delete_objects('Boreholes', bbox=(-1, -30, 10, 1), mode='gotosoil') == 1
+    assert g_i.calls[0] == ('gotosoil',)
+    assert g_i.Boreholes == ['Borehole_2']
+
+
+def test_delete_objects_of_empty_collection():
+    g_i = FakeInput()
+    g_i.Plates = FakeCollection()
+    assert _project(g_i).delete_objects('Plates') == 0
+    assert [x for x in g_i.calls if x[0] == 'commands'] == []
+
+
+def _bh_project(**changes):
+    g_i = FakeInput({'SoilMat': TABLE})
+    g_i.Soillayers = FakeCollection(['Soillayer_1', 'Soillayer_2', 'Soillayer_3'])
+    data = {'BH_1': [0.0, -2.0, 0, -3.0, 1, -8.0, 2, -20.0],
+            'BH_2': [40.0, -2.5, 0, -4.0, 1, -8.0, 2, -25.0],
+            'MaterialName': [0, 0, 0, 0, 'Clay', 0, 'Sand', 0]}
+    data.update(changes)
+    project = _project(g_i)
+    project._dfg_BH_Data = pd.DataFrame(data, index=['BH_xcoord', 'BH_head', 'BH_slay_num_00', 'BH_slay_btm_00',
+                                                     'BH_slay_num_01', 'BH_slay_btm_01',
+                                                     'BH_slay_num_02', 'BH_slay_btm_02'])
+    return project, g_i
+
+
+def test_bh_data_input_commands():
+    project, g_i = _bh_project()
+    project._bh_data_input()
+    first, second = [x[1:] for x in g_i.calls if x[0] == 'commands']
+    assert first == ('gotosoil', 'borehole 0.0', 'rename Boreholes[-1] "BH_1"', 'set BH_1.Head -2.0',
+                     'borehole 40.0', 'rename Boreholes[-1] "BH_2"', 'set BH_2.Head -2.5',
+                     'soillayer 0', 'soillayer 0', 'soillayer 0')
+    assert second == ('setsoillayerlevel BH_1 0 -3.0', 'setsoillayerlevel BH_2 0 -4.0',
+                      'setsoillayerlevel BH_1 1 -8.0', 'setsoillayerlevel BH_2 1 -8.0',
+                      'setsoillayerlevel BH_1 2 -20.0', 'setsoillayerlevel BH_2 2 -25.0',
+                      'set Soillayer_1.Soil.Material SoilMat_1', 'set Soillayer_2.Soil.Material SoilMat_2')
+
+
+@pytest.mark.parametrize('column, message', [
+    ([0.0, -2.5, 0, -4.0, 1, np.nan, 2, -25.0], 'Missing soil layer data in boreholes: BH_2'),
+    ([0.0, -2.5, 0, -4.0, 2, -8.0, 1, -25.0], 'Soil layer numbers differ'),
+    ([0.0, -2.5, 0, -4.0, 1, -3.0, 2, -25.0], 'Soil layer bottoms rise with depth in boreholes: BH_2')])
+def test_bh_data_input_validates_layers(column, message):
+    project, g_i = _bh_project(BH_2=column)
+    with pytest.raises(ValueError, match=message):
+        project._bh_data_input()
+    assert g_i.calls == []
+
+
+def test_soilpoly_extract_df_from_one_tabulate():
+    g_i = FakeInput({('Area BoundingBox CoarsenessFactor',):
+                     'Name\tArea\tBoundingBox\tCoarsenessFactor\n'
+                     'Polygon_1\t200\tmin: (0; -10; 0) max: (20; 0; 0)\t1\n'
+                     'Polygon_2\t150.5\tmin: (0; -20; 0) max: (20; -10; 0)\t0.5\n'})
+    g_i.SoilPolygons = FakeCollection(['Polygon_1', 'Polygon_2'])
+    project = _project(g_i)
+    df = project.soilpoly_extract_df()
+    assert g_i.calls == [('gotostages',), ('tabulate', g_i.SoilPolygons, 'Area BoundingBox CoarsenessFactor')]
+    assert df['PolygonName'].tolist() == ['Polygon_1', 'Polygon_2']
+    np.testing.assert_array_equal(df['Area'], [200.0, 150.5])
+    np.testing.assert_array_equal(df[['BB_xmin', 'BB_xmax', 'BB_ymax', 'BB_ymin']],
+                                  [[0, 20, 0, -10], [0, 20, -10, -20]])
+    np.testing.assert_array_equal(df['CoarsenessFactor'], [1.0, 0.5])
+    assert df['echoinfo'].isna().all()
+    assert project._plx_soilpoly == {'Polygon_1': 'Polygon_1', 'Polygon_2': 'Polygon_2'}
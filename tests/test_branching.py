@@ -0,0 +1,117 @@
+from pathlib import Path
+
+import pytest
+
+from branching import BranchExecutor
+from phaseplan import PhasePlan
+
+
+class FakeProject:
+    '''
+    Stand-in for BaseProject: files are written where Plaxis would write them, and calls are recorded
+    '''
+    def __init__(self):
+        self.calls = []
+        self.open_file = None
+        self._applied_phase_plan = None
+        self.skipped_phases = []
+
+    def _write(self, fileloc, text):
+        fileloc = Path(fileloc)
+        fileloc.parent.mkdir(parents=True, exist_ok=True)
+        with open(fileloc, 'a') as fout:
+            fout.write(text)
+        data = fileloc.with_suffix(fileloc.suffix + 'dat')
+        data.mkdir(exist_ok=True)
+        (data / 'data.meshinfo').write_text('mesh')
+
+    def restore(self, dirname, filename, suffix):
+        self.open_file = Path(dirname, filename).with_suffix(suffix)
+        assert self.open_file.exists()
+        self.calls.append(('restore', self.open_file.name))
+
+    def savecopy(self, dirname, filename, suffix):
+        fileloc = Path(dirname, filename).with_suffix(suffix)
+        self._write(fileloc, Path(self.open_file).read_text() if self.open_file else 'model\n')
+        self.calls.append(('savecopy', fileloc.name))
+
+    def apply_phase_plan(self, plan):
+        self.calls.append(('apply', [x.name for x in plan.ordered()]))
+        return [x.name for x in plan.ordered()]
+
+    def allshouldcalc(self):
+        self.calls.append(('allshouldcalc',))
+
+    def shouldcalc_affected(self, plan, changed_phases=()):
+        return list(changed_phases)
+
+    def runcalc(self):
+        self.calls.append(('runcalc',))
+        if self.open_file is not None:      # Calculate saves into the open project
+            self._write(self.open_file, 'calculated\n')
+
+
+def _plans():
+    prefix = PhasePlan()
+    prefix.plastic('Phase_1')
+    variants = {}
+    for name, interval in [('A', 10), ('B', 20)]:
+        variant = PhasePlan()
+        variant.consolidation('Phase_2', 'Phase_1', ConsParam=interval)
+        variants[name] = variant
+    return prefix, variants
+
+
+def test_prefix_key_needs_model_key():
+    prefix, _ = _plans()
+    with pytest.raises(ValueError):
+        BranchExecutor.prefix_key(prefix, '')
+    assert BranchExecutor.prefix_key(prefix, 'model_1') != BranchExecutor.prefix_key(prefix, 'model_2')
+    assert BranchExecutor.prefix_key(prefix, 'model_1') == BranchExecutor.prefix_key(prefix, 'model_1')
+
+
+def test_variants_fork_from_copies_of_the_checkpoint(tmp_path):
+    prefix, variants = _plans()
+    proj = FakeProject()
+    executor = BranchExecutor(proj, tmp_path / 'ckpt')
+    calculated = executor.run(prefix, variants, 'model_1', output_dir=tmp_path / 'out')
+    key = executor.prefix_key(prefix, 'model_1')
+    checkpoint = (tmp_path / 'ckpt' / key).with_suffix('.p2dx')
+    before = checkpoint.read_text()
+    assert calculated == {'A': ['Phase_1', 'Phase_2'], 'B': ['Phase_1', 'Phase_2']}
+    assert [x[0] for x in proj.calls] == ['apply', 'allshouldcalc', 'runcalc', 'savecopy',
+                                          'restore', 'apply', 'runcalc', 'restore', 'apply', 'runcalc']
+    assert proj.calls[4] == ('restore', 'A.p2dx') and proj.calls[7] == ('restore', 'B.p2dx')
+    # the checkpoint is never calculated into, each variant holds its own calculation only
+    assert checkpoint.read_text() == before
+    assert (tmp_path / 'out' / 'B.p2dx').read_text() == before + 'calculated\n'
+    # a second run reuses the checkpoint
+    proj.calls = []
+    executor.run(prefix, variants, 'model_1')
+    assert [x[0] for x in proj.calls] == ['restore', 'apply', 'runcalc', 'restore', 'apply', 'runcalc']
+    assert checkpoint.read_text() == before
+
+
+def test_least_recently_used_checkpoint_is_evicted(tmp_path):
+    prefix, variants = _plans()
+    executor = BranchExecutor(FakeProject(), tmp_path / 'ckpt', budget_bytes=1)
+    executor.run(prefix, {}, 'model_1')
+    first = executor.prefix_key(prefix, 'model_1')
+    assert executor._has_checkpoint(first)
+    executor.run(prefix, {}, 'model_2')
+    assert not executor._has_checkpoint(first)
+    assert executor._has_checkpoint(executor.prefix_key(prefix, 'model_2'))
+    assert list(BranchExecutor(FakeProject(), tmp_path / 'ckpt')._index) == \
+        [executor.prefix_key(prefix, 'model_2')]
+
+
+def test_touch_refreshes_checkpoint_size(tmp_path):
+    prefix, _ = _plans()
+    executor = BranchExecutor(FakeProject(), tmp_path / 'ckpt')
+    executor.run(prefix, {}, 'model_1')
+    key = executor.prefix_key(prefix, 'model_1')
+    size = executor._index[key]['size']
+    with open(executor._paths(key)[0], 'a') as fout:
+        fout.write('x' * 100)
+    executor._touch(key)
+    assert executor._index[key]['size'] == size + 100
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('shapely')
+
+from interpolation import MeshInterpolator
+
+
+def _lattice_nodes(corners, p):
+    '''
+    Nodes of a straight-sided triangle of order p, in a scrambled local order
+    '''
+    corners = np.asarray(corners, dtype=float)
+    nodes = [(i * corners[0] + j * corners[1] + (p - i - j) * corners[2]) / p
+             for i in range(p + 1) for j in range(p + 1 - i)]
+    return np.random.default_rng(p).permutation(np.array(nodes))
+
+
+def _mesh(p):
+    # two triangles splitting the rectangle (0, 0) - (2, 1) along its diagonal
+    return np.stack([_lattice_nodes([(0, 0), (2, 0), (2, 1)], p), _lattice_nodes([(0, 0), (2, 1), (0, 1)], p)])
+
+
+@pytest.mark.parametrize('p, field', [
+    (2, lambda x, y: 1 + 2 * x - y + 0.5 * x * x - x * y + 3 * y * y),
+    (4, lambda x, y: x ** 4 - 2 * x * x * y * y + y ** 3 * x - 4 * x + 7)])
+def test_polynomial_fields_are_reproduced(p, field):
+    xy = _mesh(p)
+    assert xy.shape[1] == (p + 1) * (p + 2) // 2      # 6- and 15-noded triangles
+    # nodal results as read from Plaxis, rows of the elements interleaved
+    element_id = np.repeat([7, 3], xy.shape[1])
+    rows = np.random.default_rng(0).permutation(len(element_id))
+    x, y = xy.reshape(-1, 2)[rows].T
+    mesh = MeshInterpolator.from_results(x, y, element_id[rows])
+    assert mesh.p == p
+    points = np.array([[0.3, 0.1], [1.7, 0.9], [1.0, 0.5], [0.1, 0.8], [2.0, 1.0], [5.0, 0.5]])
+    values = mesh.interpolate(field(x, y), points)
+    np.testing.assert_allclose(values[:-1], field(*points[:-1].T), rtol=1e-10, atol=1e-10)
+    assert np.isnan(values[-1])
+
+
+def test_weights_are_reused_across_results():
+    xy = _mesh(2)
+    mesh = MeshInterpolator(xy)
+    weights = mesh.weights([[0.5, 0.2], [-1.0, 0.0]])
+    np.testing.assert_array_equal(weights[0] >= 0, [True, False])
+    x, y = xy.reshape(-1, 2).T
+    out = mesh.interpolate({'X': x, 'Y': y}, weights=weights)
+    np.testing.assert_allclose(out['X'][:1], [0.5])
+    np.testing.assert_allclose(out['Y'][:1], [0.2])
+    assert np.isnan(out['X'][1]) and np.isnan(out['Y'][1])
+
+
+def test_not_a_triangle():
+    with pytest.raises(ValueError):
+        MeshInterpolator(np.zeros((1, 4, 2)))
+
+
+def test_locate_points_on_shared_nodes():
+    # corner (0, 0) and diagonal points are shared by both triangles, the first element is kept
+    mesh = MeshInterpolator(_mesh(2))
+    np.testing.assert_array_equal(mesh.locate([[0.0, 0.0], [1.0, 0.5], [1.5, 0.2], [0.2, 0.8], [0.0, 0.0]]),
+                                  [0, 0, 0, 1, 0])
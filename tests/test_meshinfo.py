@@ -0,0 +1,78 @@
+import numpy as np
+
+import os
+
+from meshinfo import clear_mesh_cache, load_mesh, read_meshinfo
+
+MESHINFO = '''POINTS
+P1 = (0, 0, 0)
+P2 = (2, 0, 0)
+P3 = (2, 1, 0)
+P4 = (0, 1, 0)
+P5 = (4, 0, 0)
+CURVES
+C1 = (P1, P2)
+C2 = (P2, P3)
+C3 = (P3, P4)
+C4 = (P4, P1)
+C5 = (P2, P5)
+C6 = (P5, P3)
+SURFACES
+S1 = (C1, C2, C3, C4)
+S2 = (C5, C6, -C2)
+MATERIALS
+M1 = (Clay, 2)
+free text
+'''
+
+
+def _write(tmp_path):
+    folder = tmp_path / 'model.p2dxdat'
+    folder.mkdir()
+    (folder / 'data.meshinfo').write_text(MESHINFO)
+    return str(folder)
+
+
+def test_read_meshinfo(tmp_path):
+    mesh = read_meshinfo(_write(tmp_path))
+    assert list(mesh.surface_ids) == ['S1', 'S2']
+    np.testing.assert_array_equal(mesh.curves[4], [1, 4])
+    np.testing.assert_array_equal(mesh.surface_ptr, [0, 4, 7])
+    np.testing.assert_array_equal(mesh.surface_flip, [False] * 6 + [True])
+    np.testing.assert_allclose(mesh.areas(), [2.0, 1.0])
+    np.testing.assert_allclose(mesh.centroids(), [[1.0, 0.5], [8 / 3, 1 / 3]])
+    np.testing.assert_allclose(mesh.bounds(), [[0, 0, 2, 1], [2, 0, 4, 1]])
+
+
+def test_read_meshinfo_keeps_other_sections_raw(tmp_path):
+    mesh = read_meshinfo(_write(tmp_path))
+    assert mesh.sections == {'MATERIALS': [('M1', ['Clay', '2']), (None, ['free', 'text'])]}
+
+
+def test_load_mesh_cache_round_trip(tmp_path):
+    path = _write(tmp_path)
+    first = load_mesh(path)
+    second = load_mesh(path)
+    assert not second.points.flags.writeable      # memory-mapped from the cache
+    np.testing.assert_array_equal(first.points, second.points)
+    np.testing.assert_allclose(second.areas(), [2.0, 1.0])
+    assert second.sections == first.sections
+    assert (tmp_path / 'model.p2dxdat.meshcache').is_dir()
+
+
+def test_load_mesh_cache_follows_the_file(tmp_path):
+    path = _write(tmp_path)
+    meshinfo = os.path.join(path, 'data.meshinfo')
+    load_mesh(path)
+    # touched but unchanged: served from the cache
+    os.utime(meshinfo, ns=(1, 1))
+    assert not load_mesh(path).points.flags.writeable
+    # rewritten by Plaxis: parsed again
+    with open(meshinfo, 'w') as fout:
+        fout.write(MESHINFO.replace('P5 = (4, 0, 0)', 'P5 = (6, 0, 0)'))
+    mesh = load_mesh(path)
+    assert mesh.points.flags.writeable
+    np.testing.assert_allclose(mesh.areas(), [2.0, 2.0])
+    np.testing.assert_allclose(load_mesh(path).areas(), [2.0, 2.0])
+    clear_mesh_cache(path)
+    assert not (tmp_path / 'model.p2dxdat.meshcache').exists()
@@ -0,0 +1,121 @@
+import logging
+import os
+
+import pytest
+
+pytest.importorskip('matplotlib')
+pytest.importorskip('plxscripting')
+
+import results
+from outputbase import OutputBase
+
+
+class _Value:
+    def __init__(self, value):
+        self.value = value
+
+
+class _Phase:
+    def __init__(self, name, updated_mesh=False):
+        self.name = name
+        self.Deform = type('Deform', (), dict(UseUpdatedMesh=_Value(updated_mesh)))()
+
+    def __str__(self):
+        return self.name
+
+
+class _Output:
+    '''
+    Stand-in for the Plaxis Output global object, 'nodes' gives the node count of a category in a phase
+    '''
+    class ResultTypes:
+        class Soil:
+            X, Y = 'Soil.X', 'Soil.Y'
+
+        class NodeToNodeAnchor:
+            X, Y = 'NodeToNodeAnchor.X', 'NodeToNodeAnchor.Y'
+
+    def __init__(self, nodes, filename=None):
+        self.nodes = nodes
+        self.calls = []
+        self.filename = filename
+
+    @property
+    def Project(self):
+        if self.filename is None:
+            raise AttributeError('Project')
+        self.calls.append(('Project',))
+        return type('Project', (), dict(Filename=_Value(self.filename)))()
+
+    def getresults(self, target, rtype, location):
+        self.calls.append((str(target), rtype))
+        category = rtype.split('.')[0]
+        return [float(len(self.calls))] * self.nodes[category, str(target)]
+
+
+def _output(nodes, filename=None):
+    project = OutputBase.__new__(OutputBase)
+    project._g_o = _Output(nodes, filename)
+    project._node_geometry = {}
+    project._updated_mesh = {}
+    project._results_cache = results.ResultCache()
+    project._project_key = None
+    project.logger = logging.getLogger(__name__)
+    return project
+
+
+def test_soil_coordinates_shared_without_updated_mesh():
+    phases = [_Phase('Phase_1'), _Phase('Phase_2'), _Phase('Phase_3', updated_mesh=True)]
+    project = _output({('Soil', str(x)): 10 for x in phases})
+    first, _ = project._node_coords(phases[0], 'Soil', 10)
+    assert project._node_coords(phases[1], 'Soil', 10)[0] is first
+    assert project._node_coords(phases[2], 'Soil', 10)[0] is not first
+    assert len(project.g_o.calls) == 4
+
+
+def test_structure_coordinates_kept_per_phase():
+    phases = [_Phase('Phase_1'), _Phase('Phase_2')]
+    # same number of anchor nodes, but not the same anchors
+    project = _output({('NodeToNodeAnchor', str(x)): 4 for x in phases})
+    x1, _ = project._node_coords(phases[0], 'NodeToNodeAnchor', 4)
+    x2, _ = project._node_coords(phases[1], 'NodeToNodeAnchor', 4)
+    assert x1[0] != x2[0]
+    assert project._node_coords(phases[0], 'NodeToNodeAnchor', 4)[0] is x1
+    assert ('NodeToNodeAnchor', None) not in project._node_geometry
+
+
+def test_soil_coordinates_of_another_node_count_kept_per_phase():
+    phases = [_Phase('Phase_1'), _Phase('Phase_2')]
+    project = _output({('Soil', 'Phase_1'): 10, ('Soil', 'Phase_2'): 8})
+    project._node_coords(phases[0], 'Soil', 10)
+    x, y = project._node_coords(phases[1], 'Soil', 8)
+    assert len(x) == 8
+    assert len(project._node_coords(phases[0], 'Soil', 10)[0]) == 10
+    assert len(project.g_o.calls) == 4
+
+
+def test_project_key_read_once_per_opening(tmp_path):
+    fileloc = tmp_path / 'model.p2dx'
+    fileloc.write_text('model')
+    phase = _Phase('Phase_1')
+    project = _output({('Soil', 'Phase_1'): 5}, str(fileloc))
+    first = project.getresults(phase, 'Soil.X')
+    again = project.getresults(phase, 'Soil.X')
+    assert again is first
+    assert project.g_o.calls == [('Project',), ('Phase_1', 'Soil.X')]
+    project.getresults(phase, 'Soil.Y')
+    assert project.g_o.calls.count(('Project',)) == 1
+    # recalculated: the key is read again once the cache is cleared
+    os.utime(fileloc, ns=(1, 1))
+    project.clear_geometry_cache()
+    assert project.getresults(phase, 'Soil.X') is not first
+    assert project.g_o.calls.count(('Project',)) == 2
+
+
+def test_results_not_cached_without_project_file():
+    phase = _Phase('Phase_1')
+    project = _output({('Soil', 'Phase_1'): 5})
+    project.getresults(phase, 'Soil.X')
+    project.getresults(phase, 'Soil.X')
+    assert project.g_o.calls == [('Phase_1', 'Soil.X')] * 2
+    assert project._project_key == ''
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from phaseplan import PhasePlan, _quote
+
+
+def _plan():
+    plan = PhasePlan()
+    plan.plastic('Phase_1', activate=['Plate_1'])
+    plan.consolidation('Phase_2', 'Phase_1', ConsParam=10)
+    plan.plastic('Phase_3', 'Phase_2', activate=['LineLoad_1'])
+    return plan
+
+
+def _existing(plan):
+    rows = {}
+    for spec in plan.ordered():
+        settings = spec.settings()
+        rows[spec.name] = dict(PreviousPhase=spec.parent,
+                               **{k: settings.get(k, np.nan) for k in PhasePlan.TABULATED[1:]})
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+
+def test_compile_creates_all_phases_in_order():
+    commands, touched = _plan().compile()
+    assert touched == ['Phase_1', 'Phase_2', 'Phase_3']
+    created = [x for x in commands if x.startswith('rename')]
+    assert created == ['rename Phases[-1] "Phase_1"', 'rename Phases[-1] "Phase_2"',
+                       'rename Phases[-1] "Phase_3"']
+    assert 'set Phase_2.TimeInterval 10' in commands
+    assert 'activate LineLoad_1 Phase_3' in commands
+
+
+def test_compile_is_empty_when_nothing_changed():
+    plan = _plan()
+    commands, touched = plan.compile(_existing(plan), applied=plan.copy())
+    assert commands == []
+    assert touched == []
+
+
+def test_compile_touches_only_the_changed_phase():
+    plan = _plan()
+    applied = plan.copy()
+    plan.consolidation('Phase_2', 'Phase_1', ConsParam=30)
+    commands, touched = plan.compile(_existing(applied), applied=applied)
+    assert touched == ['Phase_2']
+    assert commands == ['set Phase_2.TimeInterval 30']
+
+
+def test_affected_follows_descendants():
+    plan = _plan()
+    assert plan.affected(['LineLoad_1']) == ['Phase_3']
+    assert plan.affected(changed_phases=['Phase_2']) == ['Phase_2', 'Phase_3']
+    assert plan.affected(['Plate_1']) == ['Phase_1', 'Phase_2', 'Phase_3']
+
+
+def test_affected_by_unreferenced_object_is_whole_plan():
+    assert _plan().affected(['SoilMat_Clay']) == ['Phase_1', 'Phase_2', 'Phase_3']
+
+
+def test_quote_numpy_scalars():
+    assert _quote(np.float64(1.5)) == '1.5'
+    assert _quote(np.int64(3)) == '3'
+    assert _quote(True) == 'True'
+    assert _quote('Plastic') == '"Plastic"'
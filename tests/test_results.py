@@ -0,0 +1,302 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import results
+
+
+class _Value:
+    def __init__(self, value):
+        self.value = value
+
+
+class _Step:
+    def __init__(self, time):
+        self.Reached = type('Reached', (), dict(Time=_Value(time)))()
+
+
+class _Phase:
+    def __init__(self, name, nsteps):
+        self.Name = _Value(name)
+        self.Steps = [_Step(float(i)) for i in range(nsteps)]
+
+    def __str__(self):
+        return self.Name.value
+
+
+class _Output:
+    '''
+    Stand-in for the Plaxis Output global object
+    '''
+    class ResultTypes:
+        class Soil:
+            Utot = 'Soil.Utot'
+            Time = 'Soil.Time'
+            X = 'Soil.X'
+
+    def __init__(self, phases, times=None):
+        self.Phases = phases
+        self.times = times
+        self.calls = []
+
+    def getresults(self, target, rtype, location):
+        return list(range(10)) if rtype == 'Soil.X' else [1.0] * 10
+
+    def getcurveresultspath(self, point, first, last, rtype):
+        self.calls.append((point, str(first), str(last), rtype))
+        phases = self.Phases[self.Phases.index(first):self.Phases.index(last) + 1]
+        if rtype == 'Soil.Time':
+            if self.times is not None:
+                return self.times
+            return [s.Reached.Time.value for p in phases for s in p.Steps]
+        scale = 10.0 if rtype == 'Soil.X' else 1.0
+        return [scale * point + 100 * self.Phases.index(p) + i for p in phases for i in range(len(p.Steps))]
+
+
+# ---- ResultCache ------------------------------------------------------------------------------
+
+def test_cache_evicts_least_recently_used():
+    cache = results.ResultCache(budget_bytes=2 * 800)
+    for key in 'abc':
+        cache.put(key, np.zeros(100))
+    assert 'a' not in cache
+    assert cache.get('b') is not None and cache.get('c') is not None
+    assert cache.nbytes <= cache.budget_bytes
+
+
+def test_cache_returns_read_only_copies():
+    cache = results.ResultCache()
+    original = np.arange(3.0)
+    values = cache.put('a', original)
+    with pytest.raises(ValueError):
+        values[0] = 1.0
+    original[0] = 5.0        # the array of the caller stays writeable and apart from the cache
+    np.testing.assert_array_equal(cache.get('a'), [0.0, 1.0, 2.0])
+
+
+def test_cache_reads_spilled_array_larger_than_budget(tmp_path):
+    cache = results.ResultCache(budget_bytes=100, spill_dir=str(tmp_path))
+    cache.put('k', np.arange(100.0))
+    values = cache.get('k')
+    np.testing.assert_array_equal(values, np.arange(100.0))
+    assert cache.stats()['disk_hits'] == 1
+    assert 'k' in cache and len(cache) == 0
+
+
+# ---- Envelope -----------------------------------------------------------------------------------
+
+def test_position_ids_follow_positions():
+    ids = results.position_ids([0, 1, 1, 2], [0, 0, 0, 0])
+    assert len(set(ids)) == 3 and ids[1] == ids[2]
+    np.testing.assert_array_equal(ids[[0, 1, 3]], results.position_ids([0, 1, 2], [0, 0, 0]))
+    # grid coordinates, e.g. eastings and northings in metres
+    ids = results.position_ids([836000.0, 836000.001, 836000.0], [820000.0, 820000.0, -820000.0])
+    assert len(set(ids)) == 3
+
+
+def test_envelope_keeps_extremes_and_where():
+    env = results.Envelope(['M'])
+    x, y = np.arange(3.0), np.zeros(3)
+    env.update('P1', dict(M=np.array([1.0, -2.0, 0.0])), x, y)
+    env.update('P2', dict(M=np.array([3.0, -1.0, -5.0])), x, y)
+    df = env.to_frame()
+    np.testing.assert_array_equal(df['M_max'], [3.0, -1.0, 0.0])
+    np.testing.assert_array_equal(df['M_min'], [1.0, -2.0, -5.0])
+    assert list(df['M_max_at']) == ['P2', 'P2', 'P1']
+    assert list(df['M_min_at']) == ['P1', 'P1', 'P2']
+
+
+def test_envelope_adds_nodes_of_later_phases():
+    env = results.Envelope(['M'])
+    env.update('P1', dict(M=np.array([1.0])), [0.0], [0.0])
+    env.update('P2', dict(M=np.array([2.0, 4.0])), [0.0, 1.0], [0.0, 0.0])
+    df = env.to_frame()
+    assert len(df) == 2
+    assert list(df['M_max_at']) == ['P2', 'P2']
+    assert list(df['M_min_at']) == ['P1', 'P2']
+
+
+def test_envelope_of_stacked_coincident_nodes():
+    # five element ends stacked at x = 1, e.g. plates meeting at a node, listed apart
+    x = np.array([0, 1, 1, 2, 1, 1, 1], dtype=float)
+    y = np.zeros(7)
+    env = results.Envelope(['M'])
+    env.update('P1', dict(M=np.array([0.0, 5.0, -7.0, 1.0, 2.0, np.nan, 3.0])), x, y)
+    env.update('P2', dict(M=np.array([0.0, 4.0, -8.0, 1.0, 6.0, 0.0, -1.0])), x, y)
+    env.update('P3', dict(M=np.array([0.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0])), x, y)
+    df = env.to_frame()
+    assert len(df) == 3
+    row = df[df['x'] == 1.0].iloc[0]
+    assert (row['M_max'], row['M_min']) == (6.0, -8.0)
+    assert (row['M_max_at'], row['M_min_at']) == ('P2', 'P2')
+
+
+def test_envelope_blocks_match_whole_phase():
+    # nodes listed twice at one position (plate element ends), split across block boundaries
+    x = np.array([0, 1, 1, 2, 2, 3], dtype=float)
+    y = np.zeros(6)
+    ids = results.position_ids(x, y)
+    whole, blocks = results.Envelope(['M']), results.Envelope(['M'])
+    for k, label in enumerate(['P1', 'P2']):
+        values = np.arange(6.0) * (-1) ** k
+        whole.update(label, dict(M=values), x, y)
+        for start in range(0, 6, 2):
+            blocks.update(label, dict(M=values[start:start + 2]), x[start:start + 2], y[start:start + 2],
+                          ids[start:start + 2])
+    assert blocks.labels == ['P1', 'P2']
+    assert whole.to_frame().equals(blocks.to_frame())
+
+
+# ---- cut lines --------------------------------------------------------------------------------
+
+def test_cut_line_orders_nodes_along_line():
+    x = np.array([3.0, 1.0, 2.0, 2.0, 0.0])
+    y = np.array([0.0, 0.0, 0.0, 1.0, 0.0])
+    section = results.cut_line(x, y, dict(U=x * 10), [(0.0, 0.0), (3.0, 0.0)])
+    np.testing.assert_array_equal(section['x'], [1.0, 2.0])
+    np.testing.assert_array_equal(section['U'], [10.0, 20.0])
+    section = results.cut_line(x, y, dict(U=x * 10), [(0.0, 0.0), (3.0, 0.0)], include_ends=True)
+    np.testing.assert_array_equal(section['s'], [0.0, 1.0, 2.0, 3.0])
+
+
+def test_cut_line_follows_a_polyline():
+    # vertical cut from the top, then along the base; the corner node is picked once
+    x = np.array([0.0, 0.0, 0.0, 1.0, 2.0, 1.0])
+    y = np.array([0.0, -1.0, -2.0, -2.0, -2.0, -1.0])
+    section = results.cut_line(x, y, dict(Uy=y), [(0.0, 0.0), (0.0, -2.0), (2.0, -2.0)], include_ends=True)
+    np.testing.assert_array_equal(section['s'], [0.0, 1.0, 2.0, 3.0, 4.0])
+    np.testing.assert_array_equal(section['x'], [0.0, 0.0, 0.0, 1.0, 2.0])
+    np.testing.assert_array_equal(section['Uy'], [0.0, -1.0, -2.0, -2.0, -2.0])
+
+
+# ---- anchors ----------------------------------------------------------------------------------
+
+def test_pair_anchor_ends_by_material():
+    material = np.array(['A1', 'A1', 'A2', 'A2'])
+    x = np.array([5.0, 0.0, 0.0, 5.0])
+    y = np.array([-1.0, -1.0, -3.0, -3.0])
+    force = np.array([100.0, 100.0, 200.0, 200.0])
+    pairs = results.pair_anchor_ends(material, x, y, dict(F=force))
+    assert list(pairs['anchor_name']) == ['A1', 'A2']
+    np.testing.assert_array_equal(pairs['xa'], [0.0, 0.0])
+    np.testing.assert_array_equal(pairs['xb'], [5.0, 5.0])
+    np.testing.assert_array_equal(pairs['F'], [100.0, 200.0])
+
+
+def test_pair_anchor_ends_by_element():
+    # two anchors of the same material, their ends listed apart
+    material = np.array([1, 1, 1, 1])
+    element = np.array([8, 9, 8, 9])
+    x = np.array([0.0, 0.0, 5.0, 6.0])
+    y = np.array([-1.0, -3.0, -1.0, -3.0])
+    force = np.array([100.0, 200.0, 100.0, 200.0])
+    pairs = results.pair_anchor_ends(material, x, y, dict(F=force), element, node_id=np.array([11, 12, 13, 14]))
+    np.testing.assert_array_equal(pairs['ya'], [-1.0, -3.0])
+    np.testing.assert_array_equal(pairs['xb'], [5.0, 6.0])
+    np.testing.assert_array_equal(pairs['node_a'], [11, 12])
+    np.testing.assert_array_equal(pairs['node_b'], [13, 14])
+    np.testing.assert_array_equal(pairs['F'], [100.0, 200.0])
+
+
+def test_pair_anchor_ends_rejects_different_forces():
+    with pytest.raises(ValueError):
+        results.pair_anchor_ends(np.array([1, 1]), [0.0, 1.0], [0.0, 0.0], dict(F=np.array([1.0, 2.0])))
+
+
+def test_pair_anchor_ends_rejects_odd_nodes():
+    with pytest.raises(ValueError):
+        results.pair_anchor_ends(np.array([1, 1, 2]), [0.0, 1.0, 2.0], [0.0, 0.0, 0.0], {})
+
+
+def _pairs(ya, force):
+    n = len(ya)
+    return dict(anchor_name=np.arange(n), xa=np.zeros(n), ya=np.asarray(ya, dtype=float), xb=np.full(n, 5.0),
+                yb=np.asarray(ya, dtype=float), F=np.asarray(force, dtype=float))
+
+
+def test_pivot_anchor_forces_with_missing_anchors():
+    # the lower anchor is installed in Phase_2 and removed in Phase_4
+    table = results.anchor_table({'Phase_1': _pairs([-1.0], [100.0]),
+                                  'Phase_2': _pairs([-1.0, -3.0], [150.0, 80.0]),
+                                  'Phase_3': _pairs([-3.0, -1.0], [120.0, 90.0]),
+                                  'Phase_4': _pairs([-1.0], [60.0])})
+    np.testing.assert_array_equal(table['anchor'], [0, 0, 1, 1, 0, 0])
+    matrix, envelope = results.pivot_anchor_forces(table)
+    assert list(matrix.columns) == ['Phase_1', 'Phase_2', 'Phase_3', 'Phase_4']
+    np.testing.assert_array_equal(matrix.to_numpy(), [[100.0, 150.0, 90.0, 60.0],
+                                                      [np.nan, 80.0, 120.0, np.nan]])
+    np.testing.assert_array_equal(envelope['ya'], [-1.0, -3.0])
+    np.testing.assert_array_equal(envelope['min'], [60.0, 80.0])
+    np.testing.assert_array_equal(envelope['max'], [150.0, 120.0])
+    assert list(envelope['phase_min']) == ['Phase_4', 'Phase_2']
+    assert list(envelope['phase_max']) == ['Phase_2', 'Phase_3']
+
+
+def test_pivot_anchor_forces_of_an_anchor_without_value():
+    table = results.anchor_table({'Phase_1': _pairs([-1.0, -3.0], [100.0, np.nan])})
+    matrix, envelope = results.pivot_anchor_forces(table)
+    assert np.isnan(envelope.loc[1, 'min']) and pd.isna(envelope.loc[1, 'phase_max'])
+    assert envelope.loc[0, 'phase_max'] == 'Phase_1'
+
+
+# ---- result chunks ----------------------------------------------------------------------------
+
+def test_result_chunks_have_fixed_size():
+    g_o = _Output([])
+    chunks = [(x.start, x.total, x.block.copy()) for x in
+              results.result_chunks(g_o, None, ['Soil.X', 'Soil.Utot'], chunk_size=4)]
+    assert [x[0] for x in chunks] == [0, 4, 8]
+    assert all(x[1] == 10 for x in chunks)
+    assert [len(x[2]) for x in chunks] == [4, 4, 2]
+    np.testing.assert_array_equal(np.concatenate([x[2] for x in chunks])[:, 0], np.arange(10))
+
+
+def test_result_chunks_reject_results_of_different_lengths():
+    g_o = _Output([])
+    g_o.getresults = lambda target, rtype, location: [1.0] * (3 if rtype == 'Soil.X' else 4)
+    with pytest.raises(ValueError):
+        list(results.result_chunks(g_o, None, ['Soil.X', 'Soil.Utot']))
+
+
+# ---- curve histories --------------------------------------------------------------------------
+
+def test_curve_histories_read_times_once():
+    phases = [_Phase('InitialPhase', 1), _Phase('Phase_1', 2), _Phase('Phase_2', 3)]
+    g_o = _Output(phases)
+    hist = results.curve_histories(g_o, points=[0])
+    assert hist.phases == ['Phase_1', 'Phase_2']
+    np.testing.assert_array_equal(hist.phase_ix, [0, 0, 1, 1, 1])
+    np.testing.assert_array_equal(hist.time, [0, 1, 0, 1, 2])
+    assert len(g_o.calls) == 2 + 1       # one per phase for Utot, one for the times of both phases
+
+
+def test_curve_histories_read_each_series_over_runs_of_phases():
+    phases = [_Phase('Phase_1', 2), _Phase('Phase_2', 3), _Phase('Phase_3', 1), _Phase('Phase_4', 2)]
+    g_o = _Output(phases)
+    hist = results.curve_histories(g_o, points=[1, 2], result_types=['Soil.Utot', 'Soil.X'],
+                                   phases=[phases[0], phases[1], phases[3]], skip_initial=False)
+    expected = np.array([0, 1, 100, 101, 102, 300, 301], dtype=float)
+    np.testing.assert_array_equal(hist.values['Soil.Utot'], [1 + expected, 2 + expected])
+    np.testing.assert_array_equal(hist.values['Soil.X'], [10 + expected, 20 + expected])
+    np.testing.assert_array_equal(hist.phase_ix, [0, 0, 1, 1, 1, 2, 2])
+    # steps counted per phase once, then every other series and the time once per run of phases
+    counts = [x for x in g_o.calls if x[0] == 1 and x[3] == 'Soil.Utot']
+    assert counts == [(1, 'Phase_1', 'Phase_1', 'Soil.Utot'), (1, 'Phase_2', 'Phase_2', 'Soil.Utot'),
+                      (1, 'Phase_4', 'Phase_4', 'Soil.Utot')]
+    others = [x[1:3] for x in g_o.calls if not (x[0] == 1 and x[3] == 'Soil.Utot')]
+    assert others == [('Phase_1', 'Phase_2'), ('Phase_4', 'Phase_4')] * 4
+    assert len(g_o.calls) == 3 + 2 * 3 + 2
+
+
+def test_curve_histories_reject_misaligned_times():
+    phases = [_Phase('Phase_1', 2), _Phase('Phase_2', 3)]
+    with pytest.raises(ValueError):
+        results.curve_histories(_Output(phases, times=[0.0, 1.0]), points=[0], skip_initial=False)
+
+
+def test_curve_histories_time_from_steps_without_time_type():
+    phases = [_Phase('Phase_1', 2), _Phase('Phase_2', 3)]
+    g_o = _Output(phases)
+    hist = results.curve_histories(g_o, points=[0], skip_initial=False, time_type=None)
+    np.testing.assert_array_equal(hist.time, [0, 1, 0, 1, 2])
+    assert all(x[3] == 'Soil.Utot' for x in g_o.calls)
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('pyarrow')
+
+import pyarrow.dataset as ds
+
+from resultstore import ResultStore, export_results
+
+GROUPS = {'soil_node': ('Soil', 'node', ['X', 'Y', 'Uy']),
+          'anchor':    ('NodeToNodeAnchor', 'node', ['MaterialID', 'X', 'AnchorForce2D'])}
+
+
+class _Value:
+    def __init__(self, value):
+        self.value = value
+
+
+class _Step:
+    def __init__(self, phase, i):
+        self.phase, self.i = phase, i
+
+
+class _Phase:
+    def __init__(self, name, index, nsteps):
+        self.Name = _Value(name)
+        self.index = index
+        self.Steps = [_Step(self, i) for i in range(nsteps)]
+
+    def __str__(self):
+        return self.Name.value
+
+
+class _Output:
+    '''
+    Stand-in for the Plaxis Output global object: 4 soil nodes and 2 anchor nodes whose results encode
+    the phase and step they belong to
+    '''
+    class ResultTypes:
+        class Soil:
+            X, Y, Uy, Utot, Time = 'Soil.X', 'Soil.Y', 'Soil.Uy', 'Soil.Utot', 'Soil.Time'
+
+        class NodeToNodeAnchor:
+            MaterialID, X, AnchorForce2D = 'Anchor.MaterialID', 'Anchor.X', 'Anchor.AnchorForce2D'
+
+    def __init__(self, phases):
+        self.Phases = phases
+
+    def getresults(self, target, rtype, location):
+        if isinstance(target, _Phase):           # results of a phase are those of its last step
+            target = target.Steps[-1]
+        tag = 10 * target.phase.index + target.i
+        n = 2 if rtype.startswith('Anchor') else 4
+        if rtype.endswith('.X'):
+            return list(np.arange(n, dtype=float))
+        if rtype.endswith('.Y'):
+            return [-1.0, -2.0, -3.0, -4.0]
+        if rtype.endswith('MaterialID'):
+            return [1, 2]
+        return list(tag + np.arange(n) / 10)
+
+    def getcurveresultspath(self, point, first, last, rtype):
+        phases = self.Phases[self.Phases.index(first):self.Phases.index(last) + 1]
+        steps = [x for phase in phases for x in phase.Steps]
+        if rtype == 'Soil.Time':
+            return [float(x.phase.index) + x.i / 10 for x in steps]
+        return [100.0 * point + 10 * x.phase.index + x.i for x in steps]
+
+
+def _phases():
+    return [_Phase('InitialPhase', 0, 1), _Phase('Phase_1', 1, 3), _Phase('Phase_2', 2, 2)]
+
+
+def test_round_trip_final_steps(tmp_path):
+    store = export_results(_Output(_phases()), tmp_path / 'store', groups=GROUPS, curve_points=[])
+    assert store.phases == ['InitialPhase', 'Phase_1', 'Phase_2']
+    df = ResultStore(tmp_path / 'store').query('soil_node', ['X', 'Uy'], phase='Phase_2')
+    assert list(df.columns) == ['X', 'Uy']
+    np.testing.assert_allclose(df['Uy'], [21.0, 21.1, 21.2, 21.3])
+    df = store.get_anchor_results(['Phase_1'])
+    assert set(df['phase']) == {'Phase_1'}
+    np.testing.assert_array_equal(df['MaterialID'], [1, 2])
+    assert df['MaterialID'].dtype == np.int64
+    np.testing.assert_allclose(df['AnchorForce2D'], [12.0, 12.1])
+
+
+def test_round_trip_all_steps(tmp_path):
+    phases = _phases()
+    store = export_results(_Output(phases), tmp_path / 'store', phases=phases[1:], groups=GROUPS,
+                           all_steps=True, curve_points=[])
+    assert store.phases == ['Phase_1', 'Phase_2']
+    df = store.query('soil_node', phase=['Phase_1', 'Phase_2'], step='final')
+    assert sorted(df.groupby('phase', observed=True)['step'].first().items()) == [('Phase_1', 2), ('Phase_2', 1)]
+    # the phase folders are pruned, the filter on columns is pushed down
+    df = store.query('soil_node', ['Uy', 'step'], phase='Phase_1', filter=ds.field('Y') < -2.5)
+    assert len(df) == 3 * 2
+    np.testing.assert_allclose(np.sort(df['Uy']), [10.2, 10.3, 11.2, 11.3, 12.2, 12.3])
+    assert store.query('soil_node', phase='InitialPhase').empty
+
+
+def test_export_replaces_only_a_store(tmp_path):
+    export_results(_Output(_phases()), tmp_path / 'store', groups=GROUPS, curve_points=[])
+    phases = _phases()[2:]
+    store = export_results(_Output(phases), tmp_path / 'store', phases=phases, groups=GROUPS, curve_points=[])
+    assert store.phases == ['Phase_2']
+    assert not (tmp_path / 'store' / 'soil_node' / 'phase=Phase_1').exists()
+    other = tmp_path / 'other'
+    other.mkdir()
+    (other / 'notes.txt').write_text('keep me')
+    with pytest.raises(FileExistsError):
+        export_results(_Output(phases), other, phases=phases, groups=GROUPS, curve_points=[])
+    assert (other / 'notes.txt').read_text() == 'keep me'
+    (tmp_path / 'empty').mkdir()
+    assert export_results(_Output(phases), tmp_path / 'empty', phases=phases, groups=GROUPS,
+                          curve_points=[]).phases == ['Phase_2']
+
+
+def test_round_trip_curves(tmp_path):
+    store = export_results(_Output(_phases()), tmp_path / 'store', groups={}, curve_points=[0, 1])
+    df = store.get_curve_history(point=1)
+    assert df['phase'].astype(str).tolist() == ['InitialPhase'] + ['Phase_1'] * 3 + ['Phase_2'] * 2
+    np.testing.assert_array_equal(df['step'], [0, 0, 1, 2, 0, 1])
+    np.testing.assert_allclose(df['time'], [0.0, 1.0, 1.1, 1.2, 2.0, 2.1])
+    np.testing.assert_allclose(df['y'], [100, 110, 111, 112, 120, 121])
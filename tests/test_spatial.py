@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+shapely = pytest.importorskip('shapely')
+
+from spatial import PolygonIndex, match_by_shape
+
+
+def test_polygon_index_point_queries_use_geometry():
+    index = PolygonIndex.from_polygons(['S_1', 'S_2'], [shapely.box(0, 0, 2, 1),
+                                                        shapely.Polygon([(2, 0), (4, 0), (2, 1)])])
+    assert list(index.at_points([[3, 0.9], [3, 0.2], [1, 0.5]])) == [None, 'S_2', 'S_1']
+    assert index.at_point(3, 0.9) == []
+    assert index.intersecting((3, 0.8, 3.5, 1.0)) == []
+    assert index.in_box(-1, -1, 3, 2) == ['S_1']
+
+
+def test_polygon_index_from_bounding_boxes():
+    df = pd.DataFrame({'PolygonName': ['S_1', 'S_2', 'S_3'], 'BB_xmin': [0, 2, 10], 'BB_ymin': [0, 0, 0],
+                       'BB_xmax': [2, 4, 12], 'BB_ymax': [1, 1, 1]})
+    index = PolygonIndex.from_bounding_boxes(df)
+    assert len(index) == 3
+    assert index.at_point(2, 0.5) == ['S_1', 'S_2']
+    assert index.intersecting((3, 0, 11, 1)) == ['S_2', 'S_3']
+    assert index.in_box(0, 0, 4, 1) == ['S_1', 'S_2']
+    # a point on a shared edge goes to the first polygon
+    assert list(index.at_points([[2, 0.5], [11, 0.5], [20, 0]])) == ['S_1', 'S_3', None]
+
+
+def test_polygon_index_point_on_vertex_of_many_polygons():
+    # four squares meeting at (1, 1), listed out of order
+    boxes = [shapely.box(1, 1, 2, 2), shapely.box(0, 0, 1, 1), shapely.box(1, 0, 2, 1), shapely.box(0, 1, 1, 2)]
+    index = PolygonIndex.from_polygons(['S_4', 'S_1', 'S_2', 'S_3'], boxes)
+    found = index.at_points([[1, 1], [0.5, 1], [1.5, 1.5], [1, 1]])
+    assert list(found) == ['S_4', 'S_1', 'S_4', 'S_4']
+    assert index.at_point(1, 1) == ['S_4', 'S_1', 'S_2', 'S_3']
+
+
+def _mirror_triangles():
+    # same area and bounding box, mirror images of each other, plus a square
+    return [shapely.Polygon([(0, 0), (2, 0), (0, 1)]), shapely.Polygon([(0, 0), (2, 0), (2, 1)]),
+            shapely.box(5, 5, 6, 6)]
+
+
+def _shape(polygons):
+    return (shapely.area(polygons), shapely.bounds(polygons),
+            shapely.get_coordinates(shapely.centroid(polygons)))
+
+
+def test_match_by_shape_unique_keys():
+    areas, bounds, centroids = _shape(_mirror_triangles()[2:] + [shapely.box(0, 0, 1, 3)])
+    matched = match_by_shape(areas, bounds, areas[::-1], bounds[::-1])
+    np.testing.assert_array_equal(matched, [1, 0])
+
+
+def test_match_by_shape_unknown_reference_is_unmatched():
+    areas, bounds, centroids = _shape(_mirror_triangles()[2:])
+    matched = match_by_shape(areas, bounds, [np.nan, areas[0], 7.0], np.vstack([bounds, bounds, bounds]))
+    np.testing.assert_array_equal(matched, [-1, 0, -1])
+
+
+def test_match_by_shape_centroid_in_key_resolves_mirror_images():
+    areas, bounds, centroids = _shape(_mirror_triangles())
+    order = [1, 0, 2]
+    matched = match_by_shape(areas, bounds, areas[order], bounds[order],
+                             centroids=centroids, ref_centroids=centroids[order])
+    np.testing.assert_array_equal(matched, order)
+
+
+def test_match_by_shape_ties_broken_by_outline():
+    polygons = _mirror_triangles()
+    areas, bounds, centroids = _shape(polygons)
+    order = [1, 0, 2]
+    vertices = [shapely.get_coordinates(polygons[i].exterior)[:-1] for i in order]
+    matched = match_by_shape(areas, bounds, areas[order], bounds[order], centroids=centroids,
+                             geometries=polygons, ref_vertices=lambda i: vertices[i])
+    np.testing.assert_array_equal(matched, order)
+
+
+def test_match_by_shape_leaves_unresolved_ties_unmatched():
+    areas, bounds, centroids = _shape(_mirror_triangles())
+    matched = match_by_shape(areas, bounds, areas[[1, 0, 2]], bounds[[1, 0, 2]])
+    np.testing.assert_array_equal(matched, [-1, -1, 2])
+
+
+def test_match_by_shape_within_tolerance_across_rounding():
+    areas, bounds, centroids = _shape([shapely.box(0, 0, 1, 1)])
+    matched = match_by_shape(areas, bounds, areas + 4e-4, bounds + 4e-4, tol=1e-3)
+    np.testing.assert_array_equal(matched, [0])
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from stagematrix import StageMatrix
+
+
+def _matrix():
+    tables = {
+        'InitialPhase': pd.DataFrame(dict(Material=['Clay', 'Sand', 'Fill'], Active=[True, True, False]),
+                                     index=['Soil_1', 'Soil_2', 'Soil_3']),
+        'Phase_1':      pd.DataFrame(dict(Material=['Clay', 'Clay', None], Active=[True, False, True]),
+                                     index=['Soil_1', 'Soil_2', 'Soil_3']),
+    }
+    return StageMatrix.from_tables(tables)
+
+
+def test_soils_with_material():
+    matrix = _matrix()
+    assert matrix.soils_with('Clay', 'Phase_1') == ['Soil_1', 'Soil_2']
+    assert matrix.soils_with('Clay', 'Phase_1', active=True) == ['Soil_1']
+    assert matrix.soils_with('Steel', 'Phase_1') == []
+
+
+def test_to_frame():
+    df = _matrix().to_frame()
+    assert df['Phase_1', 'Active'].dtype == bool
+    assert list(df['Phase_1', 'Active']) == [True, False, True]
+    assert list(df['InitialPhase', 'Material']) == ['Clay', 'Sand', 'Fill']
+    assert pd.isna(df.loc['Soil_3', ('Phase_1', 'Material')])
+
+
+def test_soils_missing_from_a_phase_are_inactive_without_material():
+    tables = {'InitialPhase': pd.DataFrame(dict(Material=['Clay'], Active=[True]), index=['Soil_1']),
+              'Phase_1':      pd.DataFrame(dict(Material=['Sand'], Active=[True]), index=['Soil_2'])}
+    matrix = StageMatrix.from_tables(tables)
+    assert matrix.shape == (2, 2)
+    np.testing.assert_array_equal(matrix.codes, [[0, -1], [-1, 1]])
+    np.testing.assert_array_equal(matrix.is_active(), [[True, False], [False, True]])
+    assert pd.isna(matrix.material_names().loc['Soil_2', 'InitialPhase'])
+
+
+def test_activity_is_bitpacked_beyond_eight_soils():
+    soils = ['Soil_{}'.format(i) for i in range(11)]
+    flags = [i % 3 == 0 for i in range(11)]
+    matrix = StageMatrix.from_tables({'Phase_1': pd.DataFrame(dict(Material='Clay', Active=flags), index=soils)})
+    assert matrix.active.shape == (1, 2)
+    assert list(matrix.is_active('Phase_1')) == flags
+    assert matrix.soils_with('Clay', 'Phase_1', active=False) == [x for x, f in zip(soils, flags) if not f]
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('openpyxl')
+
+import workbook
+
+
+def _sheet():
+    return pd.DataFrame({'Plate_ID': [1, 2, 3], 'MaterialName': ['Wall', 0, np.nan],
+                         'Unnamed: 2': [np.nan] * 3, 'IsIsotropic': [True, False, True],
+                         'IsEndBearing': [1, 0, 1], 'x': [1.5, np.nan, 2.0], 'mixed': [1, 'text', 2.5]})
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    workbook.clear_cache()
+    yield
+    workbook.clear_cache()
+
+
+def test_workbook_cache_follows_the_file_content(tmp_path):
+    filename = tmp_path / 'input.xlsx'
+    _sheet().to_excel(filename, sheet_name='PP_Plate_SFormat', index=False)
+    first = workbook.read_workbook(filename)
+    assert workbook.read_workbook(filename) is first       # memory cache hit
+    assert len(list((tmp_path / '.wbcache').glob('input-*.pkl'))) == 1
+    workbook.clear_cache()
+    from_disk = workbook.read_workbook(filename)
+    assert from_disk is not first
+    pd.testing.assert_frame_equal(from_disk['PP_Plate_SFormat'], first['PP_Plate_SFormat'])
+    # an edited workbook is parsed again and replaces the disk cache of the older revision
+    df = _sheet()
+    df.loc[0, 'x'] = 9.0
+    df.to_excel(filename, sheet_name='PP_Plate_SFormat', index=False)
+    edited = workbook.read_workbook(filename)
+    assert edited['PP_Plate_SFormat'].loc[0, 'x'] == 9.0
+    cached = list((tmp_path / '.wbcache').glob('input-*.pkl'))
+    assert [x.name for x in cached] == ['input-{}.pkl'.format(workbook.file_hash(filename))]
+
+
+def test_read_sheet_returns_a_copy(tmp_path):
+    filename = tmp_path / 'input.xlsx'
+    _sheet().to_excel(filename, sheet_name='PP_Plate_SFormat', index=False)
+    df = workbook.read_sheet(filename, 'PP_Plate_SFormat')
+    df.loc[0, 'x'] = -1.0
+    assert workbook.read_sheet(filename, 'PP_Plate_SFormat').loc[0, 'x'] == 1.5
+    with pytest.raises(KeyError):
+        workbook.read_sheet(filename, 'PP_Anchor_SFormat')
+
+
+def test_corrupted_disk_cache_is_rebuilt(tmp_path):
+    filename = tmp_path / 'input.xlsx'
+    _sheet().to_excel(filename, sheet_name='PP_Plate_SFormat', index=False)
+    cache_dir = tmp_path / 'cache'
+    cache_dir.mkdir()
+    (cache_dir / 'input-{}.pkl'.format(workbook.file_hash(filename))).write_bytes(b'not a pickle')
+    sheets = workbook.read_workbook(filename, cache_dir)
+    assert list(sheets) == ['PP_Plate_SFormat']
+
+
+def test_compiled_workbook_reads_as_excel(tmp_path):
+    pytest.importorskip('pyarrow')
+    filename = tmp_path / 'input.xlsx'
+    _sheet().to_excel(filename, sheet_name='PP_Plate_SFormat', index=False)
+    compiled = workbook.compile_workbook(filename)
+    expected = pd.read_excel(filename, sheet_name='PP_Plate_SFormat')
+    pd.testing.assert_frame_equal(workbook.load_compiled(compiled)['PP_Plate_SFormat'], expected)
+    # an up to date compiled form is picked up when the Excel workbook is read
+    pd.testing.assert_frame_equal(workbook.read_workbook(filename)['PP_Plate_SFormat'], expected)
+
+
+def test_validate_sheet_checks_bool_columns():
+    df = _sheet()
+    workbook.validate_sheet('PP_Plate_SFormat', df)
+    df['IsIsotropic'] = ['yes', 'no', 'yes']
+    with pytest.raises(ValueError, match='IsIsotropic is not bool'):
+        workbook.validate_sheet('PP_Plate_SFormat', df)